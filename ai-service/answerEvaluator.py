@@ -9,8 +9,15 @@ if hasattr(torch.backends, 'mps') and torch.backends.mps.is_available():
     torch.backends.mps.is_available = lambda: False
 
 import torch.nn.functional as F
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from typing import Dict, List
+from transformers import AutoTokenizer
+from typing import Dict, List, Tuple
+
+from inferenceBackends import RERANKER_BACKEND, load_classifier
+from inferenceScheduler import MicroBatchScheduler
+from resultCache import content_key, get_cache
+
+# Cross-session micro-batching window for reranker requests (0 disables it)
+RERANK_BATCH_WINDOW_MS = float(os.getenv("RERANK_BATCH_WINDOW_MS", "10"))
 
 
 class AnswerEvaluator:
@@ -21,9 +28,21 @@ class AnswerEvaluator:
     - depth/clarity: 简单基于长度与句子数的启发式（可后续接 LLM 细化）
     """
 
-    def __init__(self, model_name: str = "BAAI/bge-reranker-v2-m3", device: str = None):
+    def __init__(
+        self,
+        model_name: str = "BAAI/bge-reranker-v2-m3",
+        device: str = None,
+        max_length: int = 512,
+        window_stride: int = 128,
+        max_batch_size: int = 32,
+        batch_window_ms: float = RERANK_BATCH_WINDOW_MS,
+        backend: str = RERANKER_BACKEND,
+    ):
         # Explicitly set device, avoiding MPS on macOS due to compatibility issues
-        if device:
+        if backend != "torch":
+            # int8 and onnx backends are CPU inference modes
+            self.device = "cpu"
+        elif device:
             self.device = device
         elif torch.cuda.is_available():
             self.device = "cuda"
@@ -31,8 +50,22 @@ class AnswerEvaluator:
             # Use CPU on macOS to avoid MPS issues
             self.device = "cpu"
         
+        self.backend = backend
+        self.model_name = model_name
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModelForSequenceClassification.from_pretrained(model_name).to(self.device)
+        self.model = load_classifier(model_name, "text", backend, self.device)
+        # Long answers are split into overlapping windows of max_length tokens
+        # (window_stride tokens shared between neighbours) and max-pooled
+        self.max_length = max_length
+        self.window_stride = window_stride
+        self.max_batch_size = max_batch_size
+        # Requests from concurrent sessions are merged into one padded batch
+        self.scheduler = (
+            MicroBatchScheduler("reranker", self._score_groups, window_ms=batch_window_ms)
+            if batch_window_ms > 0 else None
+        )
+        # Pair scores are memoized by (query, doc) content + model params
+        self.cache = get_cache("rerank")
         self.scoring_weights = {
             "relevance": 0.35,
             "completeness": 0.35,
@@ -41,8 +74,10 @@ class AnswerEvaluator:
         }
 
     def evaluate_answer(self, question: str, answer: str, expected_points: List[str]) -> Dict:
-        relevance = self._rerank_score(question, answer)
-        completeness = self._coverage_score(answer, expected_points)
+        # Relevance and every expected point are scored in one batched pass
+        pair_scores = self.score_pairs([question] + list(expected_points or []), answer)
+        relevance = pair_scores[0]
+        completeness = self._coverage_from_scores(pair_scores[1:])
         depth = self._depth_score(answer)
         clarity = self._clarity_score(answer)
 
@@ -59,24 +94,107 @@ class AnswerEvaluator:
             "feedback": self._generate_feedback(scores),
         }
 
-    def _rerank_score(self, query: str, doc: str) -> float:
+    def warm_up(self) -> None:
+        """Run one dummy forward pass so the first real request is not cold"""
+        self._rerank_score("请介绍一下你自己。", "我是一名后端开发工程师。")
+
+    def score_pairs(self, queries: List[str], doc: str) -> List[float]:
+        """
+        Score every (query, doc) pair with one tokenizer call and one batched
+        forward pass. Docs longer than max_length are split into overlapping
+        windows that go into the same batch; each pair keeps its best window.
+        With the scheduler enabled, pairs from other sessions share the batch.
+        Pairs already in the result cache are not sent to the model.
+        """
+        if not queries:
+            return []
+        keys = [self._pair_key(q, doc) for q in queries]
+        scores = [self.cache.get(key) for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            group = ([queries[i] for i in missing], doc)
+            if self.scheduler is not None:
+                computed = self.scheduler(group)
+            else:
+                computed = self._score_groups([group])[0]
+            for i, score in zip(missing, computed):
+                scores[i] = score
+                self.cache.set(keys[i], score)
+        return scores
+
+    def _pair_key(self, query: str, doc: str) -> str:
+        return content_key(
+            f"{query}\x00{doc}",
+            model=self.model_name,
+            backend=self.backend,
+            max_length=self.max_length,
+            stride=self.window_stride,
+        )
+
+    def _score_groups(self, groups: List[Tuple[List[str], str]]) -> List[List[float]]:
+        """Score several (queries, doc) groups in one padded batch"""
+        queries = [q for group_queries, _ in groups for q in group_queries]
+        docs = [doc for group_queries, doc in groups for _ in group_queries]
+        if not queries:
+            return [[] for _ in groups]
         inputs = self.tokenizer(
-            query,
-            doc,
+            self._cap_queries(queries),
+            docs,
+            truncation="only_second",
+            max_length=self.max_length,
+            stride=self.window_stride,
+            return_overflowing_tokens=True,
+            padding=True,  # dynamic padding to the longest window in the batch
             return_tensors="pt",
-            truncation=True,
-            max_length=512,
-        ).to(self.device)
+        )
+        window_owner = inputs.pop("overflow_to_sample_mapping")
+        inputs = inputs.to(self.device)
+
+        window_probs = []
         with torch.no_grad():
-            logits = self.model(**inputs).logits
-            prob = F.softmax(logits, dim=1)[0, 1]
-        return float(prob)  # 0-1
+            for start in range(0, window_owner.shape[0], self.max_batch_size):
+                batch = {k: v[start:start + self.max_batch_size] for k, v in inputs.items()}
+                window_probs.append(self._logits_to_prob(self.model(**batch).logits))
+        window_probs = torch.cat(window_probs).cpu()
+
+        # Max-pool windows back to their pair, then split pairs back into groups
+        scores = torch.full((len(queries),), float("-inf"))
+        scores = scores.scatter_reduce(0, window_owner, window_probs, reduce="amax").tolist()
+        results, offset = [], 0
+        for group_queries, _ in groups:
+            results.append(scores[offset:offset + len(group_queries)])  # 0-1
+            offset += len(group_queries)
+        return results
+
+    def _cap_queries(self, queries: List[str]) -> List[str]:
+        """
+        only_second truncation fails when a query alone leaves no room for a doc
+        window; queries over half of max_length are cut to that budget first.
+        """
+        specials = self.tokenizer.num_special_tokens_to_add(pair=True)
+        budget = min(self.max_length // 2, self.max_length - specials - self.window_stride - 1)
+        ids = self.tokenizer(queries, add_special_tokens=False)["input_ids"]
+        return [
+            self.tokenizer.decode(query_ids[:budget]) if len(query_ids) > budget else query
+            for query, query_ids in zip(queries, ids)
+        ]
+
+    def _logits_to_prob(self, logits: torch.Tensor) -> torch.Tensor:
+        # Single-logit rerankers (bge-reranker) use a sigmoid, two-class heads a softmax
+        if logits.shape[-1] == 1:
+            return torch.sigmoid(logits[:, 0])
+        return F.softmax(logits, dim=-1)[:, 1]
+
+    def _rerank_score(self, query: str, doc: str) -> float:
+        return self.score_pairs([query], doc)[0]
 
     def _coverage_score(self, answer: str, expected_points: List[str]) -> float:
-        if not expected_points:
+        return self._coverage_from_scores(self.score_pairs(list(expected_points or []), answer))
+
+    def _coverage_from_scores(self, point_scores: List[float]) -> float:
+        if not point_scores:
             return 0.5
-        scores = [self._rerank_score(p, answer) for p in expected_points]
-        return float(sum(scores) / len(scores))
+        return float(sum(point_scores) / len(point_scores))
 
     def _depth_score(self, answer: str) -> float:
         # 简单启发式：长度和“因为/例如”等词的出现
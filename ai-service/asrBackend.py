@@ -0,0 +1,145 @@
+"""
+Pluggable ASR backend
+
+One interface for every transcription path (/transcribe, the interview
+engine and streaming). The default implementation runs faster-whisper on
+CTranslate2, which is int8-quantized and fast on CPU-only hosts.
+"""
+
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Dict, Optional, Union
+
+import numpy as np
+
+AudioInput = Union[str, BinaryIO, np.ndarray]
+
+ASR_MODEL_SIZE = os.getenv("ASR_MODEL", "small")
+ASR_DEVICE = os.getenv("ASR_DEVICE", "auto")  # auto, cpu or cuda
+ASR_COMPUTE_TYPE = os.getenv("ASR_COMPUTE_TYPE", "auto")  # auto: int8 on CPU, float16 on GPU
+ASR_BEAM_SIZE = int(os.getenv("ASR_BEAM_SIZE", "1"))  # greedy decoding by default
+ASR_CPU_THREADS = int(os.getenv("ASR_CPU_THREADS", "0"))  # 0 lets CTranslate2 decide
+
+
+def resolve_device(device: str = ASR_DEVICE) -> str:
+    """Map "auto" to cuda when a GPU is visible to CTranslate2, else cpu"""
+    if device != "auto":
+        return device
+    try:
+        import ctranslate2
+        return "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+    except (ImportError, RuntimeError):
+        return "cpu"
+
+
+def resolve_compute_type(device: str, compute_type: str = ASR_COMPUTE_TYPE) -> str:
+    if compute_type != "auto":
+        return compute_type
+    return "float16" if device == "cuda" else "int8"
+
+
+class ASRBackend(ABC):
+    """Speech recognition interface shared by all transcription paths"""
+
+    model_size: str
+
+    @abstractmethod
+    def transcribe(
+        self,
+        audio: AudioInput,
+        language: Optional[str] = None,
+        initial_prompt: Optional[str] = None,
+        word_timestamps: bool = False,
+        vad_filter: bool = False,
+        beam_size: Optional[int] = None,
+    ) -> Dict:
+        """
+        Transcribe a file path, file object or 16 kHz mono float32 array.
+        Returns {"text", "segments": [{"start", "end", "text", ...}], "language", "duration"}
+        """
+
+    def cache_params(self) -> Dict:
+        """Model identity and decoding params that go into result-cache keys"""
+        return {"backend": type(self).__name__, "model": self.model_size}
+
+    async def transcribe_async(self, audio: AudioInput, **options) -> Dict:
+        """Run transcribe in a worker thread so the event loop stays free"""
+        return await asyncio.to_thread(self.transcribe, audio, **options)
+
+    def warm_up(self) -> None:
+        """Run one dummy decode so the first real request is not cold"""
+        self.transcribe(np.zeros(16000, dtype=np.float32), language="zh")
+
+
+class FasterWhisperASR(ASRBackend):
+    """CTranslate2 Whisper backend (int8 on CPU, float16 on GPU)"""
+
+    def __init__(
+        self,
+        model_size: str = ASR_MODEL_SIZE,
+        device: str = ASR_DEVICE,
+        compute_type: str = ASR_COMPUTE_TYPE,
+        cpu_threads: int = ASR_CPU_THREADS,
+    ):
+        from faster_whisper import WhisperModel
+
+        self.model_size = model_size
+        self.device = resolve_device(device)
+        self.compute_type = resolve_compute_type(self.device, compute_type)
+        self.model = WhisperModel(
+            model_size,
+            device=self.device,
+            compute_type=self.compute_type,
+            cpu_threads=cpu_threads,
+        )
+
+    def cache_params(self) -> Dict:
+        return {
+            **super().cache_params(),
+            "compute_type": self.compute_type,
+            "beam_size": ASR_BEAM_SIZE,
+        }
+
+    def transcribe(
+        self,
+        audio: AudioInput,
+        language: Optional[str] = None,
+        initial_prompt: Optional[str] = None,
+        word_timestamps: bool = False,
+        vad_filter: bool = False,
+        beam_size: Optional[int] = None,
+    ) -> Dict:
+        segments, info = self.model.transcribe(
+            audio,
+            language=language,
+            initial_prompt=initial_prompt,
+            beam_size=beam_size or ASR_BEAM_SIZE,
+            temperature=0.0,
+            word_timestamps=word_timestamps,
+            vad_filter=vad_filter,
+        )
+
+        # Segments are produced lazily; iterating runs the decoder
+        segment_dicts = []
+        for seg in segments:
+            segment = {
+                "start": seg.start,
+                "end": seg.end,
+                "text": seg.text.strip(),
+                "avg_logprob": seg.avg_logprob,
+                "no_speech_prob": seg.no_speech_prob,
+            }
+            if word_timestamps and seg.words:
+                segment["words"] = [
+                    {"start": w.start, "end": w.end, "word": w.word, "probability": w.probability}
+                    for w in seg.words
+                ]
+            segment_dicts.append(segment)
+
+        return {
+            "text": " ".join(s["text"] for s in segment_dicts if s["text"]),
+            "segments": segment_dicts,
+            "language": info.language,
+            "duration": info.duration,
+        }
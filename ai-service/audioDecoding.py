@@ -0,0 +1,169 @@
+"""
+In-memory audio decoding
+
+Uploads (the browser sends audio/webm Opus blobs) are read in chunks with a
+size limit and decoded in-process with PyAV, already installed with
+faster-whisper, straight into a 16 kHz mono float32 NumPy buffer. No temp file
+and no second decode from disk; the buffer goes directly to the models.
+
+An answer is decoded once into an AnswerAudio, which ASR, emotion and
+speech-pattern analysis share by reference (NumPy array, zero-copy torch view).
+"""
+
+import functools
+import io
+import os
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Optional, Union
+
+import numpy as np
+
+from resultCache import content_key
+
+SAMPLE_RATE = 16000
+AUDIO_MAX_UPLOAD_MB = float(os.getenv("AUDIO_MAX_UPLOAD_MB", "25"))
+AUDIO_MAX_SECONDS = float(os.getenv("AUDIO_MAX_SECONDS", "600"))
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
+
+class AudioTooLarge(ValueError):
+    """Upload exceeds AUDIO_MAX_UPLOAD_MB or decodes to more than AUDIO_MAX_SECONDS"""
+
+
+class AudioDecodeError(ValueError):
+    """Upload is not decodable audio"""
+
+
+async def read_upload(file, max_bytes: int = int(AUDIO_MAX_UPLOAD_MB * 1024 * 1024)) -> bytearray:
+    """Read an UploadFile chunk by chunk, stopping as soon as it exceeds max_bytes"""
+    data = bytearray()
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            return data
+        data += chunk
+        if len(data) > max_bytes:
+            raise AudioTooLarge(f"Audio upload exceeds {max_bytes // (1024 * 1024)} MB")
+
+
+AudioSource = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
+
+
+def decode_audio(
+    source: AudioSource,
+    sample_rate: int = SAMPLE_RATE,
+    max_seconds: float = AUDIO_MAX_SECONDS,
+) -> np.ndarray:
+    """
+    Decode a path, file object or in-memory bytes (any container/codec PyAV
+    understands) to mono float32 at sample_rate. Blocking; call it through
+    asyncio.to_thread from request handlers.
+    """
+    import av
+
+    max_samples = int(max_seconds * sample_rate)
+    # Grown geometrically and filled in place: no list of chunks to concatenate
+    out = np.empty(sample_rate * 30, dtype=np.float32)
+    length = 0
+
+    def append(frames) -> None:
+        nonlocal out, length
+        for frame in frames:
+            samples = frame.to_ndarray().reshape(-1)
+            end = length + len(samples)
+            if end > max_samples:
+                raise AudioTooLarge(f"Audio is longer than {max_seconds:.0f} seconds")
+            if end > len(out):
+                grown = np.empty(max(end, len(out) * 2), dtype=np.float32)
+                grown[:length] = out[:length]
+                out = grown
+            np.multiply(samples, 1.0 / 32768.0, out=out[length:end], casting="unsafe")
+            length = end
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    try:
+        container = av.open(source, mode="r", metadata_errors="ignore")
+    except av.error.FFmpegError as e:
+        raise AudioDecodeError(f"Could not open audio: {e}") from e
+
+    with container:
+        if not container.streams.audio:
+            raise AudioDecodeError("Upload contains no audio stream")
+        resampler = av.AudioResampler(format="s16", layout="mono", rate=sample_rate)
+        try:
+            for frame in container.decode(audio=0):
+                append(resampler.resample(frame))
+        except av.error.InvalidDataError:
+            # MediaRecorder chunks are often cut mid-cluster; keep what decoded
+            if length == 0:
+                raise AudioDecodeError("Could not decode audio")
+        append(resampler.resample(None))
+
+    return out[:length]
+
+
+@functools.lru_cache(maxsize=8)
+def _resampler(orig_rate: int, target_rate: int):
+    """torchaudio Resample transform per source rate (its sinc kernel is built once)"""
+    import torchaudio
+    return torchaudio.transforms.Resample(orig_rate, target_rate)
+
+
+def resample(samples: np.ndarray, orig_rate: int, target_rate: int = SAMPLE_RATE) -> np.ndarray:
+    if orig_rate == target_rate:
+        return samples
+    import torch
+    with torch.no_grad():
+        return _resampler(orig_rate, target_rate)(torch.from_numpy(samples)).numpy()
+
+
+@dataclass(eq=False)
+class AnswerAudio:
+    """
+    One answer's audio, decoded once: 16 kHz mono float32. Shared by reference
+    across ASR, emotion and speech analysis threads, so treat it as read-only.
+    """
+
+    samples: np.ndarray
+    sample_rate: int = SAMPLE_RATE
+    _tensor: Any = field(default=None, init=False, repr=False)
+    _digest: Optional[str] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        self.samples = np.ascontiguousarray(self.samples, dtype=np.float32)  # no copy when already so
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / self.sample_rate
+
+    def tensor(self):
+        """Zero-copy torch view of the samples"""
+        if self._tensor is None:
+            import torch
+            self._tensor = torch.from_numpy(self.samples)
+        return self._tensor
+
+    def cache_key(self, **params) -> str:
+        """Result-cache key over the samples; the samples are hashed once per answer"""
+        if self._digest is None:
+            self._digest = content_key(self.samples)
+        return content_key(self._digest, **params)
+
+
+def load_audio(source: Union["AnswerAudio", np.ndarray, AudioSource], sample_rate: int = SAMPLE_RATE) -> AnswerAudio:
+    """
+    AnswerAudio from whatever a caller holds: returned as-is if already decoded;
+    arrays (mono, or 2-D in either channel layout) are mixed down and
+    resampled from sample_rate; paths, file objects and bytes are decoded.
+    """
+    if isinstance(source, AnswerAudio):
+        return source
+    if isinstance(source, np.ndarray):
+        samples = source.astype(np.float32, copy=False)
+        if samples.ndim > 1:
+            # (channels, samples) from torchaudio, (samples, channels) from soundfile:
+            # the channel axis is the short one
+            samples = samples.mean(axis=int(np.argmin(samples.shape)))
+        return AnswerAudio(resample(samples, sample_rate))
+    return AnswerAudio(decode_audio(source))
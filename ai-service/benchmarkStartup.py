@@ -0,0 +1,139 @@
+"""
+Import-time and cold-start benchmark for the AI service
+
+Every measurement runs in a fresh interpreter so module caches and loaded
+weights never leak between runs.
+
+Usage:
+    python benchmarkStartup.py                        # print results
+    python benchmarkStartup.py --output bench.json    # save results
+    python benchmarkStartup.py --baseline bench.json  # fail on regressions
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+SERVICE_DIR = Path(__file__).resolve().parent
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import main
+print(time.perf_counter() - start)
+"""
+
+COLD_START_SNIPPET = """
+import time
+from modelRegistry import get_model_registry
+models = get_model_registry()
+start = time.perf_counter()
+model = getattr(models, {accessor!r})()
+loaded = time.perf_counter()
+model.warm_up()
+done = time.perf_counter()
+print(loaded - start, done - loaded)
+"""
+
+COLD_START_MODELS = {
+    "asr": "asr_backend",
+    "reranker": "answer_evaluator",
+    "wav2vec2": "voice_analysis",
+    "spacy": "skill_matcher",
+}
+
+
+def _run_snippet(code: str) -> List[float]:
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=SERVICE_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return [float(v) for v in result.stdout.strip().splitlines()[-1].split()]
+
+
+def _slowest_imports(top: int = 10) -> List[Dict]:
+    """Top cumulative import times reported by -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=SERVICE_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append({"module": module.strip(), "cumulative_ms": int(cumulative_us) / 1000})
+    rows.sort(key=lambda r: r["cumulative_ms"], reverse=True)
+    return rows[:top]
+
+
+def run_benchmark(repeats: int, models: List[str]) -> Dict:
+    import_times = [_run_snippet(IMPORT_SNIPPET)[0] for _ in range(repeats)]
+    results = {
+        "import_main_seconds": round(statistics.median(import_times), 4),
+        "slowest_imports": _slowest_imports(),
+        "cold_start": {},
+    }
+    for name in models:
+        load_seconds, inference_seconds = _run_snippet(
+            COLD_START_SNIPPET.format(accessor=COLD_START_MODELS[name])
+        )
+        results["cold_start"][name] = {
+            "load_seconds": round(load_seconds, 3),
+            "first_inference_seconds": round(inference_seconds, 3),
+        }
+    return results
+
+
+def find_regressions(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Compare timings against a saved baseline; tolerance is a fraction (0.2 = +20%)"""
+    pairs = [("import_main_seconds", current["import_main_seconds"], baseline.get("import_main_seconds"))]
+    for name, timings in current["cold_start"].items():
+        base = baseline.get("cold_start", {}).get(name, {})
+        for field, value in timings.items():
+            pairs.append((f"cold_start.{name}.{field}", value, base.get(field)))
+
+    regressions = []
+    for label, value, base in pairs:
+        if base and value > base * (1 + tolerance):
+            regressions.append(f"{label}: {value:.3f}s vs baseline {base:.3f}s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=5, help="fresh-interpreter imports of main")
+    parser.add_argument("--models", default=",".join(COLD_START_MODELS),
+                        help="comma-separated models to cold-start ('' to skip)")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="compare against a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown vs baseline")
+    args = parser.parse_args()
+
+    models = [m for m in args.models.split(",") if m]
+    results = run_benchmark(args.repeats, models)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2, ensure_ascii=False))
+
+    if args.baseline:
+        regressions = find_regressions(results, json.loads(args.baseline.read_text()), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
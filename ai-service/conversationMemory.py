@@ -0,0 +1,184 @@
+"""
+Token-budgeted rolling conversation memory
+
+The question prompt's `history` field used to re-serialize every Q/A pair on
+every turn. ConversationMemory keeps the last K turns verbatim and folds older
+turns into a compact summary as they age out, so the rendered history never
+exceeds a hard token budget and rendering cost does not grow with the
+interview. Tokens are counted with tiktoken when available, otherwise with a
+CJK-aware heuristic.
+"""
+
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "800"))
+HISTORY_RECENT_TURNS = int(os.getenv("HISTORY_RECENT_TURNS", "3"))
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "cl100k_base")
+
+# Heuristic tokens: one per CJK character, one per short run of letters/digits, one per symbol
+_HEURISTIC_TOKEN = re.compile(r"[\u3400-\u9fff\uf900-\ufaff]|[A-Za-z0-9]{1,4}|[^\sA-Za-z0-9]")
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """tiktoken encoding, or None if tiktoken (or its BPE file) is unavailable"""
+    global _encoding, _encoding_loaded
+    with _encoding_lock:
+        if not _encoding_loaded:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+            except Exception as e:
+                logger.warning(f"tiktoken unavailable, using heuristic token counts: {e}")
+                _encoding = None
+            _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return sum(1 for _ in _HEURISTIC_TOKEN.finditer(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, suffix: str = "...") -> str:
+    """Cut text to at most max_tokens tokens, appending suffix when it was cut"""
+    if max_tokens <= 0 or not text:
+        return ""
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return encoding.decode(tokens[:max_tokens]) + suffix
+    for i, match in enumerate(_HEURISTIC_TOKEN.finditer(text)):
+        if i == max_tokens:
+            return text[:match.start()].rstrip() + suffix
+    return text
+
+
+@dataclass
+class Turn:
+    number: int
+    question: str
+    answer: str
+    score: Optional[float] = None
+
+
+class ConversationMemory:
+    """Last K turns verbatim plus an incrementally updated summary of older turns"""
+
+    def __init__(
+        self,
+        max_tokens: int = HISTORY_TOKEN_BUDGET,
+        recent_turns: int = HISTORY_RECENT_TURNS,
+        answer_tokens: int = 150,
+        summary_line_tokens: int = 40,
+    ):
+        self.max_tokens = max_tokens
+        self.recent_turns = recent_turns
+        self.answer_tokens = answer_tokens
+        self.summary_line_tokens = summary_line_tokens
+
+        self._recent: List[Turn] = []
+        self._recent_text: List[str] = []  # rendered once per turn
+        self._summary: List[str] = []
+        self._summary_tokens: List[int] = []
+        self._turns = 0
+        self._rendered: Optional[str] = None
+        self.stats_counters = {"renders": 0, "last_history_tokens": 0, "max_history_tokens": 0}
+
+    def add_turn(self, question: str, answer: str, score: Optional[float] = None) -> None:
+        self._turns += 1
+        turn = Turn(self._turns, question or "", answer or "", score)
+        self._recent.append(turn)
+        self._recent_text.append(self._render_turn(turn))
+        while len(self._recent) > self.recent_turns:
+            self._fold(self._recent.pop(0))
+            self._recent_text.pop(0)
+        self._rendered = None
+
+    def render(self) -> str:
+        """History text for the prompt, never longer than max_tokens"""
+        if self._rendered is None:
+            self._rendered = self._render()
+            tokens = count_tokens(self._rendered)
+            self.stats_counters["last_history_tokens"] = tokens
+            self.stats_counters["max_history_tokens"] = max(self.stats_counters["max_history_tokens"], tokens)
+        self.stats_counters["renders"] += 1
+        return self._rendered
+
+    def stats(self) -> Dict:
+        return {
+            **self.stats_counters,
+            "turns": self._turns,
+            "summarized_turns": self._turns - len(self._recent),
+            "summary_lines": len(self._summary),
+            "token_budget": self.max_tokens,
+        }
+
+    def _render_turn(self, turn: Turn) -> str:
+        answer = truncate_to_tokens(turn.answer, self.answer_tokens)
+        return f"Q{turn.number}: {turn.question}\nA{turn.number}: {answer}"
+
+    def _fold(self, turn: Turn) -> None:
+        """Add one summary line for a turn leaving the verbatim window"""
+        first_sentence = re.split(r"(?<=[。！？.!?])\s*", turn.answer.strip(), maxsplit=1)[0]
+        question = truncate_to_tokens(turn.question, self.summary_line_tokens // 2)
+        line = f"Q{turn.number}: {question} -> {first_sentence}"
+        if turn.score is not None:
+            line += f" (score {turn.score:.1f})"
+        line = truncate_to_tokens(line, self.summary_line_tokens)
+        self._summary.append(line)
+        self._summary_tokens.append(count_tokens(line))
+
+    def _render(self) -> str:
+        if not self._recent and not self._summary:
+            return ""
+        recent = "\n".join(self._recent_text)
+        budget = self.max_tokens - count_tokens(recent)
+
+        # Oldest summary lines are the first to go when the budget is tight
+        kept, used = [], 0
+        for line, tokens in zip(reversed(self._summary), reversed(self._summary_tokens)):
+            if used + tokens + 1 > budget:
+                break
+            kept.append(line)
+            used += tokens + 1
+
+        parts = []
+        if kept:
+            omitted = len(self._summary) - len(kept)
+            header = "Earlier turns (summary)" + (f", {omitted} older omitted" if omitted else "") + ":"
+            parts.append(header + "\n" + "\n".join(reversed(kept)))
+        if recent:
+            parts.append("Recent turns:\n" + recent)
+        text = "\n\n".join(parts)
+        # Headers and very long recent turns can still overflow: hard cut, keeping the newest text
+        if count_tokens(text) > self.max_tokens:
+            text = _truncate_head(text, self.max_tokens)
+        return text
+
+
+def _truncate_head(text: str, max_tokens: int) -> str:
+    """Keep the last max_tokens tokens of text"""
+    keep = max(1, max_tokens - count_tokens("..."))
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        return "..." + encoding.decode(tokens[-keep:])
+    matches = list(_HEURISTIC_TOKEN.finditer(text))
+    return "..." + text[matches[-keep].start():]
@@ -0,0 +1,69 @@
+"""
+CPU inference backends for the transformer classifiers
+
+- torch: fp32 PyTorch (default)
+- int8:  PyTorch dynamic int8 quantization of every nn.Linear (CPU only)
+- onnx:  ONNX Runtime graph exported with optimum (optional dependency)
+
+The reranker and the emotion model pick their backend from RERANKER_BACKEND
+and EMOTION_BACKEND, both defaulting to INFERENCE_BACKEND.
+"""
+
+import logging
+import os
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "int8", "onnx")
+
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch")
+RERANKER_BACKEND = os.getenv("RERANKER_BACKEND", INFERENCE_BACKEND)
+EMOTION_BACKEND = os.getenv("EMOTION_BACKEND", INFERENCE_BACKEND)
+ONNX_PROVIDER = os.getenv("ONNX_PROVIDER", "CPUExecutionProvider")
+
+
+def load_classifier(model_name: str, kind: str, backend: str = "torch", device: str = "cpu"):
+    """
+    Load a sequence classifier for kind "text" (cross-encoder) or "audio" (wav2vec2).
+    Every backend returns a callable whose output has .logits as a torch tensor.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {BACKENDS}")
+
+    if backend == "onnx":
+        return _load_onnx(model_name, kind)
+
+    if kind == "text":
+        from transformers import AutoModelForSequenceClassification
+        model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    else:
+        from transformers import Wav2Vec2ForSequenceClassification
+        model = Wav2Vec2ForSequenceClassification.from_pretrained(model_name)
+    model.eval()
+
+    if backend == "int8":
+        if device != "cpu":
+            raise ValueError("int8 dynamic quantization only runs on CPU")
+        logger.info(f"Quantizing {model_name} to dynamic int8")
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    return model.to(device)
+
+
+def _load_onnx(model_name: str, kind: str):
+    try:
+        from optimum.onnxruntime import (
+            ORTModelForAudioClassification,
+            ORTModelForSequenceClassification,
+        )
+    except ImportError as e:
+        raise RuntimeError(
+            "The onnx inference backend needs optimum and onnxruntime: "
+            "pip install 'optimum[onnxruntime]'"
+        ) from e
+
+    model_cls = ORTModelForSequenceClassification if kind == "text" else ORTModelForAudioClassification
+    logger.info(f"Exporting {model_name} to ONNX Runtime ({ONNX_PROVIDER})")
+    return model_cls.from_pretrained(model_name, export=True, provider=ONNX_PROVIDER)
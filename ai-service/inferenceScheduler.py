@@ -0,0 +1,169 @@
+"""
+Cross-session micro-batching for model inference
+
+Requests from all interview sessions are collected for a short window and
+run as one padded batch, then each caller's future gets its own result.
+With many concurrent sessions this turns many batch-of-one forwards into a
+few larger ones.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_schedulers: Dict[str, "MicroBatchScheduler"] = {}
+_schedulers_lock = threading.Lock()
+_STOP = object()  # queued by close(); the worker exits when it reaches it
+
+
+def _register(scheduler: "MicroBatchScheduler") -> str:
+    """Stats key for a new scheduler: its name, suffixed when the name is taken"""
+    with _schedulers_lock:
+        key, n = scheduler.name, 1
+        while key in _schedulers:
+            n += 1
+            key = f"{scheduler.name}#{n}"
+        _schedulers[key] = scheduler
+        return key
+
+
+class MicroBatchScheduler:
+    """Collect requests for window_ms (or until max_batch_size) and run them together"""
+
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        window_ms: float = 15,
+        max_batch_size: int = 32,
+    ):
+        """batch_fn receives a list of items and must return one result per item, in order"""
+        self.name = name
+        self.batch_fn = batch_fn
+        self.window_seconds = window_ms / 1000
+        self.max_batch_size = max_batch_size
+
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._metrics_lock = threading.Lock()
+        self._batch_sizes: Counter = Counter()
+        self._items = 0
+        self._batches = 0
+        self._max_queue_depth = 0
+        self._last_batch_ms = 0.0
+        self._closed = False
+
+        self._worker = threading.Thread(target=self._run, name=f"batcher-{name}", daemon=True)
+        self._worker.start()
+        self.key = _register(self)
+
+    def submit(self, item: Any) -> Future:
+        """Queue one request; the future resolves when its batch has run"""
+        if self._closed:
+            raise RuntimeError(f"Scheduler {self.key} is closed")
+        future: Future = Future()
+        self._queue.put((item, future))
+        with self._metrics_lock:
+            self._max_queue_depth = max(self._max_queue_depth, self._queue.qsize())
+        return future
+
+    def __call__(self, item: Any) -> Any:
+        """Blocking submit (for callers already running in a worker thread)"""
+        return self.submit(item).result()
+
+    async def asubmit(self, item: Any) -> Any:
+        return await asyncio.wrap_future(self.submit(item))
+
+    def _collect(self) -> Optional[List[tuple]]:
+        """Next batch, or None once close() has been called and the queue is drained"""
+        first = self._queue.get()  # block until there is work
+        if first is _STOP:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.window_seconds
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                self._queue.put(_STOP)  # run this batch, stop on the next collect
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            items = [item for item, _ in batch]
+            futures = [future for _, future in batch]
+            start = time.perf_counter()
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(futures):
+                    raise RuntimeError(f"batch_fn returned {len(results)} results for {len(futures)} items")
+                for future, result in zip(futures, results):
+                    future.set_result(result)
+            except Exception as e:
+                logger.error(f"Batched inference failed in {self.name}: {e}")
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+
+            with self._metrics_lock:
+                self._batches += 1
+                self._items += len(batch)
+                self._batch_sizes[len(batch)] += 1
+                self._last_batch_ms = round((time.perf_counter() - start) * 1000, 1)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Stop the worker thread once already-queued requests have run"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._worker.join(timeout)
+        if not self._worker.is_alive():
+            # Requests that raced with close() and landed behind the stop marker
+            while True:
+                try:
+                    entry = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is not _STOP and not entry[1].done():
+                    entry[1].set_exception(RuntimeError(f"Scheduler {self.key} is closed"))
+        with _schedulers_lock:
+            if _schedulers.get(self.key) is self:
+                del _schedulers[self.key]
+
+    def stats(self) -> Dict:
+        with self._metrics_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "last_batch_ms": self._last_batch_ms,
+                "window_ms": self.window_seconds * 1000,
+                "max_batch_size": self.max_batch_size,
+            }
+
+
+def get_scheduler_stats() -> Dict:
+    """Metrics of every open scheduler in this process"""
+    with _schedulers_lock:
+        schedulers = list(_schedulers.items())
+    return {key: scheduler.stats() for key, scheduler in schedulers}
@@ -1,32 +1,47 @@
 from datetime import datetime, timedelta
+import asyncio
 import json
+import logging
 import os
-from typing import Dict
+from typing import AsyncIterator, Dict
 
 # Use absolute imports to avoid package context issues when running uvicorn main:app
-from whisperASR import WhisperASR
+from audioDecoding import load_audio
+from conversationMemory import ConversationMemory
 from interviewQuestionGenerator import InterviewQuestionGenerator
-from answerEvaluator import AnswerEvaluator
-from voiceAnalysis import VoiceAnalysis
-from skillMatcher import SkillMatcher
+from llmClients import get_chain, get_chat_model
+from modelRegistry import get_model_registry
+from turnPipeline import TurnPipeline
+
+logger = logging.getLogger(__name__)
+
+# Reranker dimensions as shown in the report
+DIMENSION_LABELS = {
+    "relevance": "回答相关性",
+    "completeness": "要点覆盖",
+    "depth": "技术深度",
+    "clarity": "表达清晰",
+}
 
 class AIInterviewEngine:
     def __init__(self, job_description: str, candidate_info: Dict):
         self.job_desc = job_description
         self.candidate_info = candidate_info
         
-        # 初始化所有组件
-        self.asr = WhisperASR(model_size="base")
+        # 初始化所有组件（模型由进程级注册表共享，只加载一次）
+        models = get_model_registry()
+        self.asr = models.whisper_asr()
         api_key = os.getenv("DEEPSEEK_API_KEY", candidate_info.get("api_key", ""))
         if not api_key:
             raise ValueError("DEEPSEEK_API_KEY is required. Please set it in environment variables or candidate_info.")
+        self.api_key = api_key
         self.question_generator = InterviewQuestionGenerator(
             api_key=api_key,
             model_name="deepseek-chat"
         )
-        self.evaluator = AnswerEvaluator()  # AnswerEvaluator doesn't need API key
-        self.voice_analyzer = VoiceAnalysis()
-        self.skill_matcher = SkillMatcher()
+        self.evaluator = models.answer_evaluator()  # AnswerEvaluator doesn't need API key
+        self.voice_analyzer = models.voice_analysis()
+        self.skill_matcher = models.skill_matcher()
         
         # 面试状态
         self.interview_state = {
@@ -34,43 +49,126 @@ class AIInterviewEngine:
             "questions_asked": [],
             "answers": [],
             "scores": [],
+            "expected_points": {},  # question -> expected skills from the generator
             "start_time": datetime.now(),
             "status": "in_progress"
         }
+        # Rolling, token-budgeted history for question prompts
+        self.memory = ConversationMemory()
+        self.final_report = None
+        self._narrative_task = None
         
     async def conduct_interview(self, audio_stream):
-        """主面试流程"""
+        """主面试流程（结束时返回数值报告，不等待叙述性报告）"""
+        async for event in self.conduct_interview_stream(audio_stream):
+            if event["type"] == "final":
+                return event["data"]
+        return None
+    
+    async def conduct_interview_stream(self, audio_stream) -> AsyncIterator[Dict]:
+        """
+        主面试流程（流式）
+        Yields {"type": "token", "text": ...} while the next question is generated
+        ({"type": "replace", ...} if generation failed midway and a fallback
+        question replaces the partial text), then {"type": "final", "data": <conduct_interview result>}. When the
+        interview ends the final event is {"action": "end_interview"} and the
+        report is built separately by build_report (a background job).
+        """
+        from interviewQuestionGenerator import InterviewPhase
         
-        # 1. Transcribe audio
-        transcript = await self.asr.transcribe_realtime(audio_stream)
+        pipeline = TurnPipeline()
+        
+        # 1. Transcribe audio (callers that already have a transcript pass {"text": ...}).
+        # The answer is decoded once; ASR, emotion and speech analysis share the buffer.
+        if isinstance(audio_stream, dict) and "text" in audio_stream:
+            transcript = {"text": audio_stream["text"]}
+            audio = None
+        else:
+            audio = await pipeline.run("decode_audio", asyncio.to_thread(load_audio, audio_stream))
+            # Word timestamps let speech-pattern analysis time pauses and rate per word
+            transcript = await pipeline.run(
+                "transcribe", self.asr.transcribe_realtime(audio.samples, word_timestamps=True)
+            )
         
         # If it's the first question
         if not self.interview_state["questions_asked"]:
-            from interviewQuestionGenerator import InterviewPhase
-            question_result = self.question_generator.generate_question(
-                job_description=self.job_desc,
-                candidate_info=self.candidate_info,
-                phase=InterviewPhase.INTRODUCTION,
-                difficulty="easy",
-                question_type="general"
-            )
+            question_result = None
+            async for event in self.question_generator.astream_question(**self._question_request(
+                InterviewPhase.INTRODUCTION, "easy", "general"
+            )):
+                if event["type"] == "result":
+                    question_result = event["data"]
+                else:
+                    yield event
             question = question_result.get("question", "请介绍一下你自己。")
             self.interview_state["current_question"] = question
-            return {"action": "ask_question", "question": question}
+            self.interview_state["expected_points"][question] = question_result.get("expected_skills", [])
+            yield {"type": "final", "data": {
+                "action": "ask_question",
+                "question": question,
+                "phase": InterviewPhase.INTRODUCTION.value,
+                "timings": pipeline.report()
+            }}
+            return
         
-        # 2. Evaluate answer
+        # 2. Fan out independent stages: reranker scoring and voice analysis run in
+        # worker threads while the next technical question is drafted over the network
         current_question = self.interview_state["current_question"]
-        evaluation = self.evaluator.evaluate_answer(
+        self.memory.add_turn(current_question, transcript["text"])
+        evaluation_task = pipeline.start_in_thread(
+            "evaluate",
+            self.evaluator.evaluate_answer,
             question=current_question,
             answer=transcript["text"],
             expected_points=self._get_expected_points(current_question)
         )
+        voice_task = (
+            pipeline.start_in_thread("voice_analysis", self.voice_analyzer.analyze_emotion, audio)
+            if audio is not None else None
+        )
+        speech_task = (
+            pipeline.start_in_thread(
+                "speech_patterns", self.voice_analyzer.analyze_speech_patterns,
+                audio, transcript["text"], transcript.get("segments")
+            )
+            if audio is not None else None
+        )
+        draft = pipeline.start_stream("draft_question", self.question_generator.astream_question(
+            **self._question_request(
+                InterviewPhase.TECHNICAL, "medium", "technical",
+                history=self.memory.render()
+            )
+        ))
+        
+        try:
+            evaluation = await evaluation_task
+        except BaseException:
+            # Nothing will consume the side stages of a failed turn
+            draft.cancel()
+            for task in (voice_task, speech_task):
+                if task is not None:
+                    task.cancel()
+            raise
+        voice_analysis = None
+        if voice_task is not None:
+            try:
+                voice_analysis = await voice_task
+            except Exception as e:
+                logger.error(f"Voice analysis failed: {e}")
+        speech_patterns = None
+        if speech_task is not None:
+            try:
+                speech_patterns = await speech_task
+            except Exception as e:
+                logger.error(f"Speech pattern analysis failed: {e}")
         
         # 3. Save answer and score
         self.interview_state["answers"].append({
             "question": current_question,
             "answer": transcript["text"],
             "evaluation": evaluation,
+            "voice_analysis": voice_analysis,
+            "speech_patterns": speech_patterns,
             "timestamp": datetime.now().isoformat()
         })
         self.interview_state["scores"].append(evaluation["total_score"])
@@ -79,7 +177,8 @@ class AIInterviewEngine:
         if self._should_continue_interview():
             # Generate next question or follow-up
             if evaluation["total_score"] < 6.0:
-                # Score is low, follow-up
+                # Score is low, follow-up (depends on the evaluation, so the draft is dropped)
+                draft.cancel()
                 strengths = []
                 weaknesses = []
                 if "feedback" in evaluation:
@@ -89,38 +188,67 @@ class AIInterviewEngine:
                         strengths = ["回答基本相关"]
                     if "需要" in feedback or "不足" in feedback:
                         weaknesses = ["需要更多细节"]
-                follow_up_result = self.question_generator.generate_follow_up(
+                follow_up_result = None
+                follow_up_events = self.question_generator.astream_follow_up(
                     original_question=current_question,
                     candidate_answer=transcript["text"],
                     strengths=strengths,
                     weaknesses=weaknesses
                 )
+                async for event in follow_up_events:
+                    if event["type"] == "result":
+                        follow_up_result = event["data"]
+                    else:
+                        yield event
                 next_question = follow_up_result.get("follow_up_question", "请详细说明一下。")
+                phase = "follow_up"
             else:
-                # Generate new question
-                from interviewQuestionGenerator import InterviewPhase
-                next_result = self.question_generator.generate_question(
-                    job_description=self.job_desc,
-                    candidate_info=self.candidate_info,
-                    phase=InterviewPhase.TECHNICAL,
-                    difficulty="medium",
-                    question_type="technical",
-                    history=f"Previous answer: {transcript['text']}"
-                )
+                # Use the drafted question: replay what was generated so far, then stream the rest
+                next_result = None
+                async for event in draft:
+                    if event["type"] == "result":
+                        next_result = event["data"]
+                    else:
+                        yield event
                 next_question = next_result.get("question", "请继续回答下一个问题。")
+                self.interview_state["expected_points"][next_question] = next_result.get("expected_skills", [])
+                phase = InterviewPhase.TECHNICAL.value
             
             self.interview_state["current_question"] = next_question
             self.interview_state["questions_asked"].append(next_question)
             
-            return {
+            yield {"type": "final", "data": {
                 "action": "ask_question",
                 "question": next_question,
-                "previous_score": evaluation["total_score"]
-            }
+                "previous_score": evaluation["total_score"],
+                "phase": phase,
+                "timings": pipeline.report()
+            }}
         else:
             # End interview
+            draft.cancel()
             self.interview_state["status"] = "completed"
-            return await self._generate_final_report()
+            yield {"type": "final", "data": {
+                "action": "end_interview",
+                "previous_score": evaluation["total_score"],
+                "timings": pipeline.report()
+            }}
+    
+    def _question_request(self, phase, difficulty: str, question_type: str, history: str = "") -> Dict:
+        """Generator arguments for a question"""
+        return {
+            "job_description": self.job_desc,
+            "candidate_info": self.candidate_info,
+            "phase": phase,
+            "difficulty": difficulty,
+            "question_type": question_type,
+            "history": history,
+            "exclude": self.interview_state["questions_asked"]
+        }
+    
+    def _get_expected_points(self, question: str) -> list:
+        """Expected points recorded when the question was generated"""
+        return self.interview_state["expected_points"].get(question, [])
     
     def _should_continue_interview(self) -> bool:
         """Determine if continue interview"""
@@ -137,32 +265,53 @@ class AIInterviewEngine:
         
         return True
     
-    async def _generate_final_report(self) -> Dict:
-        """Generate final interview report"""
-        # Analyze audio features
-        audio_features = self.voice_analyzer.analyze_speech_patterns(
-            self.interview_state.get("audio_file"),
-            " ".join([a["answer"] for a in self.interview_state["answers"]])
-        )
+    async def _generate_final_report(self, pipeline: TurnPipeline = None) -> Dict:
+        """
+        Generate final interview report.
+        Speech analytics and skill matching run in worker threads while the
+        narrative LLM call runs on the event loop; the numeric report is
+        returned as soon as the first two finish and the narrative is attached
+        later (see report_narrative).
+        """
+        pipeline = pipeline or TurnPipeline()
+        answers = self.interview_state["answers"]
         
-        # Skill matching
-        resume_text = self.candidate_info.get("resume", "")
-        skill_match = self.skill_matcher.match_skills(resume_text, self.job_desc)
+        self._narrative_task = pipeline.start("report_narrative", self._generate_narrative())
+        # Per-answer speech patterns were computed from each turn's audio; merge them
+        per_answer = [a["speech_patterns"] for a in answers if a.get("speech_patterns")]
+        if per_answer:
+            voice_task = pipeline.start_in_thread(
+                "speech_patterns", self.voice_analyzer.merge_speech_patterns, per_answer
+            )
+        else:
+            voice_task = pipeline.start_in_thread(
+                "speech_patterns",
+                self.voice_analyzer.analyze_speech_patterns,
+                None,
+                " ".join([a["answer"] for a in answers])
+            )
+        skill_task = pipeline.start_in_thread(
+            "skill_match",
+            self.skill_matcher.match_skills,
+            self.candidate_info.get("resume", ""),
+            self.job_desc
+        )
+        audio_features, skill_match = await asyncio.gather(voice_task, skill_task)
         
         # Overall score
         technical_score = sum(self.interview_state["scores"]) / len(self.interview_state["scores"])
         communication_score = audio_features["confidence_indicator"] / 10  # 转换为10分制
         overall_score = technical_score * 0.7 + communication_score * 0.3
         
-        return {
+        self.final_report = {
             "action": "end_interview",
             "report": {
-                "candidate_info": self.candidate_info,
+                "candidate_info": self._public_candidate_info(),
                 "technical_assessment": {
                     "overall_score": round(overall_score, 1),
                     "technical_score": round(technical_score, 1),
                     "communication_score": round(communication_score, 1),
-                    "detailed_scores": [a["evaluation"] for a in self.interview_state["answers"]]
+                    "detailed_scores": [a["evaluation"] for a in answers]
                 },
                 "skill_match": skill_match,
                 "voice_analysis": audio_features,
@@ -173,6 +322,105 @@ class AIInterviewEngine:
                     "weaknesses": self._identify_weaknesses()
                 },
                 "recommendation": self._generate_recommendation(overall_score),
-                "suggested_questions": self._suggest_followup_questions()
+                "suggested_questions": self._suggest_followup_questions(),
+                "narrative": None,
+                "narrative_status": "pending"
             }
-        }
\ No newline at end of file
+        }
+        return self.final_report
+    
+    async def build_report(self, job=None) -> Dict:
+        """
+        Full final report for a background job: numeric sections first
+        (published as the job's partial result), then the narrative.
+        """
+        pipeline = TurnPipeline()
+        if job is not None:
+            job.set_progress("analysis", 0.1)
+        try:
+            report = await self._generate_final_report(pipeline)
+        except BaseException:
+            # No report to attach it to; don't leave the narrative call running unobserved
+            if self._narrative_task is not None:
+                self._narrative_task.cancel()
+            raise
+        if job is not None:
+            job.set_progress("narrative", 0.6, partial=report)
+        await self.report_narrative()
+        self.final_report["timings"] = pipeline.report()
+        return self.final_report
+    
+    async def report_narrative(self) -> Dict:
+        """Wait for the narrative started by _generate_final_report and attach it to the report"""
+        try:
+            narrative = await self._narrative_task
+            status = "ready"
+        except Exception as e:
+            logger.error(f"Report narrative failed: {e}")
+            narrative, status = None, "failed"
+        self.final_report["report"]["narrative"] = narrative
+        self.final_report["report"]["narrative_status"] = status
+        return {"narrative": narrative, "narrative_status": status}
+    
+    async def _generate_narrative(self) -> str:
+        """LLM write-up of the interview (REPORT_PROMPT), independent of the numeric sections"""
+        from interviewQuestionGenerator import REPORT_PROMPT
+        from langchain_core.output_parsers import StrOutputParser
+        
+        chain = get_chain(
+            "report",
+            REPORT_PROMPT,
+            get_chat_model(self.api_key, "deepseek-chat", temperature=0.5, max_tokens=800),
+            StrOutputParser()
+        )
+        answers = self.interview_state["answers"]
+        scores = self.interview_state["scores"]
+        answer_summaries = [
+            f"问题{i+1}: {a['question'][:50]}...\n"
+            f"回答摘要: {a['answer'][:100]}...\n"
+            f"得分: {a['evaluation']['total_score']:.1f}/10"
+            for i, a in enumerate(answers[:3])
+        ]
+        return await chain.ainvoke({
+            "candidate_info": json.dumps(self._public_candidate_info(), ensure_ascii=False, indent=2),
+            "job_description": self.job_desc,
+            "total_questions": len(self.interview_state["questions_asked"]),
+            "average_score": round(sum(scores) / len(scores), 1) if scores else 0,
+            "phase_performance": ", ".join(f"{score:.1f}" for score in scores),
+            "answer_summaries": "\n\n".join(answer_summaries)
+        })
+    
+    def _public_candidate_info(self) -> Dict:
+        """Candidate info without credentials"""
+        return {k: v for k, v in self.candidate_info.items() if k != "api_key"}
+    
+    def _dimension_averages(self) -> Dict[str, float]:
+        """Average of each reranker dimension (0-1) across all answers"""
+        totals: Dict[str, list] = {}
+        for answer in self.interview_state["answers"]:
+            for dimension, score in answer["evaluation"].get("detailed_scores", {}).items():
+                totals.setdefault(dimension, []).append(score)
+        return {d: sum(v) / len(v) for d, v in totals.items()}
+    
+    def _identify_strengths(self) -> list:
+        return [DIMENSION_LABELS.get(d, d) for d, avg in self._dimension_averages().items() if avg >= 0.7]
+    
+    def _identify_weaknesses(self) -> list:
+        return [DIMENSION_LABELS.get(d, d) for d, avg in self._dimension_averages().items() if avg < 0.6]
+    
+    def _generate_recommendation(self, overall_score: float) -> str:
+        if overall_score >= 8.5:
+            return "Strongly recommend"
+        elif overall_score >= 7.0:
+            return "Recommend"
+        elif overall_score >= 5.5:
+            return "Consider"
+        elif overall_score >= 4.0:
+            return "Reserved recommend"
+        return "Not recommend"
+    
+    def _suggest_followup_questions(self, limit: int = 3) -> list:
+        """Lowest-scoring questions below 6/10, worth revisiting in a next round"""
+        weak = [a for a in self.interview_state["answers"] if a["evaluation"]["total_score"] < 6.0]
+        weak.sort(key=lambda a: a["evaluation"]["total_score"])
+        return [a["question"] for a in weak[:limit]]
@@ -4,17 +4,22 @@ AI Voice Interview System
 
 import os
 import json
-from typing import Dict, List, Optional, Any
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Any
 from datetime import datetime
 from dataclasses import dataclass
 from enum import Enum
 import logging
 
-from langchain_core.prompts import ChatPromptTemplate, HumanMessagePromptTemplate
-from langchain_openai import ChatOpenAI
+from langchain_core.prompts import ChatPromptTemplate, HumanMessagePromptTemplate, SystemMessagePromptTemplate
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
 from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
 
+from conversationMemory import ConversationMemory, count_tokens
+from llmClients import get_chain, get_chat_model
+from questionPool import get_question_pool, profile_key
+from turnPipeline import TurnPipeline
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -50,95 +55,191 @@ class InterviewPhase(Enum):
     SCENARIO = "scenario"
     CLOSING = "closing"
 
+# Prompt templates are compiled once at import and shared by every engine
+# Prompt template for generating questions
+QUESTION_PROMPT = ChatPromptTemplate.from_messages([
+    SystemMessage(content="""
+    你是一位专业的面试官，擅长根据职位要求和候选人背景生成精准的面试问题。
+    你的任务是生成高质量、有深度的面试问题。
+    """),
+    HumanMessagePromptTemplate.from_template("""
+    请根据以下信息生成一个面试问题：
+
+    **职位描述**：
+    {job_description}
+
+    **候选人背景**：
+    {candidate_info}
+
+    **当前面试阶段**：{phase}
+    **问题难度**：{difficulty}
+    **问题类型**：{question_type}
+
+    **之前的对话历史**：
+    {history}
+
+    **生成要求**：
+    1. 问题要具体、可衡量
+    2. 针对候选人的经验级别
+    3. 能有效评估相关能力
+    4. 避免过于宽泛的问题
+
+    请以JSON格式返回：
+    {{
+        "question": "生成的问题文本",
+        "reasoning": "为什么问这个问题",
+        "expected_skills": ["期望考察的技能列表"],
+        "evaluation_criteria": ["评估标准列表"]
+    }}
+    """)
+])
+
+# Prompt template for generating follow-up questions
+FOLLOW_UP_PROMPT = ChatPromptTemplate.from_messages([
+    SystemMessage(content="""
+    你是一位敏锐的面试官，擅长通过追问深入挖掘候选人的能力。
+    """),
+    HumanMessagePromptTemplate.from_template("""
+    基于以下信息生成一个跟进问题：
+
+    **原始问题**：{original_question}
+
+    **候选人回答**：{candidate_answer}
+
+    **回答质量分析**：
+    优势：{strengths}
+    不足：{weaknesses}
+
+    **生成要求**：
+    1. 针对回答中的不足或模糊点
+    2. 帮助澄清技术细节
+    3. 验证实际经验深度
+    4. 鼓励候选人提供具体例子
+
+    请以JSON格式返回：
+    {{
+        "follow_up_question": "跟进问题",
+        "focus_area": "重点关注领域",
+        "purpose": "追问的目的"
+    }}
+    """)
+])
+
+# Prompt template for answer evaluation
+EVALUATION_PROMPT = ChatPromptTemplate.from_messages([
+    SystemMessage(content="""
+    你是一位专业的面试评估专家。请严格按照评分标准进行评估。
+
+    评分维度：
+    1. 相关性 (0-10分)：回答是否直接针对问题
+    2. 完整性 (0-10分)：是否全面覆盖问题要点
+    3. 深度 (0-10分)：技术深度和思考深度
+    4. 清晰度 (0-10分)：表达是否清晰有条理
+    5. 具体性 (0-10分)：是否提供具体例子和细节
+
+    评估步骤：
+    1. 分析回答内容
+    2. 对照每个维度评分
+    3. 提供具体理由
+    4. 给出改进建议
+    """),
+    HumanMessagePromptTemplate.from_template("""
+    请评估以下面试回答：
+
+    **问题**：{question}
+
+    **回答**：{answer}
+
+    **期望考察的技能**：{expected_skills}
+
+    **请以JSON格式返回评估结果**：
+    {{
+        "scores": {{
+            "relevance": 分数,
+            "completeness": 分数,
+            "depth": 分数,
+            "clarity": 分数,
+            "specificity": 分数
+        }},
+        "total_score": 总分（50分制）,
+        "strengths": ["优势1", "优势2"],
+        "weaknesses": ["不足1", "不足2"],
+        "detailed_feedback": "详细的反馈和建议",
+        "follow_up_suggestions": ["建议的追问方向1", "建议的追问方向2"]
+    }}
+    """)
+])
+
+# Prompt template for the final report
+REPORT_PROMPT = ChatPromptTemplate.from_messages([
+    SystemMessage(content="""
+    你是一位资深的人力资源专家和面试评估官。
+    请基于以下面试数据生成专业的面试评估报告。
+
+    报告应包括：
+    1. 总体评价和推荐等级
+    2. 技术能力分析
+    3. 软技能评估
+    4. 优势与亮点
+    5. 改进建议
+    6. 是否推荐及理由
+    """),
+    HumanMessagePromptTemplate.from_template("""
+    **候选人信息**：
+    {candidate_info}
+
+    **职位要求**：
+    {job_description}
+
+    **面试表现数据**：
+    总问题数：{total_questions}
+    平均得分：{average_score}/10
+    各阶段表现：{phase_performance}
+
+    **关键回答摘要**：
+    {answer_summaries}
+
+    **请生成详细的面试评估报告**。
+    """)
+])
+
+# Prompt template for the lightweight /analyze reply
+ANALYZE_PROMPT = ChatPromptTemplate.from_messages([
+    SystemMessagePromptTemplate.from_template("""你是一位专业的AI面试官，正在面试一位{level}级别的{industry}开发工程师。
+
+你的任务：
+1. 对候选人的回答给出简短、专业的反馈
+2. 可以追问细节或提出下一个相关问题
+3. 保持友好但专业的语调
+4. 回复要简洁，控制在2-3句话内"""),
+    HumanMessagePromptTemplate.from_template("候选人的回答：{text}\n\n请给出你的回复（可以是反馈、追问或下一个问题）：")
+])
+
 # Interview question generator
 class InterviewQuestionGenerator:
     """Interview question generator"""
     
-    def __init__(self, api_key: str, model_name: str = "deepseek-chat"):
+    def __init__(self, api_key: str, model_name: str = "deepseek-chat", use_pool: bool = True):
         """Initialize generator"""
         os.environ["DEEPSEEK_API_KEY"] = api_key
         
-        # Use ChatOpenAI compatible with DeepSeek API
-        self.llm = ChatOpenAI(
-            model_name=model_name,
-            temperature=0.7,
-            max_tokens=500,
-            streaming=False,
-            base_url="https://api.deepseek.com/v1",
-            api_key=api_key
-        )
+        # Precomputed questions are served first; the LLM only runs on a pool miss
+        self.pool = get_question_pool() if use_pool else None
+        
+        # Pooled ChatOpenAI client compatible with DeepSeek API
+        self.llm = get_chat_model(api_key, model_name, temperature=0.7, max_tokens=500)
         
         # Define output parser
         self.output_parser = JsonOutputParser()
         
-        # Define prompt template for generating questions
-        self.question_prompt = ChatPromptTemplate.from_messages([
-            SystemMessage(content="""
-            你是一位专业的面试官，擅长根据职位要求和候选人背景生成精准的面试问题。
-            你的任务是生成高质量、有深度的面试问题。
-            """),
-            HumanMessagePromptTemplate.from_template("""
-            请根据以下信息生成一个面试问题：
-            
-            **职位描述**：
-            {job_description}
-            
-            **候选人背景**：
-            {candidate_info}
-            
-            **当前面试阶段**：{phase}
-            **问题难度**：{difficulty}
-            **问题类型**：{question_type}
-            
-            **之前的对话历史**：
-            {history}
-            
-            **生成要求**：
-            1. 问题要具体、可衡量
-            2. 针对候选人的经验级别
-            3. 能有效评估相关能力
-            4. 避免过于宽泛的问题
-            
-            请以JSON格式返回：
-            {{
-                "question": "生成的问题文本",
-                "reasoning": "为什么问这个问题",
-                "expected_skills": ["期望考察的技能列表"],
-                "evaluation_criteria": ["评估标准列表"]
-            }}
-            """)
-        ])
+        # Chains are composed once per pooled client and shared across engines
+        self.question_prompt = QUESTION_PROMPT
+        self.follow_up_prompt = FOLLOW_UP_PROMPT
+        self.question_chain = get_chain("question", QUESTION_PROMPT, self.llm, self.output_parser)
+        self.follow_up_chain = get_chain("follow_up", FOLLOW_UP_PROMPT, self.llm, self.output_parser)
         
-        # Define prompt template for generating follow-up questions
-        self.follow_up_prompt = ChatPromptTemplate.from_messages([
-            SystemMessage(content="""
-            你是一位敏锐的面试官，擅长通过追问深入挖掘候选人的能力。
-            """),
-            HumanMessagePromptTemplate.from_template("""
-            基于以下信息生成一个跟进问题：
-            
-            **原始问题**：{original_question}
-            
-            **候选人回答**：{candidate_answer}
-            
-            **回答质量分析**：
-            优势：{strengths}
-            不足：{weaknesses}
-            
-            **生成要求**：
-            1. 针对回答中的不足或模糊点
-            2. 帮助澄清技术细节
-            3. 验证实际经验深度
-            4. 鼓励候选人提供具体例子
-            
-            请以JSON格式返回：
-            {{
-                "follow_up_question": "跟进问题",
-                "focus_area": "重点关注领域",
-                "purpose": "追问的目的"
-            }}
-            """)
-        ])
+        # Prompt size of every question request, to keep an eye on history growth
+        self.prompt_stats = {"calls": 0, "last_prompt_tokens": 0, "max_prompt_tokens": 0, "total_prompt_tokens": 0}
     
     def generate_question(
         self,
@@ -147,52 +248,134 @@ class InterviewQuestionGenerator:
         phase: InterviewPhase = InterviewPhase.TECHNICAL,
         difficulty: str = "medium",
         question_type: str = "technical",
-        history: str = ""
+        history: str = "",
+        exclude: Optional[List[str]] = None
     ) -> Dict:
         """生成面试问题"""
+        pooled = self._pooled_question(candidate_info, phase, difficulty, question_type, exclude)
+        if pooled is not None:
+            return pooled
         try:
-            # Create chain
-            chain = self.question_prompt | self.llm | self.output_parser
-            
-            # Prepare input
-            input_data = {
-                "job_description": job_description,
-                "candidate_info": json.dumps(candidate_info, ensure_ascii=False),
-                "phase": phase.value,
-                "difficulty": difficulty,
-                "question_type": question_type,
-                "history": history or "这是第一个问题"
-            }
-            
             # Call chain
-            result = chain.invoke(input_data)
-            
-            # Add metadata
-            result["metadata"] = {
-                "phase": phase.value,
-                "difficulty": difficulty,
-                "type": question_type,
-                "generated_at": datetime.now().isoformat()
-            }
+            result = self.question_chain.invoke(self._question_input(
+                job_description, candidate_info, phase, difficulty, question_type, history
+            ))
+            return self._with_question_metadata(result, phase, difficulty, question_type)
             
-            return result
+        except Exception as e:
+            logger.error(f"生成问题时出错: {e}")
+            return self._default_question(phase, difficulty, question_type, e)
+    
+    async def agenerate_question(
+        self,
+        job_description: str,
+        candidate_info: Dict,
+        phase: InterviewPhase = InterviewPhase.TECHNICAL,
+        difficulty: str = "medium",
+        question_type: str = "technical",
+        history: str = "",
+        exclude: Optional[List[str]] = None
+    ) -> Dict:
+        """生成面试问题（异步，不阻塞事件循环）"""
+        pooled = self._pooled_question(candidate_info, phase, difficulty, question_type, exclude)
+        if pooled is not None:
+            return pooled
+        try:
+            result = await self.question_chain.ainvoke(self._question_input(
+                job_description, candidate_info, phase, difficulty, question_type, history
+            ))
+            return self._with_question_metadata(result, phase, difficulty, question_type)
             
         except Exception as e:
             logger.error(f"生成问题时出错: {e}")
-            # Return default question
-            return {
-                "question": "请介绍一下你最近参与的一个有挑战性的项目？",
-                "reasoning": "考察项目经验和问题解决能力",
-                "expected_skills": ["项目管理", "技术实施", "问题解决"],
-                "evaluation_criteria": ["项目复杂度", "个人贡献", "成果影响"],
-                "metadata": {
-                    "phase": phase.value,
-                    "difficulty": difficulty,
-                    "type": question_type,
-                    "generated_at": datetime.now().isoformat(),
-                    "error": str(e)
-                }
+            return self._default_question(phase, difficulty, question_type, e)
+    
+    def _pooled_question(
+        self,
+        candidate_info: Dict,
+        phase: InterviewPhase,
+        difficulty: str,
+        question_type: str,
+        exclude: Optional[List[str]]
+    ) -> Optional[Dict]:
+        """Random precomputed question for this profile and slot, or None on a miss"""
+        if self.pool is None:
+            return None
+        question = self.pool.draw(
+            profile_key(candidate_info), phase.value, difficulty, question_type, exclude or ()
+        )
+        if question is None:
+            return None
+        result = self._with_question_metadata(question, phase, difficulty, question_type)
+        result["metadata"]["source"] = "pool"
+        return result
+    
+    def _question_input(
+        self,
+        job_description: str,
+        candidate_info: Dict,
+        phase: InterviewPhase,
+        difficulty: str,
+        question_type: str,
+        history: str
+    ) -> Dict:
+        """Prepare question chain input and record its prompt token count"""
+        input_data = {
+            "job_description": job_description,
+            "candidate_info": json.dumps(candidate_info, ensure_ascii=False),
+            "phase": phase.value,
+            "difficulty": difficulty,
+            "question_type": question_type,
+            "history": history or "这是第一个问题"
+        }
+        self._record_prompt_tokens(count_tokens(QUESTION_PROMPT.format(**input_data)))
+        return input_data
+    
+    def _record_prompt_tokens(self, tokens: int) -> None:
+        stats = self.prompt_stats
+        stats["calls"] += 1
+        stats["last_prompt_tokens"] = tokens
+        stats["max_prompt_tokens"] = max(stats["max_prompt_tokens"], tokens)
+        stats["total_prompt_tokens"] += tokens
+        logger.debug(f"Question prompt: {tokens} tokens")
+    
+    def _with_question_metadata(
+        self,
+        result: Dict,
+        phase: InterviewPhase,
+        difficulty: str,
+        question_type: str
+    ) -> Dict:
+        """Add metadata to generated question"""
+        result["metadata"] = {
+            "phase": phase.value,
+            "difficulty": difficulty,
+            "type": question_type,
+            "generated_at": datetime.now().isoformat()
+        }
+        return result
+    
+    def _default_question(
+        self,
+        phase: InterviewPhase,
+        difficulty: str,
+        question_type: str,
+        error: Exception
+    ) -> Dict:
+        """Default question when generation fails"""
+        return {
+            "question": "请介绍一下你最近参与的一个有挑战性的项目？",
+            "reasoning": "考察项目经验和问题解决能力",
+            "expected_skills": ["项目管理", "技术实施", "问题解决"],
+            "evaluation_criteria": ["项目复杂度", "个人贡献", "成果影响"],
+            "metadata": {
+                "phase": phase.value,
+                "difficulty": difficulty,
+                "type": question_type,
+                "generated_at": datetime.now().isoformat(),
+                "error": str(error)
             }
+        }
     
     def generate_follow_up(
         self,
@@ -203,25 +386,138 @@ class InterviewQuestionGenerator:
     ) -> Dict:
         """Generate follow-up question"""
         try:
-            chain = self.follow_up_prompt | self.llm | self.output_parser
+            return self.follow_up_chain.invoke(self._follow_up_input(
+                original_question, candidate_answer, strengths, weaknesses
+            ))
             
-            input_data = {
-                "original_question": original_question,
-                "candidate_answer": candidate_answer,
-                "strengths": ", ".join(strengths) if strengths else "回答比较全面",
-                "weaknesses": ", ".join(weaknesses) if weaknesses else "可以更深入"
-            }
-            
-            result = chain.invoke(input_data)
-            return result
+        except Exception as e:
+            logger.error(f"Error generating follow-up question: {e}")
+            return self._default_follow_up()
+    
+    async def agenerate_follow_up(
+        self,
+        original_question: str,
+        candidate_answer: str,
+        strengths: List[str],
+        weaknesses: List[str]
+    ) -> Dict:
+        """Generate follow-up question (async)"""
+        try:
+            return await self.follow_up_chain.ainvoke(self._follow_up_input(
+                original_question, candidate_answer, strengths, weaknesses
+            ))
             
         except Exception as e:
             logger.error(f"Error generating follow-up question: {e}")
-            return {
-                "follow_up_question": "你能更详细地说明一下具体的实现细节吗？",
-                "focus_area": "技术细节",
-                "purpose": "深入了解实现方案"
-            }
+            return self._default_follow_up()
+    
+    def _follow_up_input(
+        self,
+        original_question: str,
+        candidate_answer: str,
+        strengths: List[str],
+        weaknesses: List[str]
+    ) -> Dict:
+        """Prepare follow-up chain input"""
+        return {
+            "original_question": original_question,
+            "candidate_answer": candidate_answer,
+            "strengths": ", ".join(strengths) if strengths else "回答比较全面",
+            "weaknesses": ", ".join(weaknesses) if weaknesses else "可以更深入"
+        }
+    
+    def _default_follow_up(self) -> Dict:
+        """Default follow-up when generation fails"""
+        return {
+            "follow_up_question": "你能更详细地说明一下具体的实现细节吗？",
+            "focus_area": "技术细节",
+            "purpose": "深入了解实现方案"
+        }
+    
+    async def astream_question(
+        self,
+        job_description: str,
+        candidate_info: Dict,
+        phase: InterviewPhase = InterviewPhase.TECHNICAL,
+        difficulty: str = "medium",
+        question_type: str = "technical",
+        history: str = "",
+        exclude: Optional[List[str]] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Stream a question as it is generated.
+        Yields {"type": "token", "text": ...} for each new piece of the question
+        text, then {"type": "result", "data": <same dict as agenerate_question>}.
+        A pooled question is emitted as a single token. If generation fails after
+        tokens were sent, {"type": "replace", "text": ...} carries the fallback
+        question, which replaces the partial text.
+        """
+        pooled = self._pooled_question(candidate_info, phase, difficulty, question_type, exclude)
+        if pooled is not None:
+            yield {"type": "token", "text": pooled["question"]}
+            yield {"type": "result", "data": pooled}
+            return
+        input_data = self._question_input(
+            job_description, candidate_info, phase, difficulty, question_type, history
+        )
+        result = None
+        streamed = False
+        try:
+            async for event in _astream_json_field(self.question_chain, input_data, "question"):
+                if event["type"] == "result":
+                    result = self._with_question_metadata(event["data"], phase, difficulty, question_type)
+                else:
+                    streamed = True
+                    yield event
+        except Exception as e:
+            logger.error(f"生成问题时出错: {e}")
+            result = self._default_question(phase, difficulty, question_type, e)
+            yield {"type": "replace" if streamed else "token", "text": result["question"]}
+        yield {"type": "result", "data": result}
+    
+    async def astream_follow_up(
+        self,
+        original_question: str,
+        candidate_answer: str,
+        strengths: List[str],
+        weaknesses: List[str]
+    ) -> AsyncIterator[Dict]:
+        """Stream a follow-up question (same events as astream_question)"""
+        input_data = self._follow_up_input(original_question, candidate_answer, strengths, weaknesses)
+        result = None
+        streamed = False
+        try:
+            async for event in _astream_json_field(self.follow_up_chain, input_data, "follow_up_question"):
+                if event["type"] == "result":
+                    result = event["data"]
+                else:
+                    streamed = True
+                    yield event
+        except Exception as e:
+            logger.error(f"Error generating follow-up question: {e}")
+            result = self._default_follow_up()
+            yield {"type": "replace" if streamed else "token", "text": result["follow_up_question"]}
+        yield {"type": "result", "data": result}
+
+
+async def _astream_json_field(chain, input_data: Dict, field: str) -> AsyncIterator[Dict]:
+    """
+    Stream a JSON-producing chain, emitting only the growth of one string field.
+    JsonOutputParser yields progressively more complete partial objects.
+    """
+    emitted = ""
+    latest: Dict = {}
+    async for partial in chain.astream(input_data):
+        if not isinstance(partial, dict):
+            continue
+        latest = partial
+        value = partial.get(field)
+        if isinstance(value, str) and len(value) > len(emitted) and value.startswith(emitted):
+            yield {"type": "token", "text": value[len(emitted):]}
+            emitted = value
+    if field not in latest:
+        raise ValueError(f"LLM output has no '{field}' field")
+    yield {"type": "result", "data": latest}
 
 # Answer evaluation system
 class AnswerEvaluator:
@@ -230,61 +526,12 @@ class AnswerEvaluator:
     def __init__(self, api_key: str):
         os.environ["DEEPSEEK_API_KEY"] = api_key
         
-        self.llm = ChatOpenAI(
-            model_name="deepseek-chat",
-            temperature=0.3,  # Lower temperature to get more consistent evaluation
-            max_tokens=300,
-            base_url="https://api.deepseek.com/v1",
-            api_key=api_key
-        )
-        
-        # Create evaluation prompt
-        self.evaluation_prompt = ChatPromptTemplate.from_messages([
-            SystemMessage(content="""
-            你是一位专业的面试评估专家。请严格按照评分标准进行评估。
-            
-            评分维度：
-            1. 相关性 (0-10分)：回答是否直接针对问题
-            2. 完整性 (0-10分)：是否全面覆盖问题要点
-            3. 深度 (0-10分)：技术深度和思考深度
-            4. 清晰度 (0-10分)：表达是否清晰有条理
-            5. 具体性 (0-10分)：是否提供具体例子和细节
-            
-            评估步骤：
-            1. 分析回答内容
-            2. 对照每个维度评分
-            3. 提供具体理由
-            4. 给出改进建议
-            """),
-            HumanMessagePromptTemplate.from_template("""
-            请评估以下面试回答：
-            
-            **问题**：{question}
-            
-            **回答**：{answer}
-            
-            **期望考察的技能**：{expected_skills}
-            
-            **请以JSON格式返回评估结果**：
-            {{
-                "scores": {{
-                    "relevance": 分数,
-                    "completeness": 分数,
-                    "depth": 分数,
-                    "clarity": 分数,
-                    "specificity": 分数
-                }},
-                "total_score": 总分（50分制）,
-                "strengths": ["优势1", "优势2"],
-                "weaknesses": ["不足1", "不足2"],
-                "detailed_feedback": "详细的反馈和建议",
-                "follow_up_suggestions": ["建议的追问方向1", "建议的追问方向2"]
-            }}
-            """)
-        ])
+        # Lower temperature to get more consistent evaluation
+        self.llm = get_chat_model(api_key, "deepseek-chat", temperature=0.3, max_tokens=300)
         
         # 创建链
-        self.chain = self.evaluation_prompt | self.llm | JsonOutputParser()
+        self.evaluation_prompt = EVALUATION_PROMPT
+        self.chain = get_chain("evaluation", EVALUATION_PROMPT, self.llm, JsonOutputParser())
     
     def evaluate(
         self,
@@ -294,27 +541,48 @@ class AnswerEvaluator:
     ) -> Dict:
         """Evaluate answer quality"""
         try:
-            result = self.chain.invoke({
-                "question": question,
-                "answer": answer,
-                "expected_skills": expected_skills or ["通用技能"]
-            })
-            
-            # Calculate weighted total score (convert to 10-point scale)
-            scores = result.get("scores", {})
-            if scores:
-                total = sum(scores.values()) / len(scores) / 5  # 转换为10分制
-                result["weighted_score"] = round(total, 2)
-            
-            # Add evaluation timestamp
-            result["evaluated_at"] = datetime.now().isoformat()
+            result = self.chain.invoke(self._evaluation_input(question, answer, expected_skills))
+            return self._finalize_evaluation(result)
             
-            return result
+        except Exception as e:
+            logger.error(f"Error evaluating answer: {e}")
+            return self._get_default_evaluation()
+    
+    async def aevaluate(
+        self,
+        question: str,
+        answer: str,
+        expected_skills: List[str] = None
+    ) -> Dict:
+        """Evaluate answer quality (async)"""
+        try:
+            result = await self.chain.ainvoke(self._evaluation_input(question, answer, expected_skills))
+            return self._finalize_evaluation(result)
             
         except Exception as e:
             logger.error(f"Error evaluating answer: {e}")
             return self._get_default_evaluation()
     
+    def _evaluation_input(self, question: str, answer: str, expected_skills: Optional[List[str]]) -> Dict:
+        return {
+            "question": question,
+            "answer": answer,
+            "expected_skills": expected_skills or ["通用技能"]
+        }
+    
+    def _finalize_evaluation(self, result: Dict) -> Dict:
+        """Add weighted score and timestamp to LLM evaluation"""
+        # Calculate weighted total score (convert to 10-point scale)
+        scores = result.get("scores", {})
+        if scores:
+            total = sum(scores.values()) / len(scores) / 5  # 转换为10分制
+            result["weighted_score"] = round(total, 2)
+        
+        # Add evaluation timestamp
+        result["evaluated_at"] = datetime.now().isoformat()
+        
+        return result
+    
     def _get_default_evaluation(self) -> Dict:
         """Get default evaluation result"""
         return {
@@ -361,7 +629,9 @@ class VoiceAnalyzer:
         score = 0.5
         
         # Based on speech rate
-        speech_rate = features.get("speech_rate", 120)
+        speech_rate = features.get("speech_rate")
+        if speech_rate is None:  # no timing (text-only answer)
+            speech_rate = 120
         if 100 <= speech_rate <= 150:
             score += 0.2
         elif speech_rate > 180:
@@ -399,6 +669,12 @@ class AIInterviewEngine:
         self.question_generator = InterviewQuestionGenerator(api_key)
         self.evaluator = AnswerEvaluator(api_key)
         self.voice_analyzer = VoiceAnalyzer()
+        self.report_chain = get_chain(
+            "report",
+            REPORT_PROMPT,
+            get_chat_model(api_key, "deepseek-chat", temperature=0.5, max_tokens=800),
+            StrOutputParser()
+        )
         
         # Interview state
         self.state = {
@@ -412,6 +688,21 @@ class AIInterviewEngine:
             "scores": []
         }
         
+        # Rolling, token-budgeted history for question prompts
+        self.memory = ConversationMemory()
+        
+        # Speculative question generation: while the candidate answers, the
+        # likely "continue" and "next_phase" questions are drafted in background
+        self._speculation: Dict[str, Dict] = {}
+        self.speculation_stats = {
+            "started": 0,
+            "hits": 0,
+            "misses": 0,
+            "discarded": 0,
+            "wasted_tokens_estimate": 0,
+            "disabled": not self.config.get("speculative_generation", True)
+        }
+        
         # Define interview process
         self.phases = [
             (InterviewPhase.INTRODUCTION, "easy", 1),
@@ -422,14 +713,29 @@ class AIInterviewEngine:
             (InterviewPhase.CLOSING, "easy", 1)
         ]
         
+        # Final report: numeric sections are returned first, the LLM narrative later
+        self.final_report: Optional[Dict] = None
+        self._narrative_task: Optional[asyncio.Task] = None
+        
         logger.info(f"AI interview engine initialized, candidate: {candidate_info.name}")
     
     def start_interview(self) -> Dict:
+        """Start interview (blocking wrapper around astart_interview)"""
+        async def run() -> Dict:
+            try:
+                return await self.astart_interview()
+            finally:
+                # Drafts cannot outlive this asyncio.run loop
+                self._discard_speculation()
+        return asyncio.run(run())
+    
+    async def astart_interview(self) -> Dict:
         """Start interview"""
         self.state["status"] = "in_progress"
         
         # Generate first question
-        first_question = self._generate_next_question()
+        first_question = await self._generate_next_question()
+        self.begin_speculation()
         
         return {
             "status": "started",
@@ -444,6 +750,23 @@ class AIInterviewEngine:
         self,
         answer_text: str,
         audio_features: Optional[Dict] = None
+    ) -> Dict:
+        """Submit answer (blocking wrapper around asubmit_answer, waits for the report narrative)"""
+        async def run() -> Dict:
+            try:
+                response = await self.asubmit_answer(answer_text, audio_features)
+            finally:
+                # Drafts cannot outlive this asyncio.run loop
+                self._discard_speculation()
+            if response.get("action") == "complete":
+                await self.report_narrative()
+            return response
+        return asyncio.run(run())
+    
+    async def asubmit_answer(
+        self,
+        answer_text: str,
+        audio_features: Optional[Dict] = None
     ) -> Dict:
         """Submit answer and get next step"""
         if self.state["status"] != "in_progress":
@@ -454,19 +777,24 @@ class AIInterviewEngine:
             return {"error": "No current question"}
         
         current_question = self.state["questions"][-1]
+        pipeline = TurnPipeline()
+        
+        # Next-question drafts run alongside scoring (no-op if already drafting)
+        self.begin_speculation()
         
-        # Evaluate answer
+        # Evaluate answer and analyze voice features (if provided) concurrently
         expected_skills = current_question.get("expected_skills", [])
-        evaluation = self.evaluator.evaluate(
+        evaluation_task = pipeline.start("evaluate", self.evaluator.aevaluate(
             question=current_question["question"],
             answer=answer_text,
             expected_skills=expected_skills
+        ))
+        voice_task = (
+            pipeline.start_in_thread("voice_analysis", self.voice_analyzer.analyze, audio_features)
+            if audio_features else None
         )
-        
-        # Analyze voice features (if provided)
-        voice_analysis = {}
-        if audio_features:
-            voice_analysis = self.voice_analyzer.analyze(audio_features)
+        evaluation = await evaluation_task
+        voice_analysis = await voice_task if voice_task is not None else {}
         
         # Save answer record
         answer_record = {
@@ -479,17 +807,23 @@ class AIInterviewEngine:
         
         self.state["answers"].append(answer_record)
         self.state["scores"].append(evaluation.get("weighted_score", 5.0))
+        self.memory.add_turn(
+            current_question.get("question") or current_question.get("follow_up_question", ""),
+            answer_text,
+            evaluation.get("weighted_score")
+        )
         
         # Determine next action
         action = self._determine_next_action(evaluation)
         
         if action == "follow_up":
-            # Generate follow-up question
-            follow_up = self._generate_follow_up_question(
+            # Generate follow-up question (drafted questions cannot be used)
+            self._discard_speculation()
+            follow_up = await pipeline.run("follow_up", self._generate_follow_up_question(
                 current_question["question"],
                 answer_text,
                 evaluation
-            )
+            ))
             
             response = {
                 "action": "follow_up",
@@ -507,7 +841,8 @@ class AIInterviewEngine:
             
             if next_phase_result["status"] == "interview_completed":
                 # Interview ended
-                final_report = self._generate_final_report()
+                self._discard_speculation()
+                final_report = await pipeline.run("report", self._generate_final_report(pipeline))
                 self.state["status"] = "completed"
                 
                 response = {
@@ -521,7 +856,9 @@ class AIInterviewEngine:
                 }
             else:
                 # Generate next phase question
-                next_question = self._generate_next_question()
+                next_question = await pipeline.run(
+                    "next_question", self._generate_next_question(speculation="next_phase")
+                )
                 
                 response = {
                     "action": "next_phase",
@@ -532,7 +869,9 @@ class AIInterviewEngine:
                 }
         else:
             # Continue current phase
-            next_question = self._generate_next_question()
+            next_question = await pipeline.run(
+                "next_question", self._generate_next_question(speculation="continue")
+            )
             
             response = {
                 "action": "continue",
@@ -542,28 +881,25 @@ class AIInterviewEngine:
                 "question_number": len(self.state["questions"]) + 1
             }
         
+        if self.state["status"] == "in_progress":
+            self.begin_speculation()
+        
+        response["timings"] = pipeline.report()
         return response
     
-    def _generate_next_question(self) -> Dict:
-        """Generate next question"""
-        # Get current phase information
-        phase_info = self._get_current_phase_info()
-        
-        # Build conversation history
-        history = self._build_conversation_history()
+    async def _generate_next_question(self, speculation: Optional[str] = None) -> Dict:
+        """Generate next question, using a drafted one when it matches"""
+        phase = self.state["current_phase"]
         
-        # Generate question
-        question = self.question_generator.generate_question(
-            job_description=self.job_description,
-            candidate_info=self.candidate_info.__dict__,
-            phase=self.state["current_phase"],
-            difficulty=phase_info["difficulty"],
-            question_type=phase_info["type"],
-            history=history
-        )
+        question = await self._take_speculation(speculation, phase) if speculation else None
+        if question is None:
+            question = await self.question_generator.agenerate_question(
+                **self._question_request(phase, self._build_conversation_history())
+            )
+        self._discard_speculation()
         
         # Save question
-        question["phase"] = self.state["current_phase"].value
+        question["phase"] = phase.value
         question["question_number"] = len(self.state["questions"]) + 1
         question["generated_at"] = datetime.now().isoformat()
         
@@ -572,7 +908,111 @@ class AIInterviewEngine:
         
         return question
     
-    def _generate_follow_up_question(
+    def _question_request(self, phase: InterviewPhase, history: str) -> Dict:
+        """Generator arguments for a question in the given phase"""
+        phase_info = self._get_phase_info(phase)
+        return {
+            "job_description": self.job_description,
+            "candidate_info": self.candidate_info.__dict__,
+            "phase": phase,
+            "difficulty": phase_info["difficulty"],
+            "question_type": phase_info["type"],
+            "history": history,
+            "exclude": [q.get("question") for q in self.state["questions"]]
+        }
+    
+    def begin_speculation(self) -> None:
+        """
+        Draft the likely next questions while the candidate is answering.
+        Both the same-phase and the next-phase question are drafted from the
+        history known so far; after evaluation the matching one is used and
+        the other discarded. Needs a running event loop.
+        """
+        if self.speculation_stats["disabled"] or self._speculation:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        
+        budget = self.config.get("speculation_token_budget", 4000)
+        if self.speculation_stats["wasted_tokens_estimate"] >= budget:
+            logger.info("Speculative question generation disabled: wasted token budget exhausted")
+            self.speculation_stats["disabled"] = True
+            return
+        
+        history = self._build_conversation_history()
+        candidates = {"continue": self.state["current_phase"]}
+        next_entry = self._next_phase_entry()
+        # A repeated phase (TECHNICAL, TECHNICAL) would draft the same request twice;
+        # the "continue" draft serves both outcomes then
+        if next_entry is not None and next_entry[0] != self.state["current_phase"]:
+            candidates["next_phase"] = next_entry[0]
+        
+        for kind, phase in candidates.items():
+            spec = {"phase": phase, "requested": False}
+            spec["task"] = loop.create_task(self._draft_question(spec, self._question_request(phase, history)))
+            self._speculation[kind] = spec
+            self.speculation_stats["started"] += 1
+    
+    async def _draft_question(self, spec: Dict, request: Dict) -> Dict:
+        # Only drafts that got this far can have been billed
+        spec["requested"] = True
+        return await self.question_generator.agenerate_question(**request)
+    
+    async def _take_speculation(self, kind: str, phase: InterviewPhase) -> Optional[Dict]:
+        """Return the drafted question of this kind if it is usable"""
+        spec = self._speculation.pop(kind, None)
+        if spec is None and kind == "next_phase":
+            # Repeated phase: only the same-phase draft was started
+            spec = self._speculation.pop("continue", None)
+        task = spec["task"] if spec else None
+        usable = (
+            task is not None
+            and spec["phase"] == phase
+            and not task.cancelled()
+            and task.get_loop() is asyncio.get_running_loop()
+        )
+        if not usable:
+            if task is not None:
+                self._speculation[kind] = spec  # let _discard_speculation account for it
+            self.speculation_stats["misses"] += 1
+            return None
+        
+        question = await task
+        if "error" in question.get("metadata", {}):
+            self.speculation_stats["misses"] += 1
+            return None
+        self.speculation_stats["hits"] += 1
+        return question
+    
+    def _discard_speculation(self) -> None:
+        """Cancel or drop unused drafts and account for wasted tokens"""
+        in_flight_cost = self.config.get("speculation_cost_estimate", 500)
+        for spec in self._speculation.values():
+            task = spec["task"]
+            if task.done() and not task.cancelled() and task.exception() is None:
+                question = task.result()
+                # Roughly one token per CJK character of generated JSON; pooled drafts cost nothing
+                pooled = question.get("metadata", {}).get("source") == "pool"
+                wasted = 0 if pooled else len(json.dumps(question, ensure_ascii=False))
+            else:
+                task.cancel()
+                # In-flight request: assume the full completion was billed. Drafts that
+                # never ran (or failed) sent nothing.
+                wasted = in_flight_cost if spec["requested"] and not task.done() else 0
+            self.speculation_stats["discarded"] += 1
+            self.speculation_stats["wasted_tokens_estimate"] += wasted
+        self._speculation = {}
+    
+    def get_speculation_stats(self) -> Dict:
+        """Speculation counters plus hit rate"""
+        stats = dict(self.speculation_stats)
+        attempts = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / attempts, 3) if attempts else None
+        return stats
+    
+    async def _generate_follow_up_question(
         self,
         original_question: str,
         answer: str,
@@ -582,7 +1022,7 @@ class AIInterviewEngine:
         strengths = evaluation.get("strengths", [])
         weaknesses = evaluation.get("weaknesses", [])
         
-        follow_up = self.question_generator.generate_follow_up(
+        follow_up = await self.question_generator.agenerate_follow_up(
             original_question=original_question,
             candidate_answer=answer,
             strengths=strengths,
@@ -638,18 +1078,13 @@ class AIInterviewEngine:
         })
         
         # Find next phase
-        current_index = next(
-            (i for i, (phase, _, _) in enumerate(self.phases) 
-             if phase == self.state["current_phase"]),
-            -1
-        )
-        
-        if current_index == -1 or current_index >= len(self.phases) - 1:
+        next_entry = self._next_phase_entry()
+        if next_entry is None:
             # All phases completed
             return {"status": "interview_completed"}
         
         # Set next phase
-        next_phase, next_difficulty, next_count = self.phases[current_index + 1]
+        next_phase, next_difficulty, next_count = next_entry
         self.state["current_phase"] = next_phase
         self.state["current_question_index"] = 0
         
@@ -660,10 +1095,25 @@ class AIInterviewEngine:
             "question_count": next_count
         }
     
+    def _next_phase_entry(self) -> Optional[tuple]:
+        """(phase, difficulty, count) following the current phase, or None at the end"""
+        current_index = next(
+            (i for i, (phase, _, _) in enumerate(self.phases) 
+             if phase == self.state["current_phase"]),
+            -1
+        )
+        if current_index == -1 or current_index >= len(self.phases) - 1:
+            return None
+        return self.phases[current_index + 1]
+    
     def _get_current_phase_info(self) -> Dict:
         """Get current phase information"""
+        return self._get_phase_info(self.state["current_phase"])
+    
+    def _get_phase_info(self, current_phase: InterviewPhase) -> Dict:
+        """Get phase information"""
         for phase, difficulty, count in self.phases:
-            if phase == self.state["current_phase"]:
+            if phase == current_phase:
                 return {
                     "phase": phase.value,
                     "difficulty": difficulty,
@@ -675,16 +1125,10 @@ class AIInterviewEngine:
         return {"phase": "technical", "difficulty": "medium", "question_count": 2, "type": "technical"}
     
     def _build_conversation_history(self) -> str:
-        """Build conversation history"""
+        """Conversation history for question prompts (bounded by the memory's token budget)"""
         if not self.state["answers"]:
             return "This is the first question"
-        
-        history_lines = []
-        for i, (question, answer) in enumerate(zip(self.state["questions"], self.state["answers"])):
-            history_lines.append(f"Q{i+1}: {question['question']}")
-            history_lines.append(f"A{i+1}: {answer['text'][:100]}...")
-        
-        return "\n".join(history_lines)
+        return self.memory.render()
     
     def _calculate_phase_average_score(self) -> float:
         """Calculate average score in current phase"""
@@ -699,95 +1143,27 @@ class AIInterviewEngine:
         scores = [a["evaluation"].get("weighted_score", 5.0) for a in phase_answers]
         return sum(scores) / len(scores)
     
-    def _generate_final_report(self) -> Dict:
-        """Generate final interview report"""
-        # Use LLM to generate comprehensive report
-        report_prompt = ChatPromptTemplate.from_messages([
-            SystemMessage(content="""
-            你是一位资深的人力资源专家和面试评估官。
-            请基于以下面试数据生成专业的面试评估报告。
-            
-            报告应包括：
-            1. 总体评价和推荐等级
-            2. 技术能力分析
-            3. 软技能评估
-            4. 优势与亮点
-            5. 改进建议
-            6. 是否推荐及理由
-            """),
-            HumanMessagePromptTemplate.from_template("""
-            **候选人信息**：
-            {candidate_info}
-            
-            **职位要求**：
-            {job_description}
-            
-            **面试表现数据**：
-            总问题数：{total_questions}
-            平均得分：{average_score}/10
-            各阶段表现：{phase_performance}
-            
-            **关键回答摘要**：
-            {answer_summaries}
-            
-            **请生成详细的面试评估报告**。
-            """)
-        ])
-        
-        # Prepare data
-        candidate_info_str = json.dumps(self.candidate_info.__dict__, ensure_ascii=False, indent=2)
-        
-        # Summarize performance of each phase
-        phase_performance = []
-        for phase_record in self.state["phase_history"]:
-            phase_performance.append(
-                f"{phase_record['phase']}: {phase_record['average_score']:.1f}/10"
-            )
-        
-        # Key answer summaries
-        answer_summaries = []
-        for i, (q, a) in enumerate(zip(self.state["questions"][:3], self.state["answers"][:3])):
-            answer_summaries.append(
-                f"问题{i+1}: {q['question'][:50]}...\n"
-                f"回答摘要: {a['text'][:100]}...\n"
-                f"得分: {a['evaluation'].get('weighted_score', 5.0):.1f}/10"
-            )
-        
-        # Create report chain
-        api_key = os.getenv("DEEPSEEK_API_KEY", "")
-        report_chain = report_prompt | ChatOpenAI(
-            model_name="deepseek-chat",
-            temperature=0.5,
-            max_tokens=800,
-            base_url="https://api.deepseek.com/v1",
-            api_key=api_key
-        ) | StrOutputParser()
-        
-        try:
-            report = report_chain.invoke({
-                "candidate_info": candidate_info_str,
-                "job_description": self.job_description,
-                "total_questions": len(self.state["questions"]),
-                "average_score": sum(self.state["scores"]) / len(self.state["scores"]) if self.state["scores"] else 0,
-                "phase_performance": "; ".join(phase_performance),
-                "answer_summaries": "\n\n".join(answer_summaries)
-            })
-            
-        except Exception as e:
-            logger.error(f"Error generating report: {e}")
-            report = f"Report generation failed: {str(e)}"
+    async def _generate_final_report(self, pipeline: Optional[TurnPipeline] = None) -> Dict:
+        """
+        Generate final interview report.
+        The numeric sections are returned immediately; the narrative LLM call
+        is started alongside and attached to the same dict by report_narrative().
+        """
+        pipeline = pipeline or TurnPipeline()
+        self._narrative_task = pipeline.start("report_narrative", self._generate_narrative())
         
         # Calculate overall score
         overall_score = self._calculate_overall_score()
         
-        return {
+        self.final_report = {
             "candidate_name": self.candidate_info.name,
             "target_position": self.candidate_info.target_position,
             "interview_date": self.state["start_time"].strftime("%Y-%m-%d"),
             "duration_minutes": (datetime.now() - self.state["start_time"]).seconds / 60,
             "overall_score": overall_score,
             "recommendation_level": self._get_recommendation_level(overall_score),
-            "detailed_report": report,
+            "detailed_report": None,
+            "detailed_report_status": "pending",
             "key_metrics": {
                 "questions_answered": len(self.state["questions"]),
                 "average_question_score": sum(self.state["scores"]) / len(self.state["scores"]) if self.state["scores"] else 0,
@@ -796,6 +1172,50 @@ class AIInterviewEngine:
             },
             "generated_at": datetime.now().isoformat()
         }
+        return self.final_report
+    
+    async def report_narrative(self) -> Dict:
+        """Wait for the report narrative and attach it to final_report"""
+        try:
+            report = await self._narrative_task
+            status = "ready"
+        except Exception as e:
+            logger.error(f"Error generating report: {e}")
+            report, status = f"Report generation failed: {str(e)}", "failed"
+        self.final_report["detailed_report"] = report
+        self.final_report["detailed_report_status"] = status
+        return {"detailed_report": report, "detailed_report_status": status}
+    
+    async def _generate_narrative(self) -> str:
+        """Narrative report from the LLM (800 tokens, the slowest part of the report)"""
+        # Prepare data
+        candidate_info_str = json.dumps(self.candidate_info.__dict__, ensure_ascii=False, indent=2)
+        
+        # Summarize performance of each phase
+        phase_performance = []
+        for phase_record in self.state["phase_history"]:
+            phase_performance.append(
+                f"{phase_record['phase']}: {phase_record['average_score']:.1f}/10"
+            )
+        
+        # Key answer summaries
+        answer_summaries = []
+        for i, a in enumerate(self.state["answers"][:3]):
+            q = a["question"]
+            answer_summaries.append(
+                f"问题{i+1}: {(q.get('question') or q.get('follow_up_question', ''))[:50]}...\n"
+                f"回答摘要: {a['text'][:100]}...\n"
+                f"得分: {a['evaluation'].get('weighted_score', 5.0):.1f}/10"
+            )
+        
+        return await self.report_chain.ainvoke({
+            "candidate_info": candidate_info_str,
+            "job_description": self.job_description,
+            "total_questions": len(self.state["questions"]),
+            "average_score": sum(self.state["scores"]) / len(self.state["scores"]) if self.state["scores"] else 0,
+            "phase_performance": "; ".join(phase_performance),
+            "answer_summaries": "\n\n".join(answer_summaries)
+        })
     
     def _calculate_overall_score(self) -> float:
         """计算总体分数"""
@@ -932,7 +1352,7 @@ def main():
     # Here you can continue to simulate more questions...
     
     # Manually trigger report generation (should be done automatically after all phases are completed)
-    # final_report = interview._generate_final_report()
+    # final_report = asyncio.run(interview._generate_final_report())
     # print(f"Final report summary:")
     # print(f"Overall score: {final_report['overall_score']}/10")
     # print(f"Recommendation level: {final_report['recommendation_level']}")
@@ -0,0 +1,206 @@
+"""
+Shared LLM client pool
+
+ChatOpenAI clients are cached per (api_key, model, temperature, max_tokens)
+and all of them share one keep-alive HTTP connection pool, so a turn never
+pays for a new client or a fresh TLS handshake.
+
+Async connections are pooled per event loop: the uvicorn worker loop in
+production, plus one per asyncio.run in the blocking wrappers, so a socket
+opened on a loop that has since closed is never handed out again.
+
+Chains are routed through llmGateway (concurrency limits, retries, hedging,
+circuit breaker). When LLM_FALLBACK_BASE_URL is set, every chain also gets a
+fallback route to that provider.
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from langchain_core.runnables import ConfigurableField
+from langchain_openai import ChatOpenAI
+
+from llmGateway import GatewayChain, get_gateway
+
+# Point LLM_BASE_URL at llmStub (python llmStub.py) to run fully offline
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.deepseek.com/v1")
+LLM_FALLBACK_BASE_URL = os.getenv("LLM_FALLBACK_BASE_URL")
+LLM_FALLBACK_API_KEY = os.getenv("LLM_FALLBACK_API_KEY")
+LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL")
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "20"))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "60"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+
+PROVIDER_URLS = {"primary": LLM_BASE_URL}
+if LLM_FALLBACK_BASE_URL:
+    PROVIDER_URLS["fallback"] = LLM_FALLBACK_BASE_URL
+
+ClientKey = Tuple[str, str, float, int, str]
+
+_lock = threading.Lock()
+_clients: Dict[ClientKey, ChatOpenAI] = {}
+_client_keys: Dict[int, ClientKey] = {}
+_chains: Dict[Tuple[str, int], GatewayChain] = {}
+_http_client: Optional[httpx.Client] = None
+_http_async_client: Optional["_LoopLocalAsyncClient"] = None
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_KEEPALIVE,
+        keepalive_expiry=LLM_KEEPALIVE_SECONDS,
+    )
+
+
+class _LoopLocalAsyncClient(httpx.AsyncClient):
+    """
+    AsyncClient handed to every ChatOpenAI: requests are sent through a pooled
+    client owned by the running event loop (one per loop, like the gateway's
+    per-loop semaphores).
+    """
+
+    def __init__(self):
+        super().__init__(limits=_limits(), timeout=LLM_TIMEOUT_SECONDS)
+        self._per_loop: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._loop_lock = threading.Lock()
+
+    def _loop_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._loop_lock:
+            # Pools of closed loops hold dead connections (and keep the loop alive)
+            for closed in [l for l in self._per_loop if l.is_closed()]:
+                del self._per_loop[closed]
+            client = self._per_loop.get(loop)
+            if client is None:
+                client = httpx.AsyncClient(limits=_limits(), timeout=LLM_TIMEOUT_SECONDS)
+                self._per_loop[loop] = client
+            return client
+
+    async def send(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        return await self._loop_client().send(request, **kwargs)
+
+    def loop_pools(self) -> int:
+        with self._loop_lock:
+            return len(self._per_loop)
+
+    async def aclose(self) -> None:
+        """Close the running loop's pool; pools of other loops are dropped"""
+        loop = asyncio.get_running_loop()
+        with self._loop_lock:
+            client = self._per_loop.get(loop)
+            self._per_loop.clear()
+        if client is not None:
+            await client.aclose()
+        await super().aclose()
+
+
+def _get_http_clients() -> Tuple[httpx.Client, httpx.AsyncClient]:
+    global _http_client, _http_async_client
+    if _http_client is None:
+        _http_client = httpx.Client(limits=_limits(), timeout=LLM_TIMEOUT_SECONDS)
+    if _http_async_client is None:
+        _http_async_client = _LoopLocalAsyncClient()
+    return _http_client, _http_async_client
+
+
+def get_chat_model(
+    api_key: str,
+    model_name: str = "deepseek-chat",
+    temperature: float = 0.7,
+    max_tokens: int = 500,
+    provider: str = "primary",
+) -> ChatOpenAI:
+    """Return the pooled client for these settings, creating it on first use"""
+    key = (api_key, model_name, temperature, max_tokens, provider)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            http_client, http_async_client = _get_http_clients()
+            client = ChatOpenAI(
+                model_name=model_name,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                base_url=PROVIDER_URLS[provider],
+                api_key=api_key,
+                http_client=http_client,
+                http_async_client=http_async_client,
+                max_retries=0,  # retries are handled by the gateway
+            )
+            _clients[key] = client
+            _client_keys[id(client)] = key
+    return client
+
+
+def _fallback_model(llm: ChatOpenAI) -> Optional[ChatOpenAI]:
+    """Client with the same settings on the fallback provider, if one is configured"""
+    key = _client_keys.get(id(llm))
+    if "fallback" not in PROVIDER_URLS or key is None:
+        return None
+    api_key, model_name, temperature, max_tokens, _ = key
+    return get_chat_model(
+        LLM_FALLBACK_API_KEY or api_key,
+        LLM_FALLBACK_MODEL or model_name,
+        temperature,
+        max_tokens,
+        provider="fallback",
+    )
+
+
+def get_chain(name: str, prompt: Any, llm: ChatOpenAI, parser: Any = None) -> GatewayChain:
+    """Compose prompt | llm [| parser] once per (name, pooled client), routed through the gateway"""
+    key = (name, id(llm))
+    chain = _chains.get(key)
+    if chain is not None:
+        return chain
+
+    # Routes are composed outside the lock (the fallback client takes it too)
+    routes = []
+    for provider, model in (("primary", llm), ("fallback", _fallback_model(llm))):
+        if model is None:
+            continue
+        # Request kwargs are configurable per call: the blocking gateway path
+        # passes each attempt's timeout to the HTTP request this way
+        step = model.bind().configurable_fields(kwargs=ConfigurableField(id="request_options"))
+        runnable = prompt | step
+        if parser is not None:
+            runnable = runnable | parser
+        routes.append((provider, runnable))
+    with _lock:
+        chain = _chains.get(key)
+        if chain is None:
+            chain = GatewayChain(name, routes, get_gateway())
+            _chains[key] = chain
+    return chain
+
+
+def pool_stats() -> Dict:
+    with _lock:
+        stats = {"clients": len(_clients), "chains": len(_chains), "providers": PROVIDER_URLS}
+        http_async_client = _http_async_client
+    stats["async_loop_pools"] = http_async_client.loop_pools() if http_async_client is not None else 0
+    return stats
+
+
+async def aclose_pool() -> None:
+    """Close pooled connections (call on shutdown)"""
+    global _http_client, _http_async_client
+    with _lock:
+        _clients.clear()
+        _client_keys.clear()
+        _chains.clear()
+        http_client, http_async_client = _http_client, _http_async_client
+        _http_client = _http_async_client = None
+    if http_async_client is not None:
+        await http_async_client.aclose()
+    if http_client is not None:
+        http_client.close()
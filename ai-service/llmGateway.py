@@ -0,0 +1,468 @@
+"""
+Resilient LLM gateway
+
+Every chain built by llmClients.get_chain goes through here. Per provider:
+- a concurrency limit (LLM_MAX_CONCURRENCY in-flight requests)
+- deadline-aware retries with full-jitter exponential backoff for
+  transient failures (timeouts, connection errors, 429 and 5xx)
+- optional hedging: when a request runs past the observed p95 latency, a
+  duplicate is sent and the first response wins (LLM_HEDGE=1)
+- a circuit breaker that, after repeated failures, fails fast for a cool-down
+  period so callers drop straight to their fallback (next provider or the
+  caller's default question / evaluation)
+
+Streams are retried only until their first chunk arrives.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "45"))
+LLM_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("LLM_ATTEMPT_TIMEOUT_SECONDS", "20"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.25"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "4"))
+LLM_HEDGE = os.getenv("LLM_HEDGE", "0") == "1"
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+_RETRYABLE_NAMES = {
+    "APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError",
+    "ConnectError", "ConnectTimeout", "ReadTimeout", "ReadError", "RemoteProtocolError", "PoolTimeout",
+}
+
+
+class LLMUnavailable(RuntimeError):
+    """No provider could serve the request (open circuits, exhausted retries or deadline)"""
+
+
+class CircuitOpen(LLMUnavailable):
+    pass
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Transient transport / provider errors; output parsing errors are not retried"""
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status in _RETRYABLE_STATUS:
+        return True
+    return type(error).__name__ in _RETRYABLE_NAMES
+
+
+def backoff_seconds(attempt: int) -> float:
+    """Full-jitter exponential backoff"""
+    return random.uniform(0, min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """closed -> open after N consecutive failures -> half_open after reset_seconds -> closed on success"""
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURES, reset_seconds: float = LLM_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Closed: always. Half-open: a single probe request at a time. Open: never."""
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()  # (re)open for another cool-down
+
+    def release_probe(self) -> None:
+        """A half-open probe ended without a verdict (e.g. cancelled)"""
+        with self._lock:
+            self._probing = False
+
+
+class ProviderGate:
+    """Concurrency limit, breaker and latency window for one provider"""
+
+    def __init__(self, name: str, max_concurrency: int = LLM_MAX_CONCURRENCY):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.breaker = CircuitBreaker()
+        self._latencies: deque = deque(maxlen=200)
+        # asyncio primitives are bound to one event loop; keep one per loop
+        self._async_semaphores: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._sync_semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.counters = {
+            "requests": 0, "attempts": 0, "retries": 0, "failures": 0, "fast_fails": 0,
+            "hedges": 0, "hedge_wins": 0, "in_flight": 0,
+        }
+
+    def semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphore = self._async_semaphores.get(loop)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self.max_concurrency)
+                self._async_semaphores[loop] = semaphore
+            return semaphore
+
+    def count(self, key: str, delta: int = 1) -> None:
+        with self._lock:
+            self.counters[key] += delta
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+    def hedge_delay(self) -> Optional[float]:
+        """p95 latency once enough samples exist, else None (no hedging)"""
+        with self._lock:
+            enough = len(self._latencies) >= LLM_HEDGE_MIN_SAMPLES
+        return self.percentile(0.95) if enough else None
+
+    def stats(self) -> Dict:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        breaker = self.breaker.state
+        with self._lock:
+            return {
+                **self.counters,
+                "breaker": breaker,
+                "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+                "max_concurrency": self.max_concurrency,
+            }
+
+
+class LLMGateway:
+    """Routes calls to providers in order, applying the per-provider policies"""
+
+    def __init__(self):
+        self._gates: Dict[str, ProviderGate] = {}
+        self._lock = threading.Lock()
+
+    def gate(self, provider: str) -> ProviderGate:
+        with self._lock:
+            if provider not in self._gates:
+                self._gates[provider] = ProviderGate(provider)
+            return self._gates[provider]
+
+    def stats(self) -> Dict:
+        return {name: gate.stats() for name, gate in self._gates.items()}
+
+    # ---- async ----
+
+    async def acall(
+        self,
+        routes: List[tuple],
+        call: Callable[[Any], Awaitable],
+        deadline_seconds: float = LLM_DEADLINE_SECONDS,
+    ) -> Any:
+        """
+        routes: [(provider_name, target), ...] tried in order.
+        call(target) performs one attempt against that provider.
+        """
+        deadline = time.monotonic() + deadline_seconds
+        last_error: Optional[BaseException] = None
+        for provider, target in routes:
+            gate = self.gate(provider)
+            if not gate.breaker.allow():
+                gate.count("fast_fails")
+                last_error = last_error or CircuitOpen(f"LLM provider '{provider}' circuit is open")
+                continue
+            gate.count("requests")
+            try:
+                return await self._acall_with_retries(gate, target, call, deadline)
+            except LLMUnavailable as e:
+                last_error = e
+            except Exception as e:
+                if is_retryable(e):
+                    last_error = e
+                    continue
+                raise
+        raise LLMUnavailable(f"No LLM provider available: {last_error}") from last_error
+
+    async def _acall_with_retries(self, gate: ProviderGate, target: Any, call: Callable, deadline: float) -> Any:
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise LLMUnavailable(f"Deadline exceeded calling '{gate.name}'")
+            try:
+                result = await self._ahedged(gate, target, call, min(remaining, LLM_ATTEMPT_TIMEOUT_SECONDS))
+                gate.breaker.record_success()
+                return result
+            except asyncio.CancelledError:
+                gate.breaker.release_probe()
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    gate.breaker.release_probe()
+                    raise
+                gate.count("failures")
+                gate.breaker.record_failure()
+                delay = backoff_seconds(attempt)
+                # Retry only if there is still time for the pause plus a typical attempt
+                typical = gate.percentile(0.5) or 0.0
+                if (
+                    attempt >= LLM_MAX_RETRIES
+                    or not gate.breaker.allow()
+                    or time.monotonic() + delay + typical >= deadline
+                ):
+                    raise
+                logger.warning(f"LLM call to '{gate.name}' failed ({type(e).__name__}), retrying in {delay:.2f}s")
+                gate.count("retries")
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def _attempt(self, gate: ProviderGate, target: Any, call: Callable, timeout: float) -> Any:
+        async with gate.semaphore():
+            gate.count("attempts")
+            gate.count("in_flight")
+            start = time.monotonic()
+            try:
+                result = await asyncio.wait_for(call(target), timeout)
+                gate.observe(time.monotonic() - start)
+                return result
+            finally:
+                gate.count("in_flight", -1)
+
+    async def _ahedged(self, gate: ProviderGate, target: Any, call: Callable, timeout: float) -> Any:
+        hedge_after = gate.hedge_delay() if LLM_HEDGE else None
+        if hedge_after is None or hedge_after >= timeout:
+            return await self._attempt(gate, target, call, timeout)
+
+        primary = asyncio.ensure_future(self._attempt(gate, target, call, timeout))
+        done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        gate.count("hedges")
+        hedge = asyncio.ensure_future(self._attempt(gate, target, call, timeout - hedge_after))
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            gate.count("hedge_wins")
+                        return task.result()
+            # Both failed: surface the primary's error
+            return primary.result()
+        finally:
+            for task in (primary, hedge):
+                if not task.done():
+                    task.cancel()
+
+    async def astream(
+        self,
+        routes: List[tuple],
+        stream: Callable[[Any], AsyncIterator],
+        deadline_seconds: float = LLM_DEADLINE_SECONDS,
+    ) -> AsyncIterator:
+        """Stream from the first available provider; retried only before the first chunk"""
+        deadline = time.monotonic() + deadline_seconds
+        last_error: Optional[BaseException] = None
+        for provider, target in routes:
+            gate = self.gate(provider)
+            if not gate.breaker.allow():
+                gate.count("fast_fails")
+                last_error = last_error or CircuitOpen(f"LLM provider '{provider}' circuit is open")
+                continue
+            gate.count("requests")
+            attempt = 0
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    last_error = LLMUnavailable(f"Deadline exceeded calling '{provider}'")
+                    break
+                started = False
+                try:
+                    async with gate.semaphore():
+                        gate.count("attempts")
+                        gate.count("in_flight")
+                        start = time.monotonic()
+                        iterator = None
+                        try:
+                            iterator = stream(target).__aiter__()
+                            # Time to first chunk is bounded like a whole attempt
+                            first = await asyncio.wait_for(
+                                iterator.__anext__(), min(remaining, LLM_ATTEMPT_TIMEOUT_SECONDS)
+                            )
+                            started = True
+                            gate.observe(time.monotonic() - start)
+                            yield first
+                            async for chunk in iterator:
+                                yield chunk
+                        finally:
+                            gate.count("in_flight", -1)
+                            if iterator is not None and hasattr(iterator, "aclose"):
+                                await iterator.aclose()
+                    gate.breaker.record_success()
+                    return
+                except StopAsyncIteration:
+                    gate.breaker.record_success()
+                    return
+                except (asyncio.CancelledError, GeneratorExit):
+                    gate.breaker.release_probe()
+                    raise
+                except Exception as e:
+                    if started or not is_retryable(e):
+                        gate.breaker.release_probe()
+                        raise
+                    gate.count("failures")
+                    gate.breaker.record_failure()
+                    last_error = e
+                    delay = backoff_seconds(attempt)
+                    if (
+                        attempt >= LLM_MAX_RETRIES
+                        or not gate.breaker.allow()
+                        or time.monotonic() + delay >= deadline
+                    ):
+                        break
+                    gate.count("retries")
+                    attempt += 1
+                    await asyncio.sleep(delay)
+        raise LLMUnavailable(f"No LLM provider available: {last_error}") from last_error
+
+    # ---- sync (blocking callers outside the event loop) ----
+
+    def call(
+        self,
+        routes: List[tuple],
+        call: Callable[[Any, float], Any],
+        deadline_seconds: float = LLM_DEADLINE_SECONDS,
+    ) -> Any:
+        """
+        Blocking variant of acall (no hedging). A blocking call cannot be
+        cancelled, so call(target, timeout) gets the per-attempt timeout and
+        must pass it to the client request itself.
+        """
+        deadline = time.monotonic() + deadline_seconds
+        last_error: Optional[BaseException] = None
+        for provider, target in routes:
+            gate = self.gate(provider)
+            if not gate.breaker.allow():
+                gate.count("fast_fails")
+                last_error = last_error or CircuitOpen(f"LLM provider '{provider}' circuit is open")
+                continue
+            gate.count("requests")
+            attempt = 0
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    with gate._sync_semaphore:
+                        gate.count("attempts")
+                        gate.count("in_flight")
+                        start = time.monotonic()
+                        try:
+                            result = call(target, min(remaining, LLM_ATTEMPT_TIMEOUT_SECONDS))
+                        finally:
+                            gate.count("in_flight", -1)
+                    gate.observe(time.monotonic() - start)
+                    gate.breaker.record_success()
+                    return result
+                except Exception as e:
+                    if not is_retryable(e):
+                        gate.breaker.release_probe()
+                        raise
+                    gate.count("failures")
+                    gate.breaker.record_failure()
+                    last_error = e
+                    delay = backoff_seconds(attempt)
+                    if (
+                        attempt >= LLM_MAX_RETRIES
+                        or not gate.breaker.allow()
+                        or time.monotonic() + delay >= deadline
+                    ):
+                        break
+                    gate.count("retries")
+                    attempt += 1
+                    time.sleep(delay)
+        raise LLMUnavailable(f"No LLM provider available: {last_error}") from last_error
+
+
+class GatewayChain:
+    """
+    A composed chain routed through the gateway. routes holds one runnable per
+    provider (primary first); invoke / ainvoke / astream match the runnable API.
+    """
+
+    def __init__(self, name: str, routes: List[tuple], gateway: "LLMGateway"):
+        self.name = name
+        self.routes = routes
+        self.gateway = gateway
+
+    def invoke(self, input_data: Any, config: Optional[Dict] = None, **kwargs) -> Any:
+        def attempt(runnable: Any, timeout: float) -> Any:
+            # "request_options" is the configurable model step set up by llmClients.get_chain
+            attempt_config = dict(config or {})
+            attempt_config["configurable"] = {
+                **attempt_config.get("configurable", {}), "request_options": {"timeout": timeout}
+            }
+            return runnable.invoke(input_data, attempt_config, **kwargs)
+
+        return self.gateway.call(self.routes, attempt)
+
+    async def ainvoke(self, input_data: Any, **kwargs) -> Any:
+        return await self.gateway.acall(self.routes, lambda runnable: runnable.ainvoke(input_data, **kwargs))
+
+    async def astream(self, input_data: Any, **kwargs) -> AsyncIterator:
+        async for chunk in self.gateway.astream(self.routes, lambda runnable: runnable.astream(input_data, **kwargs)):
+            yield chunk
+
+
+_gateway = LLMGateway()
+
+
+def get_gateway() -> LLMGateway:
+    return _gateway
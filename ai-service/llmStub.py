@@ -0,0 +1,176 @@
+"""
+Local OpenAI-compatible LLM stub
+
+Serves /v1/chat/completions (plain and streaming) with canned answers shaped
+like the real prompts expect, plus configurable latency, slow tail and
+failure rate, so gateway behaviour (retries, hedging, circuit breaker) can be
+exercised offline.
+
+    python llmStub.py --port 8001 --latency-ms 300 --failure-rate 0.2
+    LLM_BASE_URL=http://127.0.0.1:8001/v1 DEEPSEEK_API_KEY=stub uvicorn main:app
+
+Behaviour can be changed at runtime with POST /stub/config.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+app = FastAPI(title="LLM stub", version="0.1.0")
+
+
+class StubConfig(BaseModel):
+    latency_ms: float = 300  # time to first token
+    jitter_ms: float = 100
+    tail_rate: float = 0.0  # fraction of requests that take tail_ms instead
+    tail_ms: float = 5000
+    failure_rate: float = 0.0  # fraction answered with failure_status
+    failure_status: int = 503
+    token_ms: float = 15  # delay between streamed chunks
+
+
+class ChatMessage(BaseModel):
+    role: str
+    content: str
+
+
+class ChatRequest(BaseModel):
+    model: str = "stub"
+    messages: List[ChatMessage]
+    stream: bool = False
+    temperature: Optional[float] = None
+    max_tokens: Optional[int] = None
+
+
+config = StubConfig()
+counters = {"requests": 0, "failures": 0, "tail": 0}
+
+_QUESTIONS = [
+    "请介绍一个你主导设计的系统，它的核心挑战是什么？",
+    "如果线上接口延迟突然升高，你会如何排查？",
+    "描述一次你和同事意见不一致的经历，最后是如何解决的？",
+    "如何为高并发读场景设计缓存，并避免缓存雪崩？",
+]
+
+
+def _reply_for(prompt: str) -> str:
+    """Canned content matching what the calling prompt asks for"""
+    if '"follow_up_question"' in prompt:
+        return json.dumps({
+            "follow_up_question": "能具体讲讲你在这个方案里负责的部分和遇到的难点吗？",
+            "focus_area": "个人贡献",
+            "purpose": "验证实际经验深度",
+        }, ensure_ascii=False)
+    if '"scores"' in prompt:
+        return json.dumps({
+            "scores": {"relevance": 7, "completeness": 6, "depth": 6, "clarity": 7, "specificity": 5},
+            "total_score": 31,
+            "strengths": ["回答切题"],
+            "weaknesses": ["缺少具体数据"],
+            "detailed_feedback": "回答结构清晰，建议补充量化结果。",
+            "follow_up_suggestions": ["追问具体指标"],
+        }, ensure_ascii=False)
+    if '"expected_skills"' in prompt:
+        return json.dumps({
+            "question": random.choice(_QUESTIONS),
+            "reasoning": "考察候选人的实际经验",
+            "expected_skills": ["系统设计", "问题解决"],
+            "evaluation_criteria": ["方案合理性", "细节深度"],
+        }, ensure_ascii=False)
+    return "谢谢你的回答。能再举一个具体的例子说明你的做法吗？"
+
+
+async def _simulate_latency() -> None:
+    counters["requests"] += 1
+    if random.random() < config.failure_rate:
+        counters["failures"] += 1
+        await asyncio.sleep(config.latency_ms / 1000 / 2)
+        raise HTTPException(status_code=config.failure_status, detail="stub: injected failure")
+    if random.random() < config.tail_rate:
+        counters["tail"] += 1
+        delay = config.tail_ms
+    else:
+        delay = max(0.0, random.gauss(config.latency_ms, config.jitter_ms))
+    await asyncio.sleep(delay / 1000)
+
+
+def _completion(request: ChatRequest, content: str) -> Dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+def _chunk(request: ChatRequest, completion_id: str, delta: Dict, finish_reason: Optional[str] = None) -> str:
+    payload = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": request.model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: ChatRequest):
+    prompt = "\n".join(m.content for m in request.messages)
+    content = _reply_for(prompt)
+    await _simulate_latency()
+
+    if not request.stream:
+        return _completion(request, content)
+
+    async def events():
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        yield _chunk(request, completion_id, {"role": "assistant", "content": ""})
+        for i in range(0, len(content), 8):
+            yield _chunk(request, completion_id, {"content": content[i:i + 8]})
+            await asyncio.sleep(config.token_ms / 1000)
+        yield _chunk(request, completion_id, {}, finish_reason="stop")
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/stub/config")
+async def get_config():
+    return {"config": config.model_dump(), "counters": counters}
+
+
+@app.post("/stub/config")
+async def set_config(update: StubConfig):
+    global config
+    config = update
+    return {"config": config.model_dump()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    for field, info in StubConfig.model_fields.items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=type(info.default), default=info.default)
+    args = parser.parse_args()
+
+    global config
+    config = StubConfig(**{field: getattr(args, field) for field in StubConfig.model_fields})
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,31 @@
 import os
+import json
 from pathlib import Path
-from tempfile import NamedTemporaryFile
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from typing import TYPE_CHECKING
+from fastapi import FastAPI, UploadFile, File, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from faster_whisper import WhisperModel
 from dotenv import load_dotenv
+import asyncio
+from collections import deque
 
 # Load environment variables from .env file
 load_dotenv()
 
-from interviewEngine import AIInterviewEngine  # type: ignore
-from interviewQuestionGenerator import InterviewPhase  # type: ignore
+# Heavy modules (torch, transformers, spaCy, faster-whisper, langchain) are imported
+# lazily so uvicorn can bind immediately; models load on first use or warm-up.
+from modelRegistry import get_model_registry  # type: ignore
+from modelWarmup import ModelWarmup  # type: ignore
+from sessionManager import SessionManager, SessionEvicted, SessionNotFound  # type: ignore
+from resultCache import content_key, get_cache, get_cache_stats  # type: ignore
+from questionPool import get_question_pool, profile_key  # type: ignore
+from reportJobs import ReportJob, ReportJobManager, ReportJobNotFound  # type: ignore
+from audioDecoding import AudioDecodeError, AudioTooLarge, decode_audio, read_upload  # type: ignore
+
+if TYPE_CHECKING:
+  from asrBackend import ASRBackend  # type: ignore
+  from interviewEngine import AIInterviewEngine  # type: ignore
 
 
 class AnalyzeRequest(BaseModel):
@@ -35,65 +50,183 @@ class EngineNextRequest(BaseModel):
 
 app = FastAPI(title="AI Interview Service", version="0.1.0")
 
-ASR_MODEL_NAME = os.getenv("ASR_MODEL", "small")
-ASR_DEVICE = os.getenv("ASR_DEVICE", "cpu")  # "cuda" if GPU available
-ASR_COMPUTE_TYPE = os.getenv("ASR_COMPUTE_TYPE", "int8")  # int8_float16 for GPU
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "0") == "1"  # warm up models in background on startup
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "1800"))  # idle time before eviction
+SESSION_MAX = int(os.getenv("SESSION_MAX", "500"))
+SESSION_MEMORY_BUDGET_MB = float(os.getenv("SESSION_MEMORY_BUDGET_MB", "256"))
+SESSION_SWEEP_SECONDS = float(os.getenv("SESSION_SWEEP_SECONDS", "60"))
 
-_whisper_model: WhisperModel | None = None
-_engines: dict[str, AIInterviewEngine] = {}
+_engines = SessionManager(
+  ttl_seconds=SESSION_TTL_SECONDS,
+  max_sessions=SESSION_MAX,
+  memory_budget_bytes=int(SESSION_MEMORY_BUDGET_MB * 1024 * 1024),
+)
 
 
-def get_asr_model() -> WhisperModel:
-  global _whisper_model
-  if _whisper_model is None:
-    _whisper_model = WhisperModel(
-      ASR_MODEL_NAME,
-      device=ASR_DEVICE,
-      compute_type=ASR_COMPUTE_TYPE
-    )
-  return _whisper_model
+# Final reports are built in background jobs, outside the /engine/next request
+_report_jobs = ReportJobManager()
+
+
+def get_asr_model() -> "ASRBackend":
+  """Shared ASR backend (faster-whisper, ASR_MODEL/ASR_DEVICE/ASR_COMPUTE_TYPE)"""
+  return get_model_registry().asr_backend()
+
+
+def _build_warmup() -> ModelWarmup:
+  models = get_model_registry()
+  return ModelWarmup(
+    steps={
+      "asr": get_asr_model,
+      "reranker": models.answer_evaluator,
+      "wav2vec2": models.voice_analysis,
+      "spacy": models.skill_matcher,
+    },
+  )
+
+
+_warmup = _build_warmup()
+
+
+@app.on_event("startup")
+async def start_model_warmup():
+  if MODEL_WARMUP:
+    _warmup.start_background()
+
+
+async def _sweep_sessions_forever():
+  while True:
+    await asyncio.sleep(SESSION_SWEEP_SECONDS)
+    _engines.sweep()
+    _report_jobs.sweep()
+
+
+@app.on_event("startup")
+async def start_session_sweeper():
+  asyncio.create_task(_sweep_sessions_forever())
+
+
+def get_engine(session_id: str) -> "AIInterviewEngine":
+  """Look up a live session; 410 if it was evicted, 404 if it never existed"""
+  try:
+    return _engines.get(session_id)
+  except SessionEvicted as e:
+    raise HTTPException(status_code=410, detail=f"engine session evicted ({e.reason}), please start a new interview")
+  except SessionNotFound:
+    raise HTTPException(status_code=404, detail="engine session not found")
+
+
+@app.on_event("shutdown")
+async def close_llm_pool():
+  import sys
+  if "llmClients" in sys.modules:
+    await sys.modules["llmClients"].aclose_pool()
 
 
 @app.get("/health")
 async def health():
+  """Liveness: the process is up (models may still be cold)"""
   return {"status": "ok"}
 
 
+@app.get("/ready")
+async def ready():
+  """Readiness: per-model warm-up state; 503 until every model is warm"""
+  if not MODEL_WARMUP:
+    return {"ready": True, "warmup": "disabled", "models": {}}
+  report = _warmup.report()
+  return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+
+@app.get("/models")
+async def models():
+  """Report shared models loaded in this process and their memory usage"""
+  return get_model_registry().report()
+
+
+@app.get("/inference")
+async def inference_stats():
+  """Micro-batching queue depth and batch-size metrics per model"""
+  import sys
+  if "inferenceScheduler" not in sys.modules:
+    return {}
+  return sys.modules["inferenceScheduler"].get_scheduler_stats()
+
+
+@app.get("/llm")
+async def llm_stats():
+  """Per-provider gateway metrics: in-flight requests, retries, hedges, breaker state, latency"""
+  import sys
+  if "llmClients" not in sys.modules:
+    return {}
+  return {
+    "pool": sys.modules["llmClients"].pool_stats(),
+    "providers": sys.modules["llmGateway"].get_gateway().stats()
+  }
+
+
+@app.get("/caches")
+async def caches():
+  """Hit ratios and sizes of the result caches"""
+  return get_cache_stats()
+
+
+@app.get("/question-pool")
+async def question_pool():
+  """Pool hit ratio and the number of precomputed questions per slot"""
+  pool = get_question_pool()
+  if pool is None:
+    return {"enabled": False}
+  return {"enabled": True, **pool.stats(), "slot_sizes": pool.slot_sizes()}
+
+
+@app.get("/sessions")
+async def sessions():
+  """Session table size, memory estimate and eviction counters"""
+  return _engines.stats()
+
+
+def _analyze_chain():
+  """Pooled /analyze chain, or None when no API key is configured"""
+  from interviewQuestionGenerator import ANALYZE_PROMPT  # type: ignore
+  from llmClients import get_chain, get_chat_model  # type: ignore
+
+  api_key = os.getenv("DEEPSEEK_API_KEY", "")
+  if not api_key:
+    return None
+  return get_chain("analyze", ANALYZE_PROMPT, get_chat_model(api_key, "deepseek-chat", temperature=0.7, max_tokens=300))
+
+
+def _analyze_input(payload: AnalyzeRequest) -> dict:
+  return {
+    "level": payload.level or "中级",
+    "industry": payload.industry or "全栈",
+    "text": payload.text
+  }
+
+
+def _sse(event: str, data) -> str:
+  """Format one Server-Sent Event"""
+  return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def _sse_response(events) -> StreamingResponse:
+  return StreamingResponse(
+    events,
+    media_type="text/event-stream",
+    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+  )
+
+
 @app.post("/analyze")
 async def analyze(payload: AnalyzeRequest):
   """Analyze candidate's answer and generate interviewer's reply"""
   try:
-    from langchain_openai import ChatOpenAI
-    from langchain_core.prompts import ChatPromptTemplate
-    from langchain_core.messages import SystemMessage, HumanMessage
-    
-    api_key = os.getenv("DEEPSEEK_API_KEY", "")
-    if not api_key:
+    chain = _analyze_chain()
+    if chain is None:
       return {"reply": "API key not configured. Please set DEEPSEEK_API_KEY environment variable."}
     
-    llm = ChatOpenAI(
-      model_name="deepseek-chat",
-      temperature=0.7,
-      max_tokens=300,
-      base_url="https://api.deepseek.com/v1",
-      api_key=api_key
-    )
-    
-    # Build prompt
-    prompt = ChatPromptTemplate.from_messages([
-      SystemMessage(content=f"""你是一位专业的AI面试官，正在面试一位{payload.level or '中级'}级别的{payload.industry or '全栈'}开发工程师。
-
-你的任务：
-1. 对候选人的回答给出简短、专业的反馈
-2. 可以追问细节或提出下一个相关问题
-3. 保持友好但专业的语调
-4. 回复要简洁，控制在2-3句话内"""),
-      HumanMessage(content=f"候选人的回答：{payload.text}\n\n请给出你的回复（可以是反馈、追问或下一个问题）：")
-    ])
-    
-    # 调用 LLM
-    chain = prompt | llm
-    response = chain.invoke({})
+    # 调用 LLM (pooled client, prompt compiled once at import)
+    response = await chain.ainvoke(_analyze_input(payload))
     
     # 提取回复文本
     reply_text = response.content if hasattr(response, 'content') else str(response)
@@ -105,25 +238,164 @@ async def analyze(payload: AnalyzeRequest):
     return {"reply": f"抱歉，处理您的回答时出现错误。请重试。错误信息：{str(e)}"}
 
 
+@app.post("/analyze/stream")
+async def analyze_stream(payload: AnalyzeRequest):
+  """Same as /analyze, but pushes reply tokens over SSE ("token" events, then "done")"""
+  async def events():
+    try:
+      chain = _analyze_chain()
+      if chain is None:
+        reply = "API key not configured. Please set DEEPSEEK_API_KEY environment variable."
+        yield _sse("done", {"reply": reply})
+        return
+      parts = []
+      async for chunk in chain.astream(_analyze_input(payload)):
+        text = chunk.content if hasattr(chunk, "content") else str(chunk)
+        if text:
+          parts.append(text)
+          yield _sse("token", {"text": text})
+      yield _sse("done", {"reply": "".join(parts)})
+    except Exception as e:
+      print(f"Error in /analyze/stream: {e}")
+      yield _sse("error", {"detail": str(e)})
+
+  return _sse_response(events())
+
+
 @app.post("/transcribe")
 async def transcribe(file: UploadFile = File(...)):
   if file.content_type and not file.content_type.startswith("audio/"):
     raise HTTPException(status_code=400, detail="Invalid file type, please upload audio.")
 
-  with NamedTemporaryFile(delete=True, suffix=".tmp") as tmp:
-    tmp.write(await file.read())
-    tmp.flush()
-    model = get_asr_model()
-    segments, _info = model.transcribe(tmp.name, beam_size=1)
-    transcript_parts = [seg.text.strip() for seg in segments]
-    text = " ".join([p for p in transcript_parts if p])
+  try:
+    data = await read_upload(file)
+  except AudioTooLarge as e:
+    raise HTTPException(status_code=413, detail=str(e))
+  asr = get_asr_model()
+  # Retried uploads of the same audio are answered from the cache
+  cache = get_cache("transcribe")
+  key = content_key(data, **asr.cache_params())
+  result = cache.get(key)
+  if result is None:
+    # Decoded in memory to 16 kHz float32, off the event loop; no temp file
+    try:
+      audio = await asyncio.to_thread(decode_audio, data)
+    except AudioTooLarge as e:
+      raise HTTPException(status_code=413, detail=str(e))
+    except AudioDecodeError as e:
+      raise HTTPException(status_code=400, detail=str(e))
+    result = await asr.transcribe_async(audio)
+    cache.set(key, result)
+  text = result["text"]
   return {"text": text or "Transcription empty."}
 
 
+@app.websocket("/ws/transcribe")
+async def transcribe_stream(
+  websocket: WebSocket,
+  format: str = "pcm16",
+  sample_rate: int = 16000,
+  language: str = "zh",
+):
+  """
+  Streaming transcription. Send binary audio frames (format=pcm16: 16-bit LE
+  mono at sample_rate; format=opus: MediaRecorder WebM/Ogg Opus chunks), then
+  the text message {"type": "end"}. Receives {"type": "partial"|"final", ...}
+  per utterance while speaking and {"type": "done", "text": ...} at the end.
+  """
+  from streamingTranscirber import StreamingTranscriber, make_decoder  # type: ignore
+
+  await websocket.accept()
+  try:
+    decoder = make_decoder(format, sample_rate)
+    transcriber = StreamingTranscriber(language=language)
+  except ValueError as e:
+    await websocket.send_json({"type": "error", "detail": str(e)})
+    await websocket.close(code=1003)
+    return
+
+  # Decoding runs one utterance at a time off the event loop. A newer partial
+  # replaces a queued one, and a final makes pending partials obsolete.
+  pending: deque = deque()
+  wake = asyncio.Event()
+  closing = False
+
+  def enqueue(utterances):
+    for u in utterances:
+      if u.kind == "final":
+        while pending and pending[-1].kind == "partial":
+          pending.pop()
+      elif pending and pending[-1].kind == "partial":
+        pending.pop()
+      pending.append(u)
+    if utterances:
+      wake.set()
+
+  async def decode_worker():
+    while True:
+      if not pending:
+        if closing:
+          return
+        wake.clear()
+        await wake.wait()
+        continue
+      utterance = pending.popleft()
+      event = await asyncio.to_thread(transcriber.transcribe_utterance, utterance)
+      await websocket.send_json(event)
+
+  worker = asyncio.create_task(decode_worker())
+  try:
+    while True:
+      message = await websocket.receive()
+      if message["type"] == "websocket.disconnect":
+        return
+      if message.get("bytes"):
+        samples = await asyncio.to_thread(decoder.decode, message["bytes"])
+        enqueue(transcriber.add_audio(samples))
+      elif message.get("text"):
+        if json.loads(message["text"]).get("type") == "end":
+          break
+
+    tail = await asyncio.to_thread(decoder.close)
+    enqueue(transcriber.add_audio(tail))
+    enqueue(transcriber.flush())
+    closing = True
+    wake.set()
+    await worker
+    await websocket.send_json({"type": "done", "text": transcriber.transcript})
+    await websocket.close()
+  except WebSocketDisconnect:
+    pass
+  except Exception as e:
+    print(f"Error in /ws/transcribe: {e}")
+    try:
+      await websocket.send_json({"type": "error", "detail": str(e)})
+      await websocket.close(code=1011)
+    except Exception:
+      pass
+  finally:
+    if not worker.done():
+      worker.cancel()
+    if format == "opus" and not closing:
+      # Joins the demux thread (up to 5 s); the tail is unused on this path
+      try:
+        await asyncio.to_thread(decoder.close)
+      except ValueError:
+        pass
+
+
 @app.post("/question")
 async def question(payload: QuestionRequest):
   industry = payload.industry or "General"
   level = payload.level or "General"
+  pool = get_question_pool()
+  if pool is not None:
+    pooled = pool.draw(
+      profile_key({"industry": payload.industry, "level": payload.level}),
+      "introduction", "easy", "general"
+    )
+    if pooled is not None:
+      return {"question": pooled["question"]}
   return {
     "question": f"For a {industry} {level} role, please tell me about yourself and one recent project you led."
   }
@@ -131,6 +403,9 @@ async def question(payload: QuestionRequest):
 
 @app.post("/engine/start")
 async def engine_start(payload: EngineStartRequest):
+  from interviewEngine import AIInterviewEngine  # type: ignore
+  from interviewQuestionGenerator import InterviewPhase  # type: ignore
+
   try:
     session_id = os.urandom(16).hex()
     candidate_info = payload.candidate_info or {}
@@ -146,10 +421,10 @@ async def engine_start(payload: EngineStartRequest):
       job_description=payload.job_description or "General full-stack role",
       candidate_info=candidate_info
     )
-    _engines[session_id] = engine
+    _engines.add(session_id, engine)
     
     # Generate first question
-    first_result = engine.question_generator.generate_question(
+    first_result = await engine.question_generator.agenerate_question(
       job_description=engine.job_desc,
       candidate_info=engine.candidate_info,
       phase=InterviewPhase.INTRODUCTION,
@@ -158,7 +433,9 @@ async def engine_start(payload: EngineStartRequest):
     )
     first_question = first_result.get("question", "Please introduce yourself.")
     engine.interview_state["current_question"] = first_question
+    engine.interview_state["expected_points"][first_question] = first_result.get("expected_skills", [])
     engine.interview_state["questions_asked"].append(first_question)
+    _engines.touch(session_id)
     
     return {"session_id": session_id, "question": first_question}
   except Exception as e:
@@ -171,9 +448,7 @@ async def engine_start(payload: EngineStartRequest):
 
 @app.post("/engine/next")
 async def engine_next(payload: EngineNextRequest):
-  engine = _engines.get(payload.session_id)
-  if not engine:
-    raise HTTPException(status_code=404, detail="engine session not found")
+  engine = get_engine(payload.session_id)
 
   # Assume transcription is done, directly use text to drive
   class DummyStream:
@@ -182,5 +457,79 @@ async def engine_next(payload: EngineNextRequest):
 
   # Reuse existing logic: if no question, generate one; here directly call evaluate process
   result = await engine.conduct_interview({"text": payload.text or ""})
+  return _finish_turn(payload.session_id, engine, result)
+
+
+@app.post("/engine/next/stream")
+async def engine_next_stream(payload: EngineNextRequest):
+  """
+  Same as /engine/next over SSE: "token" events carry the next question as it
+  is generated ("replace" means generation failed midway: drop the partial text
+  and show this fallback instead), the final "result" event carries the full
+  response (action, question, previous_score, phase, or the report job_id when
+  the interview ends).
+  """
+  engine = get_engine(payload.session_id)
+
+  async def events():
+    try:
+      async for event in engine.conduct_interview_stream({"text": payload.text or ""}):
+        if event["type"] == "final":
+          yield _sse("result", _finish_turn(payload.session_id, engine, event["data"]))
+        else:
+          yield _sse(event["type"], {"text": event["text"]})
+    except Exception as e:
+      print(f"Error in /engine/next/stream: {e}")
+      yield _sse("error", {"detail": str(e)})
+
+  return _sse_response(events())
+
+
+def _finish_turn(session_id: str, engine: "AIInterviewEngine", result: dict) -> dict:
+  """Hand finished sessions to a report job, re-measure live ones"""
+  if result.get("action") == "end_interview":
+    _engines.remove(session_id)
+    job = _report_jobs.submit(session_id, engine.build_report)
+    result["job_id"] = job.job_id
+    result["report_status_url"] = f"/reports/{job.job_id}"
+  else:
+    _engines.touch(session_id)
   return result
 
+
+@app.get("/reports")
+async def report_jobs():
+  """Report job counts by status and worker settings"""
+  return _report_jobs.stats()
+
+
+@app.get("/reports/{job_id}")
+async def report_status(job_id: str):
+  """Status, stage and progress (0-1) of a report job"""
+  return _get_report_job(job_id).describe()
+
+
+@app.get("/reports/{job_id}/result")
+async def report_result(job_id: str):
+  """
+  The finished report (200). While the job runs: 202 with the numeric
+  sections once they are ready; 500 if the job failed.
+  """
+  job = _get_report_job(job_id)
+  if job.status == "succeeded":
+    return {"status": job.status, "report": job.result["report"]}
+  if job.status == "failed":
+    raise HTTPException(status_code=500, detail=f"Report generation failed: {job.error}")
+  partial = job.result["report"] if job.result else None
+  return JSONResponse(
+    status_code=202,
+    content=jsonable_encoder({"status": job.status, "progress": job.progress, "report": partial})
+  )
+
+
+def _get_report_job(job_id: str) -> ReportJob:
+  try:
+    return _report_jobs.get(job_id)
+  except ReportJobNotFound:
+    raise HTTPException(status_code=404, detail="Report job not found or expired")
+
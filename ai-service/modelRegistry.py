@@ -0,0 +1,176 @@
+"""
+Process-wide model registry
+
+Every interview engine used to load its own Whisper, reranker, wav2vec2 and
+spaCy models. The registry loads each model once per process and hands the
+same read-only instance to every caller.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+RERANKER_MODEL_NAME = os.getenv("RERANKER_MODEL", "BAAI/bge-reranker-v2-m3")
+
+
+def _current_rss_bytes() -> Optional[int]:
+    """Resident set size of this process in bytes (None if unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and in KiB elsewhere
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+
+def _torch_modules(obj: Any) -> List[Any]:
+    """Find torch modules held directly by a wrapper object"""
+    candidates = [obj] + list(getattr(obj, "__dict__", {}).values())
+    return [m for m in candidates if hasattr(m, "parameters") and hasattr(m, "eval")]
+
+
+def _freeze(obj: Any) -> None:
+    """Put every torch module of a shared model into inference-only mode"""
+    for module in _torch_modules(obj):
+        module.eval()
+        for param in module.parameters():
+            param.requires_grad_(False)
+
+
+def _estimate_model_bytes(obj: Any) -> int:
+    """Bytes held by parameters and buffers of the model's torch modules"""
+    total = 0
+    for module in _torch_modules(obj):
+        tensors = list(module.parameters())
+        if hasattr(module, "buffers"):
+            tensors += list(module.buffers())
+        total += sum(t.numel() * t.element_size() for t in tensors)
+    return total
+
+
+class ModelRegistry:
+    """Loads each model once per process and shares it between sessions"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._models: Dict[str, Any] = {}
+        self._stats: Dict[str, Dict] = {}
+
+    def get_or_load(self, key: str, loader: Callable[[], Any]) -> Any:
+        """Return the model registered under key, loading it on first use"""
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        # One lock per key: concurrent sessions wait for a single load
+        # instead of loading the same model twice
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            model = self._models.get(key)
+            if model is not None:
+                return model
+
+            logger.info(f"Loading shared model: {key}")
+            rss_before = _current_rss_bytes()
+            start = time.perf_counter()
+            model = loader()
+            _freeze(model)
+            load_seconds = time.perf_counter() - start
+            rss_after = _current_rss_bytes()
+
+            self._models[key] = model
+            self._stats[key] = {
+                "load_seconds": round(load_seconds, 3),
+                "param_bytes": _estimate_model_bytes(model),
+                "rss_delta_bytes": (
+                    rss_after - rss_before
+                    if rss_before is not None and rss_after is not None
+                    else None
+                ),
+                "loaded_at": datetime.now().isoformat(),
+            }
+            logger.info(f"Loaded shared model {key} in {load_seconds:.1f}s")
+        return model
+
+    def is_loaded(self, key: str) -> bool:
+        return key in self._models
+
+    def unload(self, key: str) -> bool:
+        """Drop a model from the registry (existing handles stay valid)"""
+        with self._lock:
+            self._stats.pop(key, None)
+            return self._models.pop(key, None) is not None
+
+    def report(self) -> Dict:
+        """What is loaded and how much memory it uses"""
+        models = {key: dict(stats) for key, stats in self._stats.items()}
+        return {
+            "models": models,
+            "total_param_bytes": sum(s["param_bytes"] for s in models.values()),
+            "process_rss_bytes": _current_rss_bytes(),
+        }
+
+    # ---- Typed accessors for the models used by the interview engines ----
+
+    def asr_backend(self, model_size: Optional[str] = None):
+        """Shared CTranslate2 Whisper model; one instance per size/device/precision"""
+        from asrBackend import (
+            ASR_COMPUTE_TYPE, ASR_MODEL_SIZE, FasterWhisperASR,
+            resolve_compute_type, resolve_device,
+        )
+        model_size = model_size or ASR_MODEL_SIZE
+        device = resolve_device()
+        compute_type = resolve_compute_type(device, ASR_COMPUTE_TYPE)
+        return self.get_or_load(
+            f"asr:{model_size}:{device}:{compute_type}",
+            lambda: FasterWhisperASR(model_size, device=device, compute_type=compute_type),
+        )
+
+    def whisper_asr(self, model_size: Optional[str] = None):
+        """Interview-engine facade over the shared ASR backend (cheap, not cached)"""
+        from whisperASR import WhisperASR
+        return WhisperASR(backend=self.asr_backend(model_size))
+
+    def answer_evaluator(self, model_name: str = RERANKER_MODEL_NAME):
+        from answerEvaluator import AnswerEvaluator
+        from inferenceBackends import RERANKER_BACKEND
+        return self.get_or_load(
+            f"reranker:{model_name}:{RERANKER_BACKEND}",
+            lambda: AnswerEvaluator(model_name=model_name, backend=RERANKER_BACKEND)
+        )
+
+    def voice_analysis(self):
+        from voiceAnalysis import VoiceAnalysis
+        from inferenceBackends import EMOTION_BACKEND
+        return self.get_or_load(
+            f"wav2vec2:emotion:{EMOTION_BACKEND}",
+            lambda: VoiceAnalysis(backend=EMOTION_BACKEND)
+        )
+
+    def skill_matcher(self):
+        from skillMatcher import SkillMatcher
+        return self.get_or_load("spacy:zh_core_web_sm", SkillMatcher)
+
+
+_registry = ModelRegistry()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Process-wide registry shared by every interview engine"""
+    return _registry
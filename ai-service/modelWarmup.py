@@ -0,0 +1,80 @@
+"""
+Background model warm-up and readiness tracking
+
+Loads the shared models in a background thread and runs one dummy inference
+per model, so the first interview on a fresh pod does not pay for cold
+weights, lazy kernels or tokenizer downloads.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+Loader = Callable[[], Any]
+WarmFn = Callable[[Any], None]
+
+
+class ModelWarmup:
+    """Warm up a set of models and report per-model state and timings"""
+
+    def __init__(self, steps: Dict[str, Loader], warm_fns: Optional[Dict[str, WarmFn]] = None):
+        """
+        steps: model name -> loader returning the (shared) model
+        warm_fns: optional model name -> dummy inference; defaults to model.warm_up()
+        """
+        self.steps = steps
+        self.warm_fns = warm_fns or {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.status: Dict[str, Dict] = {
+            name: {"state": "pending", "load_seconds": None, "inference_seconds": None, "error": None}
+            for name in steps
+        }
+
+    def start_background(self) -> None:
+        """Start warming up in a daemon thread (no-op if already started)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self.run, name="model-warmup", daemon=True)
+            self._thread.start()
+
+    def run(self) -> None:
+        """Load and warm every model in order, recording failures per model"""
+        for name, loader in self.steps.items():
+            status = self.status[name]
+            try:
+                status["state"] = "loading"
+                start = time.perf_counter()
+                model = loader()
+                status["load_seconds"] = round(time.perf_counter() - start, 3)
+
+                status["state"] = "warming"
+                start = time.perf_counter()
+                warm_fn = self.warm_fns.get(name)
+                if warm_fn is not None:
+                    warm_fn(model)
+                elif hasattr(model, "warm_up"):
+                    model.warm_up()
+                status["inference_seconds"] = round(time.perf_counter() - start, 3)
+                status["state"] = "ready"
+                logger.info(
+                    f"Warmed up {name}: load {status['load_seconds']}s, "
+                    f"first inference {status['inference_seconds']}s"
+                )
+            except Exception as e:
+                status["state"] = "failed"
+                status["error"] = str(e)
+                logger.error(f"Warm-up failed for {name}: {e}")
+
+    def is_ready(self) -> bool:
+        return all(s["state"] == "ready" for s in self.status.values())
+
+    def report(self) -> Dict:
+        return {
+            "ready": self.is_ready(),
+            "models": {name: dict(s) for name, s in self.status.items()},
+        }
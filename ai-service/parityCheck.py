@@ -0,0 +1,163 @@
+"""
+Parity, latency and memory check for the int8 / onnx inference backends
+
+Scores a reference set with the fp32 torch model and with a candidate
+backend, then reports score drift, latency and memory side by side.
+
+Usage:
+    python parityCheck.py --model reranker --backend int8
+    python parityCheck.py --model reranker --backend onnx --pairs ref_pairs.jsonl
+    python parityCheck.py --model emotion --backend int8 --audio-dir samples/
+    python parityCheck.py --model reranker --backend int8 --max-drift 0.05  # exit 1 above
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from modelRegistry import _current_rss_bytes
+
+# (query, answer) pairs used when no --pairs file is given
+REFERENCE_PAIRS = [
+    ("请介绍一下你最近参与的一个有挑战性的项目？", "我负责把订单模块拆成独立微服务，用 RabbitMQ 异步处理订单，TPS 从 100 提升到 500。"),
+    ("请介绍一下你最近参与的一个有挑战性的项目？", "我周末喜欢打篮球和看电影。"),
+    ("如何设计一个高可用的缓存系统？", "使用 Redis 集群和哨兵做故障转移，热点数据加本地缓存，设置随机过期时间防止雪崩。"),
+    ("如何设计一个高可用的缓存系统？", "我不太清楚，可能用数据库就够了。"),
+    ("Explain the difference between a process and a thread.", "A process has its own address space while threads share memory within a process, so context switches between threads are cheaper."),
+    ("Explain the difference between a process and a thread.", "I usually use Python for scripting tasks."),
+    ("缓存雪崩", "设置随机过期时间，并对热点 key 加互斥锁重建缓存。"),
+    ("数据库分库分表", "按用户 ID 哈希分成 16 个库，每库 64 张表，使用全局 ID 生成器。"),
+]
+
+
+def _load_pairs(path: Path) -> List[tuple]:
+    pairs = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if line.strip():
+            row = json.loads(line)
+            pairs.append((row["query"], row["answer"]))
+    return pairs
+
+
+def _load_waveforms(audio_dir: Path) -> list:
+    import torch
+    import torchaudio
+    if audio_dir is None:
+        # Deterministic noise clips of 2-8 seconds when no recordings are given
+        generator = torch.Generator().manual_seed(0)
+        return [torch.randn(16000 * s, generator=generator) * 0.05 for s in (2, 4, 6, 8)]
+    waveforms = []
+    for path in sorted(audio_dir.glob("*.wav")):
+        waveform, sample_rate = torchaudio.load(str(path))
+        if sample_rate != 16000:
+            waveform = torchaudio.functional.resample(waveform, sample_rate, 16000)
+        waveforms.append(waveform.mean(dim=0))
+    return waveforms
+
+
+def _measure(load: Callable, score: Callable, inputs: list, repeats: int) -> Dict:
+    rss_before = _current_rss_bytes()
+    start = time.perf_counter()
+    model = load()
+    load_seconds = time.perf_counter() - start
+    rss_after = _current_rss_bytes()
+
+    outputs = [score(model, item) for item in inputs]  # also warms up
+    latencies = []
+    for _ in range(repeats):
+        for item in inputs:
+            start = time.perf_counter()
+            score(model, item)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "outputs": outputs,
+        "load_seconds": round(load_seconds, 2),
+        "rss_delta_mb": round((rss_after - rss_before) / 2**20, 1) if rss_before and rss_after else None,
+        "latency_ms_mean": round(statistics.mean(latencies), 2),
+        "latency_ms_p95": round(sorted(latencies)[int(len(latencies) * 0.95) - 1], 2),
+    }
+
+
+def _rank(values: List[float]) -> List[float]:
+    order = sorted(range(len(values)), key=values.__getitem__)
+    ranks = [0.0] * len(values)
+    for rank, index in enumerate(order):
+        ranks[index] = float(rank)
+    return ranks
+
+
+def _spearman(a: List[float], b: List[float]) -> float:
+    if len(a) < 2:
+        return 1.0
+    return statistics.correlation(_rank(a), _rank(b))
+
+
+def run(model: str, backend: str, inputs: list, repeats: int) -> Dict:
+    if model == "reranker":
+        from answerEvaluator import AnswerEvaluator
+
+        def load(b):
+            return lambda: AnswerEvaluator(device="cpu", backend=b, batch_window_ms=0)
+
+        def score(evaluator, pair):
+            # Below score_pairs' result cache, so repeats time the model, not a lookup
+            return evaluator._score_groups([([pair[0]], pair[1])])[0]
+    else:
+        from voiceAnalysis import VoiceAnalysis
+
+        def load(b):
+            return lambda: VoiceAnalysis(backend=b, batch_window_ms=0)
+
+        def score(analysis, waveform):
+            return analysis._classify_batch([waveform])[0]
+
+    reference = _measure(load("torch"), score, inputs, repeats)
+    candidate = _measure(load(backend), score, inputs, repeats)
+
+    ref_flat = [v for out in reference.pop("outputs") for v in out]
+    cand_flat = [v for out in candidate.pop("outputs") for v in out]
+    drifts = [abs(r - c) for r, c in zip(ref_flat, cand_flat)]
+    return {
+        "model": model,
+        "backend": backend,
+        "samples": len(inputs),
+        "drift": {
+            "max_abs": round(max(drifts), 5),
+            "mean_abs": round(statistics.mean(drifts), 5),
+            "spearman": round(_spearman(ref_flat, cand_flat), 4),
+        },
+        "fp32": reference,
+        backend: candidate,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", choices=["reranker", "emotion"], required=True)
+    parser.add_argument("--backend", choices=["int8", "onnx"], required=True)
+    parser.add_argument("--pairs", type=Path, help='JSONL with {"query": ..., "answer": ...} rows')
+    parser.add_argument("--audio-dir", type=Path, help="directory of .wav reference clips")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--max-drift", type=float, help="fail if max absolute drift exceeds this")
+    args = parser.parse_args()
+
+    if args.model == "reranker":
+        inputs = _load_pairs(args.pairs) if args.pairs else REFERENCE_PAIRS
+    else:
+        inputs = _load_waveforms(args.audio_dir)
+
+    report = run(args.model, args.backend, inputs, args.repeats)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+    if args.max_drift is not None and report["drift"]["max_abs"] > args.max_drift:
+        print(f"DRIFT {report['drift']['max_abs']} exceeds {args.max_drift}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Precomputed question pools
+
+Questions are generated offline for every (job profile, phase, difficulty,
+question_type) slot and stored in a local SQLite file. At runtime the whole
+pool is indexed in memory once, so serving a question is a dict lookup plus
+a random pick; the LLM is only called when a slot has nothing left to ask.
+
+Build or extend the pool:
+    python questionPool.py --per-slot 8
+    python questionPool.py --industry technology finance --level junior senior
+    python questionPool.py --stats
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+QUESTION_POOL_PATH = os.getenv(
+    "QUESTION_POOL_PATH", str(Path(__file__).parent / "data" / "question_pool.sqlite3")
+)
+QUESTION_POOL_ENABLED = os.getenv("QUESTION_POOL", "1") == "1"
+
+# Job profiles offered by the frontend setup page
+INDUSTRIES = [
+    "technology", "finance", "healthcare", "marketing", "sales",
+    "education", "consulting", "engineering", "design", "hr",
+]
+LEVELS = ["entry", "junior", "mid", "senior", "lead", "manager", "director", "executive"]
+
+# (phase, difficulty, question_type) slots requested by the interview engines
+POOL_SLOTS = [
+    ("introduction", "easy", "general"),
+    ("technical", "medium", "technical"),
+    ("technical", "hard", "technical"),
+    ("behavioral", "medium", "behavioral"),
+    ("scenario", "hard", "technical"),
+    ("closing", "easy", "general"),
+]
+
+SlotKey = Tuple[str, str, str, str]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    profile TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    question_type TEXT NOT NULL,
+    question TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    UNIQUE (profile, phase, difficulty, question_type, question)
+);
+CREATE INDEX IF NOT EXISTS idx_questions_slot
+    ON questions (profile, phase, difficulty, question_type);
+"""
+
+
+def profile_key(candidate_info: Optional[Dict]) -> str:
+    """Normalized "industry/level" profile; missing parts become "general" """
+    info = candidate_info or {}
+    industry = info.get("industry") or info.get("target_position") or "general"
+    level = info.get("level") or "general"
+    return f"{str(industry).strip().lower()}/{str(level).strip().lower()}"
+
+
+def profile_job_description(industry: str, level: str) -> str:
+    """Job description the backend sends to /engine/start for this profile"""
+    return f"{industry} {level} role"
+
+
+class QuestionPool:
+    """SQLite-backed question pool with an in-memory slot index"""
+
+    def __init__(self, path: str = QUESTION_POOL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[SlotKey, List[Dict]]] = None
+        self._random = random.Random()
+        self.counters = {"hits": 0, "misses": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def _load_index(self) -> Dict[SlotKey, List[Dict]]:
+        index: Dict[SlotKey, List[Dict]] = {}
+        if not Path(self.path).exists():
+            return index
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT profile, phase, difficulty, question_type, payload FROM questions"
+            ).fetchall()
+        for profile, phase, difficulty, question_type, payload in rows:
+            index.setdefault((profile, phase, difficulty, question_type), []).append(json.loads(payload))
+        logger.info(f"Question pool loaded: {len(rows)} questions in {len(index)} slots")
+        return index
+
+    def reload(self) -> None:
+        with self._lock:
+            self._index = self._load_index()
+
+    def draw(
+        self,
+        profile: str,
+        phase: str,
+        difficulty: str,
+        question_type: str,
+        exclude: Iterable[str] = (),
+    ) -> Optional[Dict]:
+        """Random pooled question for the slot that has not been asked yet, or None"""
+        with self._lock:
+            if self._index is None:
+                self._index = self._load_index()
+            candidates = self._index.get((profile, phase, difficulty, question_type), [])
+            asked = set(exclude)
+            fresh = [q for q in candidates if q["question"] not in asked]
+            if not fresh:
+                self.counters["misses"] += 1
+                return None
+            self.counters["hits"] += 1
+            return json.loads(json.dumps(self._random.choice(fresh)))  # callers mutate the dict
+
+    def add(self, profile: str, phase: str, difficulty: str, question_type: str, question: Dict) -> bool:
+        """Store one generated question; returns False if the slot already has it"""
+        payload = {k: v for k, v in question.items() if k != "metadata"}
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO questions "
+                "(profile, phase, difficulty, question_type, question, payload, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (profile, phase, difficulty, question_type, question["question"],
+                 json.dumps(payload, ensure_ascii=False), time.time()),
+            )
+        with self._lock:
+            self._index = None  # re-read on next draw
+        return cursor.rowcount > 0
+
+    def slot_sizes(self) -> Dict[str, int]:
+        if not Path(self.path).exists():
+            return {}
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT profile, phase, difficulty, question_type, COUNT(*) FROM questions "
+                "GROUP BY profile, phase, difficulty, question_type"
+            ).fetchall()
+        return {"/".join(row[:4]): row[4] for row in rows}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_ratio": round(self.counters["hits"] / lookups, 3) if lookups else None,
+                "slots": len(self._index) if self._index is not None else None,
+                "questions": sum(len(v) for v in self._index.values()) if self._index is not None else None,
+            }
+
+
+_pool: Optional[QuestionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_question_pool() -> Optional[QuestionPool]:
+    """Process-wide question pool, or None when QUESTION_POOL=0"""
+    global _pool
+    if not QUESTION_POOL_ENABLED:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = QuestionPool()
+        return _pool
+
+
+# ---- Offline builder ----
+
+async def build_pool(
+    pool: QuestionPool,
+    api_key: str,
+    industries: List[str],
+    levels: List[str],
+    per_slot: int,
+    concurrency: int,
+) -> Dict[str, int]:
+    """Generate per_slot questions for every profile x slot (existing ones are kept)"""
+    from interviewQuestionGenerator import InterviewPhase, InterviewQuestionGenerator
+
+    # Pool lookups are off while building so every request reaches the LLM
+    generator = InterviewQuestionGenerator(api_key, use_pool=False)
+    existing = pool.slot_sizes()
+    semaphore = asyncio.Semaphore(concurrency)
+    added = {"added": 0, "duplicates": 0, "failed": 0}
+
+    async def generate(industry: str, level: str, phase: str, difficulty: str, question_type: str):
+        async with semaphore:
+            result = await generator.agenerate_question(
+                job_description=profile_job_description(industry, level),
+                candidate_info={"industry": industry, "level": level},
+                phase=InterviewPhase(phase),
+                difficulty=difficulty,
+                question_type=question_type,
+            )
+        if "error" in result.get("metadata", {}) or not result.get("question"):
+            added["failed"] += 1
+            return
+        profile = profile_key({"industry": industry, "level": level})
+        if pool.add(profile, phase, difficulty, question_type, result):
+            added["added"] += 1
+        else:
+            added["duplicates"] += 1
+
+    jobs = []
+    for industry in industries:
+        for level in levels:
+            profile = profile_key({"industry": industry, "level": level})
+            for phase, difficulty, question_type in POOL_SLOTS:
+                have = existing.get(f"{profile}/{phase}/{difficulty}/{question_type}", 0)
+                for _ in range(max(0, per_slot - have)):
+                    jobs.append(generate(industry, level, phase, difficulty, question_type))
+
+    logger.info(f"Generating {len(jobs)} questions with concurrency {concurrency}")
+    await asyncio.gather(*jobs)
+    return added
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--industry", nargs="+", default=INDUSTRIES)
+    parser.add_argument("--level", nargs="+", default=LEVELS)
+    parser.add_argument("--per-slot", type=int, default=5, help="target questions per slot")
+    parser.add_argument("--concurrency", type=int, default=4, help="parallel LLM requests")
+    parser.add_argument("--path", default=QUESTION_POOL_PATH)
+    parser.add_argument("--stats", action="store_true", help="print slot sizes and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    pool = QuestionPool(args.path)
+    if args.stats:
+        print(json.dumps(pool.slot_sizes(), indent=2, ensure_ascii=False))
+        return
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    api_key = os.getenv("DEEPSEEK_API_KEY", "")
+    if not api_key:
+        raise SystemExit("DEEPSEEK_API_KEY is required to build the question pool")
+
+    result = asyncio.run(build_pool(
+        pool, api_key, args.industry, args.level, args.per_slot, args.concurrency
+    ))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Background report jobs
+
+Final reports are built outside the request that ends the interview. Each
+job gets an id, runs under a bounded number of concurrent workers, reports
+its progress, and its result is kept for a TTL after it finishes.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+REPORT_JOB_CONCURRENCY = int(os.getenv("REPORT_JOB_CONCURRENCY", "4"))
+REPORT_JOB_TTL_SECONDS = float(os.getenv("REPORT_JOB_TTL_SECONDS", "3600"))
+
+
+class ReportJobNotFound(KeyError):
+    """Unknown job id, or its result has expired"""
+
+
+@dataclass
+class ReportJob:
+    job_id: str
+    session_id: str
+    status: str = "queued"  # queued, running, succeeded, failed
+    stage: str = "queued"
+    progress: float = 0.0
+    result: Optional[Dict] = None  # partial (numeric sections) while running
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def set_progress(self, stage: str, progress: float, partial: Optional[Dict] = None) -> None:
+        self.stage = stage
+        self.progress = round(progress, 2)
+        if partial is not None:
+            self.result = partial
+
+    def describe(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "session_id": self.session_id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "partial_available": self.result is not None and self.status != "succeeded",
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+JobRunner = Callable[[ReportJob], Awaitable[Dict]]
+
+
+class ReportJobManager:
+    """Runs report jobs on the event loop with bounded concurrency and result TTL"""
+
+    def __init__(self, max_concurrency: int = REPORT_JOB_CONCURRENCY, ttl_seconds: float = REPORT_JOB_TTL_SECONDS):
+        self.max_concurrency = max_concurrency
+        self.ttl_seconds = ttl_seconds
+        self._jobs: Dict[str, ReportJob] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.metrics = {"submitted": 0, "succeeded": 0, "failed": 0, "expired": 0}
+
+    def submit(self, session_id: str, runner: JobRunner) -> ReportJob:
+        """Queue a job; runner(job) builds the report and may call job.set_progress"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        job = ReportJob(job_id=os.urandom(12).hex(), session_id=session_id)
+        self._jobs[job.job_id] = job
+        self._tasks[job.job_id] = asyncio.create_task(self._run(job, runner))
+        self.metrics["submitted"] += 1
+        return job
+
+    async def _run(self, job: ReportJob, runner: JobRunner) -> None:
+        try:
+            async with self._semaphore:
+                job.status = "running"
+                job.started_at = time.time()
+                job.set_progress("running", 0.05)
+                job.result = await runner(job)
+            job.status = "succeeded"
+            job.set_progress("done", 1.0)
+            self.metrics["succeeded"] += 1
+        except Exception as e:
+            logger.error(f"Report job {job.job_id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+            self.metrics["failed"] += 1
+        finally:
+            job.finished_at = time.time()
+            self._tasks.pop(job.job_id, None)
+
+    def get(self, job_id: str) -> ReportJob:
+        self.sweep()
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise ReportJobNotFound(job_id)
+        return job
+
+    def sweep(self) -> int:
+        """Drop finished jobs older than the TTL"""
+        cutoff = time.time() - self.ttl_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+        self.metrics["expired"] += len(expired)
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        by_status: Dict[str, int] = {}
+        for job in self._jobs.values():
+            by_status[job.status] = by_status.get(job.status, 0) + 1
+        return {
+            **self.metrics,
+            "jobs": len(self._jobs),
+            "by_status": by_status,
+            "max_concurrency": self.max_concurrency,
+            "ttl_seconds": self.ttl_seconds,
+        }
@@ -0,0 +1,176 @@
+"""
+Content-addressed result cache
+
+Expensive results (transcripts, reranker scores, skill extraction, emotion)
+are keyed by a hash of the input content plus the model, version and
+parameters that produced them. Lookups go to an in-process LRU first and,
+when CACHE_DIR is set, to an on-disk tier with size-based eviction.
+Values must be JSON-serializable.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.getenv("CACHE_DIR")  # unset: memory tier only
+CACHE_MEMORY_ENTRIES = int(os.getenv("CACHE_MEMORY_ENTRIES", "2048"))
+CACHE_DISK_MAX_MB = float(os.getenv("CACHE_DISK_MAX_MB", "512"))
+
+_MISS = object()
+
+
+def content_key(content: Union[bytes, str], **params) -> str:
+    """Hash of the content plus model/version/params (order-independent)"""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(content.encode("utf-8") if isinstance(content, str) else content)
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Two-tier (memory LRU + optional disk) cache for one kind of result"""
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = CACHE_MEMORY_ENTRIES,
+        disk_dir: Optional[str] = CACHE_DIR,
+        disk_max_bytes: int = int(CACHE_DISK_MAX_MB * 1024 * 1024),
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_dir = Path(disk_dir) / name if disk_dir else None
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Any]" = OrderedDict()
+        self._disk_bytes = self._scan_disk_bytes()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self._get(key)
+        return default if value is _MISS else value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._remember(key, value)
+        if self.disk_dir is not None:
+            self._write_disk(key, value)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        value = self._get(key)
+        if value is _MISS:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = sum(self.counters.values())
+            hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+            return {
+                **self.counters,
+                "hit_ratio": round(hits / lookups, 3) if lookups else None,
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk_bytes if self.disk_dir is not None else None,
+            }
+
+    def _get(self, key: str) -> Any:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return self._memory[key]
+
+        value = self._read_disk(key) if self.disk_dir is not None else _MISS
+        with self._lock:
+            if value is _MISS:
+                self.counters["misses"] += 1
+            else:
+                self.counters["disk_hits"] += 1
+                self._remember(key, value)
+        return value
+
+    def _remember(self, key: str, value: Any) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    # ---- Disk tier ----
+
+    def _path(self, key: str) -> Path:
+        return self.disk_dir / f"{key}.json"
+
+    def _scan_disk_bytes(self) -> int:
+        if self.disk_dir is None:
+            return 0
+        return sum(p.stat().st_size for p in self.disk_dir.glob("*.json"))
+
+    def _read_disk(self, key: str) -> Any:
+        path = self._path(key)
+        try:
+            value = json.loads(path.read_text(encoding="utf-8"))
+            os.utime(path)  # mtime doubles as last-access time for eviction
+            return value
+        except (OSError, ValueError):
+            return _MISS
+
+    def _write_disk(self, key: str, value: Any) -> None:
+        path = self._path(key)
+        try:
+            data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(data)
+            tmp.replace(path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Cache {self.name}: could not persist entry: {e}")
+            return
+        with self._lock:
+            self._disk_bytes += len(data)
+            over_budget = self._disk_bytes > self.disk_max_bytes
+        if over_budget:
+            self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        """Delete least recently used files until the tier is back under 90% of its budget"""
+        files = sorted(self.disk_dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in files)
+        target = self.disk_max_bytes * 0.9
+        for path in files:
+            if total <= target:
+                break
+            try:
+                size = path.stat().st_size
+                path.unlink()
+                total -= size
+            except OSError:
+                continue
+        with self._lock:
+            self._disk_bytes = total
+
+
+_caches: Dict[str, ResultCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name: str) -> ResultCache:
+    """Process-wide cache for one kind of result"""
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = ResultCache(name)
+        return _caches[name]
+
+
+def get_cache_stats() -> Dict:
+    """Hit ratios and sizes of every cache created in this process"""
+    return {name: cache.stats() for name, cache in _caches.items()}
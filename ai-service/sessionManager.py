@@ -0,0 +1,188 @@
+"""
+Bounded interview session table
+
+Keeps engine sessions in LRU order and evicts them on idle TTL, on a
+max-session cap and on an estimated memory budget. Evicted ids are
+remembered for a while so callers can tell "evicted" apart from "never
+existed".
+"""
+
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+EvictionHook = Callable[[str, Any, str], None]
+
+
+class SessionNotFound(KeyError):
+    """No session with this id has ever been registered (or it was removed)"""
+
+
+class SessionEvicted(KeyError):
+    """The session existed but was evicted"""
+
+    def __init__(self, session_id: str, reason: str):
+        super().__init__(session_id)
+        self.session_id = session_id
+        self.reason = reason
+
+
+def estimate_size(obj: Any, _seen: Optional[set] = None) -> int:
+    """Rough deep size in bytes of plain Python containers and their contents"""
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, seen) for item in obj)
+    return size
+
+
+def engine_state_size(engine: Any) -> int:
+    """Per-session memory of an engine: its interview state (models are shared)"""
+    state = getattr(engine, "interview_state", None) or getattr(engine, "state", None) or {}
+    return estimate_size(state)
+
+
+class SessionManager:
+    """LRU session table with idle TTL, max-session cap and memory budget"""
+
+    def __init__(
+        self,
+        ttl_seconds: float = 1800,
+        max_sessions: int = 500,
+        memory_budget_bytes: Optional[int] = None,
+        size_fn: Callable[[Any], int] = engine_state_size,
+        max_tombstones: int = 10000,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.memory_budget_bytes = memory_budget_bytes
+        self.size_fn = size_fn
+        self.max_tombstones = max_tombstones
+
+        self._lock = threading.RLock()
+        # session_id -> {"engine", "last_access", "size"}; oldest access first
+        self._sessions: "OrderedDict[str, Dict]" = OrderedDict()
+        self._tombstones: "OrderedDict[str, str]" = OrderedDict()
+        self._hooks: List[EvictionHook] = []
+        self._total_bytes = 0
+        self.metrics = {
+            "created": 0,
+            "evictions": {"ttl": 0, "capacity": 0, "memory": 0},
+        }
+
+    def on_evict(self, hook: EvictionHook) -> None:
+        """Register hook(session_id, engine, reason), called after each eviction"""
+        self._hooks.append(hook)
+
+    def add(self, session_id: str, engine: Any) -> None:
+        with self._lock:
+            size = self.size_fn(engine)
+            self._sessions[session_id] = {"engine": engine, "last_access": time.monotonic(), "size": size}
+            self._total_bytes += size
+            self._tombstones.pop(session_id, None)
+            self.metrics["created"] += 1
+            self._enforce_limits()
+
+    def get(self, session_id: str) -> Any:
+        """Return the engine and mark it most recently used"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                reason = self._tombstones.get(session_id)
+                if reason is not None:
+                    raise SessionEvicted(session_id, reason)
+                raise SessionNotFound(session_id)
+
+            if time.monotonic() - entry["last_access"] > self.ttl_seconds:
+                self._evict(session_id, "ttl")
+                raise SessionEvicted(session_id, "ttl")
+
+            entry["last_access"] = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            return entry["engine"]
+
+    def touch(self, session_id: str) -> None:
+        """Re-measure a session after its state changed and re-check the budget"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return
+            size = self.size_fn(entry["engine"])
+            self._total_bytes += size - entry["size"]
+            entry["size"] = size
+            entry["last_access"] = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            self._enforce_limits()
+
+    def remove(self, session_id: str) -> Optional[Any]:
+        """Drop a finished session without recording an eviction"""
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            if entry is None:
+                return None
+            self._total_bytes -= entry["size"]
+            return entry["engine"]
+
+    def sweep(self) -> int:
+        """Evict every session idle longer than the TTL; returns how many"""
+        with self._lock:
+            now = time.monotonic()
+            expired = [
+                sid for sid, entry in self._sessions.items()
+                if now - entry["last_access"] > self.ttl_seconds
+            ]
+            for sid in expired:
+                self._evict(sid, "ttl")
+            return len(expired)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "active_sessions": len(self._sessions),
+                "estimated_bytes": self._total_bytes,
+                "max_sessions": self.max_sessions,
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "created": self.metrics["created"],
+                "evictions": dict(self.metrics["evictions"]),
+            }
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _enforce_limits(self) -> None:
+        while len(self._sessions) > self.max_sessions:
+            self._evict(next(iter(self._sessions)), "capacity")
+        if self.memory_budget_bytes is not None:
+            # Never evict the most recent session just to fit the budget
+            while self._total_bytes > self.memory_budget_bytes and len(self._sessions) > 1:
+                self._evict(next(iter(self._sessions)), "memory")
+
+    def _evict(self, session_id: str, reason: str) -> None:
+        entry = self._sessions.pop(session_id)
+        self._total_bytes -= entry["size"]
+        self._tombstones[session_id] = reason
+        while len(self._tombstones) > self.max_tombstones:
+            self._tombstones.popitem(last=False)
+        self.metrics["evictions"][reason] += 1
+        logger.info(f"Evicted interview session {session_id} ({reason})")
+
+        for hook in self._hooks:
+            try:
+                hook(session_id, entry["engine"], reason)
+            except Exception as e:
+                logger.error(f"Session eviction hook failed: {e}")
@@ -1,39 +1,54 @@
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import numpy as np
 import spacy
 from typing import Dict, List
 
+from resultCache import content_key, get_cache
+from skillTaxonomy import get_skill_taxonomy
+
+SPACY_MODEL_NAME = "zh_core_web_sm"
+# Only NER is used; the other trained components are not loaded
+SPACY_EXCLUDE = ["tagger", "parser", "attribute_ruler", "lemmatizer", "senter", "morphologizer"]
+# Bump when the extraction rules below change so cached results are not reused
+SKILL_EXTRACTOR_VERSION = 2
+SKILL_MATCH_THRESHOLD = 0.6
+
 class SkillMatcher:
     def __init__(self):
-        self.nlp = spacy.load("zh_core_web_sm")
-        self.vectorizer = TfidfVectorizer(max_features=1000)
+        self.nlp = spacy.load(SPACY_MODEL_NAME, exclude=SPACY_EXCLUDE)
+        # Drop the shared tok2vec when NER carries its own embedding layer
+        if "tok2vec" in self.nlp.pipe_names and not self.nlp.get_pipe("tok2vec").listening_components:
+            self.nlp.disable_pipe("tok2vec")
+        # Aliases, compiled keyword matcher and skill vectors (built once per process)
+        self.taxonomy = get_skill_taxonomy()
+        # The same job description is extracted for every report
+        self.cache = get_cache("skills")
         
+    def warm_up(self) -> None:
+        """Run the pipeline once so the first real request is not cold"""
+        self.extract_skills("熟悉 Python 和 Docker 的后端开发工程师")
+
     def extract_skills(self, text: str) -> list:
-        """Extract skills from text"""
+        """Extract skills from text (memoized by content)"""
+        key = content_key(
+            text,
+            model=SPACY_MODEL_NAME,
+            model_version=self.nlp.meta.get("version"),
+            extractor=SKILL_EXTRACTOR_VERSION,
+            taxonomy=self.taxonomy.version,
+        )
+        return self.cache.get_or_compute(key, lambda: self._extract_skills(text))
+
+    def _extract_skills(self, text: str) -> list:
         doc = self.nlp(text)
         
-        # Define skill-related part-of-speech patterns
-        skills = []
-        skill_keywords = {
-            "编程语言": ["Python", "Java", "JavaScript", "C++", "Go", "Rust"],
-            "框架": ["React", "Vue", "Django", "Spring", "TensorFlow", "PyTorch"],
-            "工具": ["Docker", "Kubernetes", "AWS", "Git", "Jenkins"],
-            "技能": ["机器学习", "深度学习", "数据分析", "系统设计"]
-        }
-        
         # Extract skill entities
-        for ent in doc.ents:
-            if ent.label_ in ["ORG", "PRODUCT", "TECH"]:
-                skills.append(ent.text)
+        skills = [ent.text for ent in doc.ents if ent.label_ in ["ORG", "PRODUCT", "TECH"]]
         
-        # Keyword matching
-        for category, keywords in skill_keywords.items():
-            for keyword in keywords:
-                if keyword.lower() in text.lower():
-                    skills.append(keyword)
+        # Keyword matching: one pass over the text for every taxonomy alias
+        skills.extend(self.taxonomy.find(text))
         
-        return list(set(skills))
+        # Aliases ("k8s", "golang") collapse onto one canonical skill
+        return list(dict.fromkeys(self.taxonomy.normalize(s) for s in skills if s.strip()))
     
     def match_skills(self, resume_text: str, job_desc: str) -> Dict:
         """Match resume skills with job requirements"""
@@ -41,35 +56,25 @@ class SkillMatcher:
         resume_skills = self.extract_skills(resume_text)
         job_skills = self.extract_skills(job_desc)
         
-        # Calculate matching degree
-        all_skills = list(set(resume_skills + job_skills))
-        skill_vectors = self.vectorizer.fit_transform(all_skills)
-        
-        # Calculate cosine similarity
-        resume_vec = self.vectorizer.transform(resume_skills)
-        job_vec = self.vectorizer.transform(job_skills)
+        # Similarity of every resume skill to every job skill in one matrix product
+        similarity = self.taxonomy.similarity(resume_skills, job_skills)
         
-        similarity = cosine_similarity(resume_vec, job_vec)
+        # Best resume skill per job skill (column-wise argmax)
+        if resume_skills:
+            best_rows = similarity.argmax(axis=0)
+            best_sims = similarity.max(axis=0)
+        else:
+            best_rows = np.zeros(len(job_skills), dtype=int)
+            best_sims = np.zeros(len(job_skills))
         
-        # Calculate matching score
         matched_skills = []
         missing_skills = []
-        
-        for job_skill in job_skills:
-            max_sim = 0
-            best_match = None
-            
-            for i, resume_skill in enumerate(resume_skills):
-                sim = similarity[i][job_skills.index(job_skill)]
-                if sim > max_sim and sim > 0.6:  # Similarity threshold
-                    max_sim = sim
-                    best_match = resume_skill
-            
-            if best_match:
+        for job_skill, row, sim in zip(job_skills, best_rows, best_sims):
+            if sim > SKILL_MATCH_THRESHOLD:
                 matched_skills.append({
                     "required": job_skill,
-                    "matched": best_match,
-                    "confidence": round(max_sim, 2)
+                    "matched": resume_skills[row],
+                    "confidence": round(float(sim), 2)
                 })
             else:
                 missing_skills.append(job_skill)
@@ -80,4 +85,4 @@ class SkillMatcher:
             "missing_skills": missing_skills,
             "resume_skills": resume_skills,
             "job_skills": job_skills
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,127 @@
+"""
+Skill taxonomy index
+
+Canonical skills with categories and aliases, compiled once into a
+multi-pattern matcher (textMatcher.PhraseMatcher) plus precomputed skill
+vectors. Extraction is one pass over the text; skills from any source (keyword
+hits, NER entities) are normalized to their canonical name before matching.
+SKILL_TAXONOMY_PATH (JSON, same shape as DEFAULT_SKILL_TAXONOMY) extends the
+built-in taxonomy.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from textMatcher import PhraseMatcher, fold_case
+
+SKILL_TAXONOMY_PATH = os.getenv("SKILL_TAXONOMY_PATH", "")
+
+DEFAULT_SKILL_TAXONOMY: Dict[str, Dict] = {
+    # 编程语言
+    "Python": {"category": "编程语言", "aliases": ["python", "python3"]},
+    "Java": {"category": "编程语言", "aliases": ["java"]},
+    "JavaScript": {"category": "编程语言", "aliases": ["javascript", "js", "ecmascript"]},
+    "TypeScript": {"category": "编程语言", "aliases": ["typescript", "ts"]},
+    "C++": {"category": "编程语言", "aliases": ["c++", "cpp"]},
+    "Go": {"category": "编程语言", "aliases": ["go", "golang", "go语言"]},
+    "Rust": {"category": "编程语言", "aliases": ["rust"]},
+    # 框架
+    "React": {"category": "框架", "aliases": ["react", "react.js", "reactjs"]},
+    "Vue": {"category": "框架", "aliases": ["vue", "vue.js", "vuejs"]},
+    "Django": {"category": "框架", "aliases": ["django"]},
+    "Spring": {"category": "框架", "aliases": ["spring", "spring boot", "springboot"]},
+    "TensorFlow": {"category": "框架", "aliases": ["tensorflow"]},
+    "PyTorch": {"category": "框架", "aliases": ["pytorch", "torch"]},
+    # 工具
+    "Docker": {"category": "工具", "aliases": ["docker"]},
+    "Kubernetes": {"category": "工具", "aliases": ["kubernetes", "k8s"]},
+    "AWS": {"category": "工具", "aliases": ["aws", "amazon web services"]},
+    "Git": {"category": "工具", "aliases": ["git"]},
+    "Jenkins": {"category": "工具", "aliases": ["jenkins"]},
+    # 技能
+    "机器学习": {"category": "技能", "aliases": ["机器学习", "machine learning"]},
+    "深度学习": {"category": "技能", "aliases": ["深度学习", "deep learning"]},
+    "数据分析": {"category": "技能", "aliases": ["数据分析", "data analysis"]},
+    "系统设计": {"category": "技能", "aliases": ["系统设计", "system design", "架构设计"]},
+}
+
+_SPACES = re.compile(r"\s+")
+
+
+def _alias_key(name: str) -> str:
+    return _SPACES.sub(" ", fold_case(name.strip()))
+
+
+def load_skill_taxonomy(path: str = SKILL_TAXONOMY_PATH) -> Dict[str, Dict]:
+    """Built-in taxonomy extended with the JSON taxonomy at path, if any"""
+    taxonomy = {skill: {**entry, "aliases": list(entry["aliases"])} for skill, entry in DEFAULT_SKILL_TAXONOMY.items()}
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            extra = json.load(f)
+        for skill, entry in extra.items():
+            current = taxonomy.setdefault(skill, {"category": entry.get("category", "其他"), "aliases": []})
+            current["aliases"].extend(entry.get("aliases", []))
+    return taxonomy
+
+
+class SkillTaxonomy:
+    """Alias index, compiled matcher and skill vectors, built once per process"""
+
+    def __init__(self, taxonomy: Optional[Dict[str, Dict]] = None):
+        self.taxonomy = taxonomy if taxonomy is not None else load_skill_taxonomy()
+        # Goes into extraction cache keys, so editing the taxonomy invalidates them
+        self.version = hashlib.blake2b(
+            json.dumps(self.taxonomy, sort_keys=True, ensure_ascii=False).encode("utf-8"), digest_size=8
+        ).hexdigest()
+        self.categories = {skill: entry.get("category") for skill, entry in self.taxonomy.items()}
+        self._aliases: Dict[str, str] = {}
+        for skill, entry in self.taxonomy.items():
+            for alias in [skill, *entry.get("aliases", [])]:
+                self._aliases[_alias_key(alias)] = skill
+        self.matcher = PhraseMatcher({
+            skill: [skill, *entry.get("aliases", [])] for skill, entry in self.taxonomy.items()
+        })
+
+        # Stateless hashing (same tokenization the per-call TF-IDF used): no
+        # fitting per call, and taxonomy skill vectors are computed up front
+        self.vectorizer = HashingVectorizer(n_features=2 ** 14, alternate_sign=False, norm="l2")
+        names = list(self.taxonomy)
+        matrix = self.vectorizer.transform(names)
+        self._vectors = {name: matrix[i] for i, name in enumerate(names)}
+
+    def normalize(self, name: str) -> str:
+        """Canonical skill name for an alias; other names are returned trimmed"""
+        return self._aliases.get(_alias_key(name), name.strip())
+
+    def find(self, text: str) -> List[str]:
+        """Canonical skills mentioned in text, in order of first mention"""
+        return list(dict.fromkeys(m.label for m in self.matcher.find_all(text)))
+
+    def vectors(self, skills: List[str]):
+        """Sparse (len(skills), n_features) matrix; only non-taxonomy names are hashed here"""
+        from scipy.sparse import vstack
+
+        other = [s for s in dict.fromkeys(skills) if s not in self._vectors]
+        hashed = self.vectorizer.transform(other) if other else None
+        rows = {name: hashed[i] for i, name in enumerate(other)}
+        return vstack([self._vectors.get(s, rows.get(s)) for s in skills])
+
+    def similarity(self, left: List[str], right: List[str]) -> np.ndarray:
+        """Cosine similarity matrix (vectors are l2-normalized); identical skills score 1"""
+        if not left or not right:
+            return np.zeros((len(left), len(right)))
+        sim = (self.vectors(left) @ self.vectors(right).T).toarray()
+        exact = np.asarray(left, dtype=object)[:, None] == np.asarray(right, dtype=object)[None, :]
+        return np.where(exact, 1.0, sim)
+
+
+@functools.lru_cache(maxsize=1)
+def get_skill_taxonomy() -> SkillTaxonomy:
+    return SkillTaxonomy()
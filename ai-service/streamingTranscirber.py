@@ -1,46 +1,295 @@
+"""
+Incremental (streaming) transcription
+
+Audio arrives in small frames (raw PCM16 or a WebM/Ogg Opus stream), is
+converted to 16 kHz mono float32 and segmented by a frame-energy VAD. While
+the candidate is speaking the open utterance is re-decoded every
+STREAM_PARTIAL_SECONDS for a partial result; when STREAM_MIN_SILENCE_MS of
+silence follows speech the utterance is decoded once more as final. Only the
+utterance is decoded, never the whole recording, so the transcript is ready
+as soon as the candidate stops speaking.
+"""
+
+import os
 import queue
 import threading
-from faster_whisper import WhisperModel
+from dataclasses import dataclass
+from typing import Dict, List, Optional
 
-class StreamingTranscriber:
-    def __init__(self, model_size: str = "base"):
-        # Use faster-whisper for better performance
-        self.model = WhisperModel(
-            model_size, 
-            device="cuda", 
-            compute_type="float16"
-        )
-        self.audio_queue = queue.Queue()
-        self.result_queue = queue.Queue()
-        
-    def start_streaming(self, sample_rate: int = 16000):
-        """Start streaming transcription thread"""
-        def process_stream():
-            segments, info = self.model.transcribe(
-                self.audio_generator(),
-                language="zh",
-                beam_size=5,
-                vad_filter=True,  # Voice activity detection
-                vad_parameters=dict(
-                    min_silence_duration_ms=500,
-                    threshold=0.5
-                )
-            )
-            
-            for segment in segments:
-                self.result_queue.put({
-                    "text": segment.text,
-                    "start": segment.start,
-                    "end": segment.end,
-                    "confidence": segment.avg_logprob
-                })
-                
-        threading.Thread(target=process_stream, daemon=True).start()
-        
-    def audio_generator(self):
-        """Audio generator"""
-        while True:
-            chunk = self.audio_queue.get()
+import numpy as np
+
+from modelRegistry import get_model_registry
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+
+STREAM_MIN_SILENCE_MS = int(os.getenv("STREAM_MIN_SILENCE_MS", "500"))
+STREAM_PARTIAL_SECONDS = float(os.getenv("STREAM_PARTIAL_SECONDS", "1.0"))  # 0 disables partials
+STREAM_MAX_SEGMENT_SECONDS = float(os.getenv("STREAM_MAX_SEGMENT_SECONDS", "15"))
+STREAM_VAD_MIN_RMS = float(os.getenv("STREAM_VAD_MIN_RMS", "0.01"))
+
+
+@dataclass
+class Utterance:
+    kind: str  # "partial" or "final"
+    index: int  # utterance number within the stream
+    audio: np.ndarray  # 16 kHz mono float32
+    offset: float  # seconds from the start of the stream
+
+
+class PCM16Decoder:
+    """Little-endian 16-bit mono PCM at any rate -> 16 kHz float32 (stateful linear resampling)"""
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self._carry = b""  # odd trailing byte of the previous frame
+        self._tail = np.zeros(0, dtype=np.float32)  # last input sample, for interpolation
+        self._position = 0.0  # next output position in input samples, relative to _tail
+
+    def decode(self, data: bytes) -> np.ndarray:
+        data = self._carry + data
+        usable = len(data) - len(data) % 2
+        self._carry = data[usable:]
+        samples = np.frombuffer(data[:usable], dtype="<i2").astype(np.float32) / 32768.0
+        if self.sample_rate == SAMPLE_RATE:
+            return samples
+        return self._resample(samples)
+
+    def _resample(self, samples: np.ndarray) -> np.ndarray:
+        x = np.concatenate([self._tail, samples])
+        if len(x) < 2:
+            self._tail = x
+            return np.zeros(0, dtype=np.float32)
+        step = self.sample_rate / SAMPLE_RATE
+        positions = np.arange(self._position, len(x) - 1, step)
+        out = np.interp(positions, np.arange(len(x)), x).astype(np.float32)
+        next_position = positions[-1] + step if len(positions) else self._position
+        self._position = next_position - (len(x) - 1)
+        self._tail = x[-1:]
+        return out
+
+    def close(self) -> np.ndarray:
+        return np.zeros(0, dtype=np.float32)
+
+
+class _QueueReader:
+    """Blocking, non-seekable file object fed from a queue of byte chunks"""
+
+    def __init__(self, chunks: "queue.Queue"):
+        self._chunks = chunks
+        self._buffer = b""
+        self._eof = False
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            chunk = self._chunks.get()
             if chunk is None:
+                self._eof = True
+            else:
+                self._buffer += chunk
+            if self._buffer and size >= 0:
+                break  # return what we have; the demuxer asks again
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+class OpusDecoder:
+    """
+    Incremental decoder for a WebM/Ogg Opus byte stream (MediaRecorder output),
+    using PyAV (already installed with faster-whisper). Demuxing runs in a
+    thread; decode() returns whatever 16 kHz samples are ready so far.
+    """
+
+    def __init__(self):
+        self._chunks: "queue.Queue" = queue.Queue()
+        self._output: "queue.Queue" = queue.Queue()
+        self._error: Optional[Exception] = None
+        self._thread = threading.Thread(target=self._run, name="opus-decoder", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        import av
+
+        try:
+            container = av.open(_QueueReader(self._chunks), mode="r")
+            resampler = av.AudioResampler(format="s16", layout="mono", rate=SAMPLE_RATE)
+            for frame in container.decode(audio=0):
+                for resampled in resampler.resample(frame):
+                    self._output.put(resampled.to_ndarray().reshape(-1).astype(np.float32) / 32768.0)
+            for resampled in resampler.resample(None):
+                self._output.put(resampled.to_ndarray().reshape(-1).astype(np.float32) / 32768.0)
+        except Exception as e:
+            self._error = e
+        finally:
+            self._output.put(None)
+
+    def _drain(self) -> np.ndarray:
+        parts = []
+        while True:
+            try:
+                part = self._output.get_nowait()
+            except queue.Empty:
                 break
-            yield chunk
\ No newline at end of file
+            if part is not None:
+                parts.append(part)
+        if self._error is not None:
+            raise ValueError(f"Could not decode Opus stream: {self._error}")
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+
+    def decode(self, data: bytes) -> np.ndarray:
+        self._chunks.put(data)
+        return self._drain()
+
+    def close(self) -> np.ndarray:
+        self._chunks.put(None)
+        self._thread.join(timeout=5)
+        return self._drain()
+
+
+def make_decoder(audio_format: str, sample_rate: int = SAMPLE_RATE):
+    if audio_format == "pcm16":
+        return PCM16Decoder(sample_rate)
+    if audio_format == "opus":
+        return OpusDecoder()
+    raise ValueError(f"Unsupported audio format '{audio_format}', expected pcm16 or opus")
+
+
+class StreamingTranscriber:
+    """Energy-VAD segmentation plus per-utterance decoding on the shared ASR backend"""
+
+    def __init__(
+        self,
+        model_size: Optional[str] = None,
+        language: str = "zh",
+        min_silence_duration_ms: int = STREAM_MIN_SILENCE_MS,
+        partial_interval_s: float = STREAM_PARTIAL_SECONDS,
+        max_segment_s: float = STREAM_MAX_SEGMENT_SECONDS,
+        min_rms: float = STREAM_VAD_MIN_RMS,
+    ):
+        # Share the process-wide faster-whisper model (int8 on CPU by default)
+        self.asr = get_model_registry().asr_backend(model_size)
+        self.language = language
+
+        self.frame_samples = SAMPLE_RATE * FRAME_MS // 1000
+        self.silence_frames = max(1, min_silence_duration_ms // FRAME_MS)
+        self.preroll_frames = 200 // FRAME_MS  # keep 200 ms before speech onset
+        self.partial_samples = int(partial_interval_s * SAMPLE_RATE)
+        self.max_segment_samples = int(max_segment_s * SAMPLE_RATE)
+        self.min_rms = min_rms
+
+        self._pending = np.zeros(0, dtype=np.float32)  # samples not yet framed
+        self._preroll: List[np.ndarray] = []
+        self._speech: List[np.ndarray] = []  # frames of the open utterance
+        self._speech_start = 0  # stream sample index where the open utterance starts
+        self._silent_run = 0
+        self._since_partial = 0
+        self._position = 0  # stream samples framed so far
+        # Seeded so the starting threshold is min_rms: a stream that opens
+        # mid-word must not calibrate the floor on speech
+        self._noise_floor = min_rms / 3.0
+        self._utterances = 0
+        self.finals: List[Dict] = []
+
+    @property
+    def transcript(self) -> str:
+        return " ".join(f["text"] for f in self.finals if f["text"])
+
+    def add_audio(self, samples: np.ndarray) -> List[Utterance]:
+        """Feed 16 kHz float32 samples; returns utterances ready to decode"""
+        audio = np.concatenate([self._pending, samples]) if len(self._pending) else samples
+        n_frames = len(audio) // self.frame_samples
+        self._pending = audio[n_frames * self.frame_samples:]
+        if n_frames == 0:
+            return []
+
+        frames = audio[:n_frames * self.frame_samples].reshape(n_frames, self.frame_samples)
+        rms = np.sqrt(np.mean(frames ** 2, axis=1))  # one vectorized pass per chunk
+
+        ready: List[Utterance] = []
+        for frame, energy in zip(frames, rms):
+            ready.extend(self._step(frame, float(energy)))
+        return ready
+
+    def flush(self) -> List[Utterance]:
+        """End of stream: finalize the open utterance, if any"""
+        if self._speech:
+            return [self._finalize()]
+        return []
+
+    def _is_speech(self, energy: float) -> bool:
+        speech = energy > max(self.min_rms, self._noise_floor * 3.0)
+        if not speech:
+            # Slowly track background noise so the threshold adapts to the room
+            self._noise_floor = 0.95 * self._noise_floor + 0.05 * energy
+        return speech
+
+    def _step(self, frame: np.ndarray, energy: float) -> List[Utterance]:
+        speech = self._is_speech(energy)
+        self._position += len(frame)
+
+        if not self._speech:
+            if not speech:
+                self._preroll = (self._preroll + [frame])[-self.preroll_frames:] if self.preroll_frames else []
+                return []
+            # Speech onset: start a new utterance with the pre-roll
+            self._speech = self._preroll + [frame]
+            self._speech_start = self._position - len(frame) * len(self._speech)
+            self._preroll = []
+            self._silent_run = 0
+            self._since_partial = 0
+            return []
+
+        self._speech.append(frame)
+        self._silent_run = 0 if speech else self._silent_run + 1
+        self._since_partial += len(frame)
+        length = len(self._speech) * self.frame_samples
+
+        if self._silent_run >= self.silence_frames or length >= self.max_segment_samples:
+            return [self._finalize()]
+        if self.partial_samples and self._since_partial >= self.partial_samples:
+            self._since_partial = 0
+            return [self._utterance("partial")]
+        return []
+
+    def _utterance(self, kind: str) -> Utterance:
+        return Utterance(
+            kind=kind,
+            index=self._utterances,
+            audio=np.concatenate(self._speech),
+            offset=self._speech_start / SAMPLE_RATE,
+        )
+
+    def _finalize(self) -> Utterance:
+        # Trailing silence beyond 100 ms adds nothing to decode
+        keep_silence = min(self._silent_run, 100 // FRAME_MS)
+        if self._silent_run > keep_silence:
+            self._speech = self._speech[:len(self._speech) - (self._silent_run - keep_silence)]
+        utterance = self._utterance("final")
+        self._utterances += 1
+        self._speech = []
+        self._silent_run = 0
+        return utterance
+
+    def transcribe_utterance(self, utterance: Utterance) -> Dict:
+        """Decode one utterance (blocking; run in a worker thread)"""
+        # Previous final text as prompt keeps terminology consistent across utterances
+        prompt = self.transcript[-200:] or None
+        result = self.asr.transcribe(utterance.audio, language=self.language, initial_prompt=prompt)
+        segments = [
+            {"start": round(utterance.offset + s["start"], 2), "end": round(utterance.offset + s["end"], 2), "text": s["text"]}
+            for s in result["segments"]
+        ]
+        event = {
+            "type": utterance.kind,
+            "index": utterance.index,
+            "text": result["text"],
+            "start": round(utterance.offset, 2),
+            "end": round(utterance.offset + len(utterance.audio) / SAMPLE_RATE, 2),
+            "segments": segments,
+        }
+        if utterance.kind == "final":
+            self.finals.append(event)
+        return event
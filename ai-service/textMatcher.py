@@ -0,0 +1,130 @@
+"""
+Compiled multi-pattern phrase matcher
+
+An Aho-Corasick automaton over a phrase lexicon: one pass over the text finds
+every occurrence of every phrase, so cost grows with text length rather than
+lexicon size times text length. Matching is case-insensitive. Phrases that
+start or end with a Latin letter/digit only match on token boundaries
+("like" does not match in "likely"); CJK phrases match anywhere, since
+Chinese text has no spaces between words.
+"""
+
+import re
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Tuple, Union
+
+_CJK = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff\uac00-\ud7af]")
+
+Lexicon = Union[Iterable[str], Mapping[str, Iterable[str]]]
+
+
+@dataclass(frozen=True)
+class PhraseMatch:
+    label: str  # canonical form the phrase belongs to
+    phrase: str  # the variant that matched
+    start: int  # character offsets into the original text
+    end: int
+
+
+def _is_word_char(c: str) -> bool:
+    return c.isalnum() and not _CJK.match(c)
+
+
+def fold_case(text: str) -> str:
+    """Lowercase without changing length, so match offsets index the original text"""
+    folded = text.lower()
+    if len(folded) == len(text):
+        return folded
+    return "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+
+class PhraseMatcher:
+    """
+    lexicon: phrases, or {label: [variant, ...]} to map variants onto one label.
+    Build once and reuse; matching is thread-safe (the automaton is read-only).
+    """
+
+    def __init__(self, lexicon: Lexicon):
+        if isinstance(lexicon, Mapping):
+            entries = [(label, variant) for label, variants in lexicon.items() for variant in variants]
+        else:
+            entries = [(phrase, phrase) for phrase in lexicon]
+
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Per state: (label, phrase, length, needs left boundary, needs right boundary)
+        self._out: List[List[Tuple[str, str, int, bool, bool]]] = [[]]
+        self.labels: List[str] = []
+        for label, phrase in entries:
+            self._add(label, phrase)
+        self._build()
+
+    def __len__(self) -> int:
+        return sum(len(out) for out in self._out)
+
+    def _add(self, label: str, phrase: str) -> None:
+        key = fold_case(phrase.strip())
+        if not key:
+            return
+        state = 0
+        for c in key:
+            nxt = self._goto[state].get(c)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][c] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((label, phrase, len(key), _is_word_char(key[0]), _is_word_char(key[-1])))
+        if label not in self.labels:
+            self.labels.append(label)
+
+    def _build(self) -> None:
+        """Breadth-first failure links; each state inherits its fail state's outputs"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for c, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and c not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(c, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_all(self, text: str, overlapping: bool = False) -> List[PhraseMatch]:
+        """
+        Every boundary-respecting occurrence, ordered by position. By default
+        overlaps are resolved leftmost-longest ("you know" wins over "know").
+        """
+        folded = fold_case(text)
+        n = len(folded)
+        goto, fail, out = self._goto, self._fail, self._out
+        matches: List[PhraseMatch] = []
+        state = 0
+        for i, c in enumerate(folded):
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+            for label, phrase, length, left, right in out[state]:
+                start, end = i - length + 1, i + 1
+                if left and start > 0 and _is_word_char(folded[start - 1]):
+                    continue
+                if right and end < n and _is_word_char(folded[end]):
+                    continue
+                matches.append(PhraseMatch(label, phrase, start, end))
+
+        matches.sort(key=lambda m: (m.start, m.start - m.end))
+        if overlapping:
+            return matches
+        selected: List[PhraseMatch] = []
+        for m in matches:
+            if not selected or m.start >= selected[-1].end:
+                selected.append(m)
+        return selected
+
+    def count(self, text: str) -> Counter:
+        """Occurrences per label (non-overlapping)"""
+        return Counter(m.label for m in self.find_all(text))
@@ -0,0 +1,79 @@
+"""
+Per-turn task graph helpers
+
+A turn's independent stages (evaluation, voice analysis, next-question
+drafting) are started together so turn latency approaches the slowest stage
+instead of the sum of all stages. Every stage is timed.
+"""
+
+import asyncio
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict
+
+_DONE = object()
+
+
+class TurnPipeline:
+    """Start stages concurrently and record how long each one took"""
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+
+    async def _timed(self, name: str, awaitable: Awaitable) -> Any:
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.timings[name] = round((time.perf_counter() - start) * 1000, 1)
+
+    async def run(self, name: str, awaitable: Awaitable) -> Any:
+        """Await a stage on the event loop"""
+        return await self._timed(name, awaitable)
+
+    def start(self, name: str, awaitable: Awaitable) -> asyncio.Task:
+        """Start an async stage (network-bound work) without waiting for it"""
+        return asyncio.create_task(self._timed(name, awaitable))
+
+    def start_in_thread(self, name: str, fn: Callable, *args, **kwargs) -> asyncio.Task:
+        """Start a blocking stage (model inference) in the default thread pool"""
+        return self.start(name, asyncio.to_thread(fn, *args, **kwargs))
+
+    def start_stream(self, name: str, events: AsyncIterator) -> "BufferedStream":
+        """Start consuming an event stream now; replay it later"""
+        buffer: asyncio.Queue = asyncio.Queue()
+        return BufferedStream(self._timed(name, _drain(events, buffer)), buffer)
+
+    def report(self) -> Dict[str, float]:
+        """Per-stage milliseconds plus wall-clock total for the turn"""
+        return {
+            **{f"{name}_ms": ms for name, ms in self.timings.items()},
+            "total_ms": round((time.perf_counter() - self._start) * 1000, 1),
+        }
+
+
+async def _drain(events: AsyncIterator, buffer: asyncio.Queue) -> None:
+    try:
+        async for event in events:
+            buffer.put_nowait(event)
+    finally:
+        buffer.put_nowait(_DONE)
+
+
+class BufferedStream:
+    """An event stream consumed in the background and replayed on demand"""
+
+    def __init__(self, pump: Awaitable, buffer: asyncio.Queue):
+        self._buffer = buffer
+        self._task = asyncio.create_task(pump)
+
+    async def __aiter__(self):
+        while True:
+            event = await self._buffer.get()
+            if event is _DONE:
+                break
+            yield event
+        await self._task  # surface errors from the producer
+
+    def cancel(self) -> None:
+        self._task.cancel()
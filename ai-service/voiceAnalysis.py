@@ -8,76 +8,274 @@ import torch
 if hasattr(torch.backends, 'mps') and torch.backends.mps.is_available():
     torch.backends.mps.is_available = lambda: False
 
-import torchaudio
+import functools
+import json
+import re
+from collections import Counter
+import numpy as np
 import torch.nn as nn
-from typing import Dict, List
-from transformers import Wav2Vec2ForSequenceClassification
+from typing import Dict, List, Optional, Tuple
+
+from audioDecoding import load_audio
+from inferenceBackends import EMOTION_BACKEND, load_classifier
+from inferenceScheduler import MicroBatchScheduler
+from resultCache import get_cache
+from textMatcher import Lexicon, PhraseMatcher
+
+EMOTION_MODEL_NAME = "ehcalabres/wav2vec2-lg-xlsr-en-speech-emotion-recognition"
+
+# Cross-session micro-batching window for emotion requests (0 disables it)
+EMOTION_BATCH_WINDOW_MS = float(os.getenv("EMOTION_BATCH_WINDOW_MS", "20"))
+
+# Long answers are classified in overlapping windows (0 disables windowing)
+EMOTION_WINDOW_SECONDS = float(os.getenv("EMOTION_WINDOW_SECONDS", "4"))
+EMOTION_WINDOW_HOP_SECONDS = float(os.getenv("EMOTION_WINDOW_HOP_SECONDS", "2"))
+EMOTION_MIN_WINDOW_RMS = float(os.getenv("EMOTION_MIN_WINDOW_RMS", "0.005"))  # quieter windows are skipped
+
+# Speech-rate / pause analysis (timestamps + frame energy, no model inference)
+PAUSE_MIN_SECONDS = float(os.getenv("PAUSE_MIN_SECONDS", "0.5"))
+PAUSE_MIN_RMS = float(os.getenv("PAUSE_MIN_RMS", "0.01"))  # frames quieter than this are always silence
+CJK_CHARS_PER_WORD = 1.5  # keeps Chinese rates on the 120-150 wpm scale used below
+ENERGY_FRAME_SAMPLES = 480  # 30 ms at 16 kHz
+
+# Filler lexicon: {filler: [variants]}; FILLER_LEXICON_PATH (JSON, same shape or a
+# plain list) extends it. English entries match whole tokens only.
+FILLER_LEXICON_PATH = os.getenv("FILLER_LEXICON_PATH", "")
+DEFAULT_FILLER_WORDS = {
+    "um": ["um", "umm", "erm"],
+    "uh": ["uh", "uhh"],
+    "er": ["er"],
+    "ah": ["ah"],
+    "like": ["like"],
+    "you know": ["you know"],
+    "嗯": ["嗯"],
+    "呃": ["呃"],
+    "那个": ["那个"],
+    "就是": ["就是"],
+}
+
+_LATIN_WORD = re.compile(r"[A-Za-z0-9]+(?:['-][A-Za-z0-9]+)*")
+_CJK_CHAR = re.compile(r"[\u3400-\u9fff\uf900-\ufaff]")
+
+EMOTION_LABELS = ["calm", "happy", "sad", "angry", "fearful", "disgust", "surprised", "neutral"]
 
 class VoiceAnalysis:
-    def __init__(self):
+    def __init__(
+        self,
+        batch_window_ms: float = EMOTION_BATCH_WINDOW_MS,
+        max_batch_size: int = 8,
+        backend: str = EMOTION_BACKEND,
+        window_seconds: float = EMOTION_WINDOW_SECONDS,
+        hop_seconds: float = EMOTION_WINDOW_HOP_SECONDS,
+        filler_lexicon: Optional[Lexicon] = None
+    ):
         # Explicitly use CPU to avoid MPS issues on macOS
         self.device = "cpu"
         
-        # Voice emotion analysis model
-        self.emotion_model = Wav2Vec2ForSequenceClassification.from_pretrained(
-            "ehcalabres/wav2vec2-lg-xlsr-en-speech-emotion-recognition"
-        ).to(self.device)
+        # Voice emotion analysis model (fp32 torch, int8 or onnx)
+        self.backend = backend
+        self.emotion_model = load_classifier(EMOTION_MODEL_NAME, "audio", backend, self.device)
         
         # Voice quality detection (placeholder - not implemented yet)
         self.speech_rate_model = None
-    
-    def analyze_emotion(self, audio_path: str) -> Dict:
-        """Analyze emotion in voice"""
-        waveform, sample_rate = torchaudio.load(audio_path)
-        
-        # Preprocessing
-        if sample_rate != 16000:
-            resampler = torchaudio.transforms.Resample(sample_rate, 16000)
-            waveform = resampler(waveform)
+        self.filler_matcher = PhraseMatcher(filler_lexicon) if filler_lexicon else get_filler_matcher()
         
-        # Move waveform to device
-        waveform = waveform.to(self.device)
+        # Fixed-length windows bound wav2vec2 memory and attention cost per forward
+        self.window_samples = int(window_seconds * 16000)
+        self.hop_samples = max(1, int(hop_seconds * 16000))
+        self.max_batch_size = max_batch_size
         
-        # Emotion classification
+        # Requests from concurrent sessions are merged into one padded batch
+        self.scheduler = (
+            MicroBatchScheduler(
+                "emotion", self._classify_batch,
+                window_ms=batch_window_ms, max_batch_size=max_batch_size
+            )
+            if batch_window_ms > 0 else None
+        )
+        # Emotion results are memoized by the decoded 16 kHz mono samples
+        self.cache = get_cache("emotion")
+    
+    def warm_up(self) -> None:
+        """Run one dummy forward pass on a second of silence"""
         with torch.no_grad():
-            outputs = self.emotion_model(waveform)
-            predictions = torch.nn.functional.softmax(outputs.logits, dim=-1)
-            
-        emotions = {
-            "calm": predictions[0][0].item(),
-            "happy": predictions[0][1].item(),
-            "sad": predictions[0][2].item(),
-            "angry": predictions[0][3].item(),
-            "fearful": predictions[0][4].item(),
-            "disgust": predictions[0][5].item(),
-            "surprised": predictions[0][6].item(),
-            "neutral": predictions[0][7].item()
-        }
+            self.emotion_model(torch.zeros(1, 16000, device=self.device))
+
+    def analyze_emotion(self, audio) -> Dict:
+        """
+        Analyze emotion in voice.
+        audio: the answer's shared AnswerAudio (a path or array is decoded here)
+        """
+        audio = load_audio(audio)
+        waveform = audio.tensor()  # zero-copy view of the 16 kHz mono samples
+        
+        # Emotion classification (retried uploads hit the cache)
+        key = audio.cache_key(
+            model=EMOTION_MODEL_NAME,
+            backend=self.backend,
+            window=self.window_samples,
+            hop=self.hop_samples,
+        )
+        result = self.cache.get(key)
+        if result is None:
+            if self.window_samples and len(waveform) > self.window_samples:
+                result = self._classify_windowed(waveform)
+            else:
+                result = {"probs": self._classify([waveform])[0], "timeline": []}
+            self.cache.set(key, result)
+        emotions = dict(zip(EMOTION_LABELS, result["probs"]))
         
         return {
             "dominant_emotion": max(emotions, key=emotions.get),
             "confidence": max(emotions.values()),
-            "all_emotions": emotions
+            "all_emotions": emotions,
+            "timeline": result["timeline"]
         }
     
-    def analyze_speech_patterns(self, audio_path: str, transcript: str) -> Dict:
-        """Analyze speech patterns"""
+    def _classify(self, waveforms: List[torch.Tensor]) -> List[List[float]]:
+        """Through the cross-session scheduler when enabled, else in batches of max_batch_size"""
+        if self.scheduler is not None:
+            futures = [self.scheduler.submit(w) for w in waveforms]
+            return [f.result() for f in futures]
+        probs = []
+        for i in range(0, len(waveforms), self.max_batch_size):
+            probs.extend(self._classify_batch(waveforms[i:i + self.max_batch_size]))
+        return probs
+    
+    def _classify_windowed(self, waveform: torch.Tensor) -> Dict:
+        """
+        Classify overlapping fixed-length windows (views, no copies) in bounded
+        batches; average the non-silent windows and keep a per-window timeline.
+        """
+        windows = list(waveform.unfold(0, self.window_samples, self.hop_samples))
+        starts = [i * self.hop_samples for i in range(len(windows))]
+        last_start = len(waveform) - self.window_samples
+        if starts[-1] < last_start:
+            # Cover the tail with one more full-length window
+            windows.append(waveform[last_start:])
+            starts.append(last_start)
+        
+        rms = [float(w.pow(2).mean().sqrt()) for w in windows]
+        voiced = [i for i, r in enumerate(rms) if r >= EMOTION_MIN_WINDOW_RMS] or list(range(len(windows)))
+        window_probs = self._classify([windows[i] for i in voiced])
+        
+        probs = torch.tensor(window_probs).mean(dim=0).tolist()
+        timeline = []
+        for i, p in zip(voiced, window_probs):
+            best = max(range(len(p)), key=p.__getitem__)
+            timeline.append({
+                "start": round(starts[i] / 16000, 2),
+                "end": round((starts[i] + self.window_samples) / 16000, 2),
+                "dominant_emotion": EMOTION_LABELS[best],
+                "confidence": p[best]
+            })
+        return {"probs": probs, "timeline": timeline}
+    
+    def _classify_batch(self, waveforms: List[torch.Tensor]) -> List[List[float]]:
+        """Classify several mono 16 kHz waveforms in one zero-padded forward pass"""
+        lengths = [w.shape[-1] for w in waveforms]
+        if len(waveforms) == 1:
+            # Nothing to pad: run on a view of the shared samples
+            batch = waveforms[0].unsqueeze(0)
+            attention_mask = torch.ones(1, lengths[0], dtype=torch.long)
+        else:
+            batch = torch.zeros(len(waveforms), max(lengths))
+            attention_mask = torch.zeros(len(waveforms), max(lengths), dtype=torch.long)
+            for i, (waveform, length) in enumerate(zip(waveforms, lengths)):
+                batch[i, :length] = waveform
+                attention_mask[i, :length] = 1
+        
+        with torch.no_grad():
+            outputs = self.emotion_model(
+                batch.to(self.device), attention_mask=attention_mask.to(self.device)
+            )
+            predictions = torch.nn.functional.softmax(outputs.logits, dim=-1)
+        return predictions.cpu().tolist()
+    
+    def analyze_speech_patterns(self, audio, transcript: str, segments: Optional[List[Dict]] = None) -> Dict:
+        """
+        Analyze speech patterns.
+        audio: the answer's shared AnswerAudio, or None when only text is available
+        segments: ASR segments with start/end (and "words" when word timestamps were on)
+        """
+        if audio is not None:
+            audio = load_audio(audio)
+        energy = _EnergyProfile(audio.samples) if audio is not None and len(audio.samples) else None
+        speaking_time = self._speaking_time(energy, segments)
+        
         # Calculate speech rate
-        words_per_minute = self._calculate_speech_rate(audio_path, transcript)
+        words_per_minute = self._calculate_speech_rate(transcript, speaking_time)
         
-        # Detect filler words
-        filler_words = self._detect_filler_words(transcript)
+        # Detect filler words (every occurrence, one pass)
+        fillers = self._detect_filler_words(transcript)
+        filler_words = list(fillers["counts"])
+        fillers_per_minute = round(fillers["total"] / (speaking_time / 60), 2) if speaking_time else None
         
         # Analyze pause pattern
-        pause_pattern = self._analyze_pauses(audio_path)
+        pause_pattern = self._analyze_pauses(energy, segments, speaking_time)
         
         return {
             "speech_rate": words_per_minute,
             "filler_words": filler_words,
+            "filler_counts": fillers["counts"],
+            "filler_total": fillers["total"],
+            "fillers_per_minute": fillers_per_minute,
+            "filler_positions": fillers["positions"],
             "pause_frequency": pause_pattern["frequency"],
             "average_pause_duration": pause_pattern["average_duration"],
+            "pause_count": pause_pattern["count"],
+            "speaking_time": round(speaking_time, 2) if speaking_time else None,
+            "duration": audio.duration if audio is not None else None,
             "confidence_indicator": self._calculate_confidence_indicator(
-                words_per_minute, filler_words, pause_pattern
+                words_per_minute, fillers["total"], fillers_per_minute, pause_pattern
+            )
+        }
+    
+    def merge_speech_patterns(self, per_answer: List[Dict]) -> Dict:
+        """
+        Interview-level speech patterns from per-answer results, weighted by
+        speaking time. Answers without timing (speech_rate None) are left out
+        of the rate and pause figures.
+        """
+        timed = [p for p in per_answer if p.get("speech_rate") is not None]
+        weights = [p.get("speaking_time") or p.get("duration") or 0.0 for p in timed]
+        if sum(weights) <= 0:
+            weights = [1.0] * len(timed)
+        total = sum(weights)
+        if timed:
+            words_per_minute = sum(p["speech_rate"] * w for p, w in zip(timed, weights)) / total
+            pause_counts = [p["pause_frequency"] * w for p, w in zip(timed, weights)]
+            pause_pattern = {
+                "frequency": sum(pause_counts) / total,
+                "average_duration": (
+                    sum(p["average_pause_duration"] * c for p, c in zip(timed, pause_counts)) / sum(pause_counts)
+                    if sum(pause_counts) > 0 else 0.0
+                )
+            }
+        else:
+            words_per_minute = None
+            pause_pattern = {"frequency": None, "average_duration": None}
+        filler_words = list(dict.fromkeys(f for p in per_answer for f in p["filler_words"]))
+        filler_counts = Counter()
+        for p in per_answer:
+            filler_counts.update(p.get("filler_counts") or {})
+        filler_total = sum(filler_counts.values())
+        speaking_time = sum(p.get("speaking_time") or 0.0 for p in per_answer)
+        fillers_per_minute = round(filler_total / (speaking_time / 60), 2) if speaking_time else None
+        
+        return {
+            "speech_rate": words_per_minute,
+            "filler_words": filler_words,
+            "filler_counts": dict(filler_counts),
+            "filler_total": filler_total,
+            "fillers_per_minute": fillers_per_minute,
+            "pause_frequency": pause_pattern["frequency"],
+            "average_pause_duration": pause_pattern["average_duration"],
+            "pause_count": sum(p.get("pause_count") or 0 for p in per_answer),
+            "speaking_time": round(speaking_time, 2),
+            "duration": sum(p.get("duration") or 0.0 for p in per_answer),
+            "confidence_indicator": self._calculate_confidence_indicator(
+                words_per_minute, filler_total, fillers_per_minute, pause_pattern
             )
         }
     
@@ -85,52 +283,163 @@ class VoiceAnalysis:
         """Placeholder for speech rate model loading"""
         return None
     
-    def _calculate_speech_rate(self, audio_path: str, transcript: str) -> float:
-        """Calculate words per minute from transcript"""
-        # Simple calculation: word count / duration estimate
-        words = len(transcript.split())
-        # Estimate duration (rough approximation)
-        # Average speaking rate is about 150 words per minute
-        # For now, return a default value
-        return 120.0  # Default WPM
+    def _speaking_time(self, energy: Optional["_EnergyProfile"], segments: Optional[List[Dict]]) -> float:
+        """Seconds from the first to the last spoken word (leading/trailing silence excluded)"""
+        spans = _word_spans(segments)
+        if spans:
+            return max(0.0, spans[-1][1] - spans[0][0])
+        if energy is not None:
+            return energy.voiced_span()
+        return 0.0
+    
+    def _calculate_speech_rate(self, transcript: str, speaking_time: float) -> Optional[float]:
+        """
+        Words per minute over the speaking time; CJK characters count as
+        1/CJK_CHARS_PER_WORD words. None when there is no timing (text only).
+        """
+        if speaking_time <= 0:
+            return None
+        words = len(_LATIN_WORD.findall(transcript)) + len(_CJK_CHAR.findall(transcript)) / CJK_CHARS_PER_WORD
+        if words == 0:
+            return 0.0
+        return round(words / (speaking_time / 60), 1)
     
-    def _detect_filler_words(self, transcript: str) -> List[str]:
+    def _detect_filler_words(self, transcript: str) -> Dict:
         """Detect filler words in transcript"""
-        filler_words_list = ["um", "uh", "er", "ah", "like", "you know", "嗯", "那个", "就是"]
-        found = []
-        transcript_lower = transcript.lower()
-        for filler in filler_words_list:
-            if filler in transcript_lower:
-                found.append(filler)
-        return found
+        return count_filler_words(transcript, self.filler_matcher)
     
-    def _analyze_pauses(self, audio_path: str) -> Dict:
-        """Analyze pause patterns in audio"""
-        # Placeholder implementation
+    def _analyze_pauses(
+        self,
+        energy: Optional["_EnergyProfile"],
+        segments: Optional[List[Dict]],
+        speaking_time: float
+    ) -> Dict:
+        """
+        Pauses of at least PAUSE_MIN_SECONDS inside the spoken span: silent runs
+        of the frame-energy profile when audio is available, else gaps between
+        word/segment timestamps. Frequency and duration are None without timing.
+        """
+        if speaking_time <= 0:
+            return {"count": 0, "frequency": None, "average_duration": None}
+        if energy is not None:
+            durations = energy.pauses(PAUSE_MIN_SECONDS)
+        else:
+            spans = _word_spans(segments)
+            if spans:
+                gaps = np.array([b[0] - a[1] for a, b in zip(spans, spans[1:])])
+                durations = gaps[gaps >= PAUSE_MIN_SECONDS]
+            else:
+                durations = np.zeros(0)
+        
+        minutes = speaking_time / 60
         return {
-            "frequency": 5.0,  # pauses per minute
-            "average_duration": 1.0  # seconds
+            "count": int(len(durations)),
+            "frequency": round(len(durations) / minutes, 2),  # pauses per minute
+            "average_duration": round(float(durations.mean()), 2) if len(durations) else 0.0  # seconds
         }
     
-    def _calculate_confidence_indicator(self, wpm: float, 
-                                       fillers: list, 
+    def _calculate_confidence_indicator(self, wpm: Optional[float], 
+                                       filler_total: int, 
+                                       fillers_per_minute: Optional[float], 
                                        pauses: Dict) -> float:
-        """Calculate confidence indicator"""
+        """Calculate confidence indicator (rate and pause terms are skipped without timing)"""
         score = 100
         
         # Speech rate adjustment (normal range 120-150wpm)
-        if wpm < 100:
-            score -= (100 - wpm) * 0.5
-        elif wpm > 180:
-            score -= (wpm - 180) * 0.3
+        if wpm is not None:
+            if wpm < 100:
+                score -= (100 - wpm) * 0.5
+            elif wpm > 180:
+                score -= (wpm - 180) * 0.3
             
-        # Filler words deduction
-        score -= len(fillers) * 2
+        # Filler words deduction: every occurrence counts; per minute of speech
+        # when timed, so long answers are not penalised for their length
+        score -= (fillers_per_minute if fillers_per_minute is not None else filler_total) * 2
         
         # Pause deduction
-        if pauses["frequency"] > 10:  # Pause more than 10 times per minute
+        if pauses["frequency"] is not None and pauses["frequency"] > 10:  # Pause more than 10 times per minute
             score -= 10
-        if pauses["average_duration"] > 2.0:  # Average pause more than 2 seconds
+        if pauses["average_duration"] is not None and pauses["average_duration"] > 2.0:  # Average pause more than 2 seconds
             score -= 5
             
-        return max(0, min(100, score))
\ No newline at end of file
+        return max(0, min(100, score))
+
+
+def load_filler_lexicon(path: str = FILLER_LEXICON_PATH) -> Dict[str, List[str]]:
+    """Default fillers extended with the JSON lexicon at path, if any"""
+    lexicon = {label: list(variants) for label, variants in DEFAULT_FILLER_WORDS.items()}
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            extra = json.load(f)
+        if isinstance(extra, list):
+            extra = {word: [word] for word in extra}
+        for label, variants in extra.items():
+            lexicon.setdefault(label, []).extend([variants] if isinstance(variants, str) else variants)
+    return lexicon
+
+
+@functools.lru_cache(maxsize=1)
+def get_filler_matcher() -> PhraseMatcher:
+    """Process-wide compiled filler matcher"""
+    return PhraseMatcher(load_filler_lexicon())
+
+
+def count_filler_words(transcript: str, matcher: Optional[PhraseMatcher] = None) -> Dict:
+    """
+    Every filler occurrence with character offsets, in one pass over the text.
+    Needs no model, so stored transcripts can be re-analyzed in bulk.
+    """
+    matches = (matcher or get_filler_matcher()).find_all(transcript or "")
+    return {
+        "counts": dict(Counter(m.label for m in matches)),
+        "total": len(matches),
+        "positions": [{"word": m.label, "start": m.start, "end": m.end} for m in matches]
+    }
+
+
+def _word_spans(segments: Optional[List[Dict]]) -> List[Tuple[float, float]]:
+    """(start, end) per word when word timestamps exist, else per segment"""
+    if not segments:
+        return []
+    spans = []
+    for seg in segments:
+        words = seg.get("words")
+        if words:
+            spans.extend((w["start"], w["end"]) for w in words)
+        elif seg.get("text"):
+            spans.append((seg["start"], seg["end"]))
+    return sorted(spans)
+
+
+class _EnergyProfile:
+    """Per-frame RMS of a 16 kHz buffer in one vectorized pass, with silence runs"""
+
+    def __init__(self, samples: np.ndarray, frame: int = ENERGY_FRAME_SAMPLES):
+        self.frame_seconds = frame / 16000
+        n = len(samples) // frame
+        frames = samples[:n * frame].reshape(n, frame)  # view, no copy
+        self.rms = np.sqrt(np.einsum("ij,ij->i", frames, frames) / frame)
+        if n:
+            # Adaptive threshold: above the room's noise floor, below the speech level,
+            # but never under PAUSE_MIN_RMS (near-silent audio must not read as voiced)
+            floor = np.percentile(self.rms, 10)
+            threshold = min(floor * 3.0, np.percentile(self.rms, 90) * 0.5)
+            threshold = max(PAUSE_MIN_RMS, threshold)
+            self.voiced = self.rms > threshold
+        else:
+            self.voiced = np.zeros(0, dtype=bool)
+        voiced_idx = np.flatnonzero(self.voiced)
+        self.first, self.last = (voiced_idx[0], voiced_idx[-1]) if len(voiced_idx) else (0, -1)
+
+    def voiced_span(self) -> float:
+        return max(0, self.last - self.first + 1) * self.frame_seconds
+
+    def pauses(self, min_seconds: float) -> np.ndarray:
+        """Durations (s) of silent runs between the first and last voiced frame"""
+        if self.last <= self.first:
+            return np.zeros(0)
+        silent = ~self.voiced[self.first:self.last + 1]
+        edges = np.diff(np.concatenate(([0], silent.view(np.int8), [0])))
+        lengths = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+        durations = lengths * self.frame_seconds
+        return durations[durations >= min_seconds]
@@ -1,52 +1,44 @@
-# requirements.txt
-# openai-whisper>=20231117
-# torch>=2.0
-# transformers>=4.30
-
-import whisper
-import numpy as np
 from typing import Optional, Dict
-import asyncio
+
+from asrBackend import ASRBackend, ASR_MODEL_SIZE
+
 
 class WhisperASR:
-    def __init__(self, model_size: str = "base", device: str = "cuda"):
+    def __init__(self, model_size: str = ASR_MODEL_SIZE, backend: Optional[ASRBackend] = None):
         """
-        初始化Whisper模型
+        Interview-engine facade over the shared ASR backend
         model_size: tiny, base, small, medium, large
         """
-        self.model = whisper.load_model(model_size, device=device)
-        self.device = device
-        
+        if backend is None:
+            from modelRegistry import get_model_registry
+            backend = get_model_registry().asr_backend(model_size)
+        self.backend = backend
+        self.model_size = backend.model_size
+
     async def transcribe_realtime(
-        self, 
-        audio_stream, 
+        self,
+        audio_stream,
         language: Optional[str] = "zh",
-        initial_prompt: Optional[str] = None
+        initial_prompt: Optional[str] = None,
+        word_timestamps: bool = False
     ) -> Dict:
-        """Real-time transcribe audio stream"""
-        options = {
-            "language": language,
-            "task": "transcribe",
-            "initial_prompt": initial_prompt,
-            "fp16": self.device == "cuda",
-            "temperature": 0.0,
-            "best_of": 5,
-            "beam_size": 5,
-            "without_timestamps": False,
-        }
-        
-        result = await asyncio.to_thread(
-            self.model.transcribe,
+        """Real-time transcribe audio stream (word_timestamps adds per-segment "words")"""
+        return await self.backend.transcribe_async(
             audio_stream,
-            **options
+            language=language,
+            initial_prompt=initial_prompt,
+            word_timestamps=word_timestamps,
         )
-        return result
-    
+
+    def warm_up(self) -> None:
+        """Run one dummy decode so the first real request is not cold"""
+        self.backend.warm_up()
+
     def transcribe_file(self, audio_path: str) -> Dict:
         """Transcribe audio file"""
-        result = self.model.transcribe(audio_path)
+        result = self.backend.transcribe(audio_path)
         return {
             "text": result["text"],
             "segments": result["segments"],
             "language": result.get("language", "zh")
-        }
\ No newline at end of file
+        }
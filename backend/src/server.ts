@@ -49,6 +49,22 @@ interface AiQuestionResponse {
   question?: string;
 }
 
+interface EngineNextResponse {
+  action?: 'ask_question' | 'end_interview';
+  question?: string;
+  report?: unknown;
+  job_id?: string;
+}
+
+interface ReportJobStatus {
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  progress: number;
+  error?: string | null;
+}
+
+const REPORT_POLL_INTERVAL_MS = 2000;
+const REPORT_POLL_TIMEOUT_MS = 5 * 60 * 1000;
+
 const app = express();
 app.use(cors());
 app.use(express.json());
@@ -91,6 +107,41 @@ async function sendInitialQuestion(sessionId: string, meta: InterviewMeta) {
   }
 }
 
+// The AI service builds the final report in a background job; poll it and push the result
+async function deliverReport(sessionId: string, next: EngineNextResponse) {
+  if (!next.job_id) {
+    io.to(sessionId).emit('interview:report', next.report);
+    return;
+  }
+  io.to(sessionId).emit('interview:report:pending', { jobId: next.job_id });
+  const deadline = Date.now() + REPORT_POLL_TIMEOUT_MS;
+  while (Date.now() < deadline) {
+    await new Promise(resolve => setTimeout(resolve, REPORT_POLL_INTERVAL_MS));
+    try {
+      const { data: job } = await axios.get<ReportJobStatus>(
+        `${config.aiServiceUrl}/reports/${next.job_id}`,
+        { timeout: 10000 }
+      );
+      if (job.status === 'succeeded') {
+        const { data } = await axios.get<{ report: unknown }>(
+          `${config.aiServiceUrl}/reports/${next.job_id}/result`,
+          { timeout: 10000 }
+        );
+        io.to(sessionId).emit('interview:report', data.report);
+        return;
+      }
+      if (job.status === 'failed') {
+        console.error(`Report job ${next.job_id} failed: ${job.error}`);
+        io.to(sessionId).emit('system:error', { message: '报告生成失败' });
+        return;
+      }
+    } catch (err) {
+      console.error('Report status check failed', (err as Error).message);
+    }
+  }
+  io.to(sessionId).emit('system:error', { message: '报告生成超时' });
+}
+
 io.on('connection', socket => {
   const sessionId = uuid();
   const meta: InterviewMeta = { industry: null, level: null, messages: [] };
@@ -142,16 +193,17 @@ io.on('connection', socket => {
     io.to(sessionId).emit('candidate:text:ack', { text });
     try {
       if (meta.engineSessionId) {
-        const { data } = await axios.post(`${config.aiServiceUrl}/engine/next`, {
-          session_id: meta.engineSessionId,
-          text
-        });
+        const { data } = await axios.post<EngineNextResponse>(
+          `${config.aiServiceUrl}/engine/next`,
+          { session_id: meta.engineSessionId, text },
+          { timeout: 30000 }
+        );
         if (data.action === 'ask_question') {
-          const aiText = data.question;
+          const aiText = data.question || '';
           meta.messages.push({ role: 'ai', text: aiText, ts: Date.now() });
           io.to(sessionId).emit('ai:message', { text: aiText });
         } else if (data.action === 'end_interview') {
-          io.to(sessionId).emit('interview:report', data.report);
+          void deliverReport(sessionId, data);
         }
       } else {
         const { data } = await axios.post<AiAnalyzeResponse>(`${config.aiServiceUrl}/analyze`, {
@@ -219,17 +271,19 @@ io.on('connection', socket => {
       console.log(`Transcription result: ${transcript.substring(0, 100)}...`);
       
       if (meta.engineSessionId && transcript) {
-        const { data: next } = await axios.post(`${config.aiServiceUrl}/engine/next`, {
-          session_id: meta.engineSessionId,
-          text: transcript
-        });
+        const { data: next } = await axios.post<EngineNextResponse>(
+          `${config.aiServiceUrl}/engine/next`,
+          { session_id: meta.engineSessionId, text: transcript },
+          { timeout: 30000 }
+        );
         if (next.action === 'ask_question') {
+          const aiText = next.question || '';
           meta.messages.push({ role: 'candidate', text: transcript, ts: Date.now() });
-          meta.messages.push({ role: 'ai', text: next.question, ts: Date.now() });
+          meta.messages.push({ role: 'ai', text: aiText, ts: Date.now() });
           io.to(sessionId).emit('candidate:text:ack', { text: transcript });
-          io.to(sessionId).emit('ai:message', { text: next.question });
+          io.to(sessionId).emit('ai:message', { text: aiText });
         } else if (next.action === 'end_interview') {
-          io.to(sessionId).emit('interview:report', next.report);
+          void deliverReport(sessionId, next);
         }
       } else if (transcript) {
         // If no engine session, use fallback analyze endpoint